@@ -1,7 +1,15 @@
 import os
-import subprocess
 import json
-import time
+import re
+import datetime
+import uuid
+
+import llm_backend
+import rate_budget
+import tracing
+from fanout import fan_out
+from github_client import quote, rest
+from llm_backend import get_llm
 
 # Configuration
 ORG = "atnplex"
@@ -9,91 +17,171 @@ LABEL_TRIGGER = "ai-assigned"
 LABEL_RESOLVED = "ai-resolved"
 # DRY_RUN defaults to False unless set to 'true' in env
 DRY_RUN = os.getenv('DRY_RUN', 'False').lower() == 'true'
-
-def run_command(command, use_shell=False, input_text=None):
-    """Run a shell command and return the output."""
-    try:
-        if isinstance(command, list): use_shell = False
-        result = subprocess.run(
-            command,
-            cwd=os.getcwd(), 
-            shell=use_shell,
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            input=input_text
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command: {command}")
-        print(f"Stderr: {e.stderr}")
-        return None
+# Issues processed at once; each spends most of its time waiting on the API (and later the LLM).
+CONCURRENCY = int(os.getenv('AI_WORKER_CONCURRENCY', '4'))
+# A claim older than this is considered abandoned (crashed run) and may be taken over.
+LEASE_TTL_SECONDS = int(os.getenv('AI_WORKER_LEASE_TTL', '900'))
+# GitHub search stops at 1000 results.
+SEARCH_PAGE_SIZE = 100
+SEARCH_RESULT_CAP = 1000
+RUN_ID = os.getenv('GITHUB_RUN_ID') or uuid.uuid4().hex[:12]
+LEASE_MARKER_RE = re.compile(r'<!-- ai-worker:(lease|done) run=(\S+) at=(\S+) -->')
 
 def fetch_ai_tasks(org):
     print(f"Fetching issues with label '{LABEL_TRIGGER}' in {org}...")
     # Getting issues across the org is tricky with `gh issue list` because it's repo-scoped.
     # We must search.
-    query = f"org:{org} label:{LABEL_TRIGGER} state:open"
-    cmd = ['gh', 'search', 'issues', query, '--json', 'repository,number,title,body,url']
-    output = run_command(cmd)
+    query = f"org:{org} is:issue label:{LABEL_TRIGGER} state:open"
+    tasks = []
+    for page in range(1, SEARCH_RESULT_CAP // SEARCH_PAGE_SIZE + 1):
+        result = rest('GET', f"/search/issues?q={quote(query)}&per_page={SEARCH_PAGE_SIZE}&page={page}")
+        if not result: break
+        items = result.get('items', [])
+        tasks.extend(to_task(item) for item in items)
+        if len(items) < SEARCH_PAGE_SIZE or len(tasks) >= result.get('total_count', 0): break
+    # The label swap of an earlier page can shift later pages; drop repeats.
+    return list({(t['repository']['nameWithOwner'], t['number']): t for t in tasks}.values())
+
+def to_task(item):
+    """Shape a REST search/issue payload like `gh search issues --json` output."""
+    full_name = item['repository_url'].split('/repos/', 1)[-1]
+    return {
+        "repository": {"nameWithOwner": full_name, "url": f"https://github.com/{full_name}"},
+        "number": item.get('number'),
+        "title": item.get('title'),
+        "body": item.get('body') or "",
+        "url": item.get('html_url'),
+    }
+
+def event_task():
+    """Task for the issue that triggered this run, or None when not running from an `issues: labeled` event.
+
+    Returns False when the run came from such an event that is not ours to
+    handle (another label, a closed issue), so the caller does not fall back
+    to a sweep.
+    """
+    if os.getenv('GITHUB_EVENT_NAME') != 'issues' or not os.getenv('GITHUB_EVENT_PATH'): return None
     try:
-        if output: return json.loads(output)
-    except json.JSONDecodeError:
-        print(f"Error decoding output: {output}")
-        return []
-    return []
+        with open(os.environ['GITHUB_EVENT_PATH'], encoding='utf-8') as f:
+            event = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Could not read event payload: {e}")
+        return None
+    issue = event.get('issue') or {}
+    label = (event.get('label') or {}).get('name')
+    if event.get('action') != 'labeled' or label != LABEL_TRIGGER:
+        print(f"Ignoring '{event.get('action')}' event for label '{label}'.")
+        return False
+    if issue.get('state') != 'open' or 'pull_request' in issue:
+        print(f"Ignoring event for #{issue.get('number')}: not an open issue.")
+        return False
+    return to_task(issue)
+
+def comment_on_issue(full_name, number, body):
+    return rest('POST', f"/repos/{full_name}/issues/{number}/comments", {"body": body})
+
+def list_comments(full_name, number):
+    comments = []
+    page = 1
+    while True:
+        batch = rest('GET', f"/repos/{full_name}/issues/{number}/comments?per_page=100&page={page}")
+        if not batch: break
+        comments.extend(batch)
+        if len(batch) < 100: break
+        page += 1
+    return comments
+
+def lease_marker(kind):
+    now = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return f"<!-- ai-worker:{kind} run={RUN_ID} at={now} -->"
+
+def lease_state(comments):
+    """Summarize worker markers on an issue: (recently done?, [(comment id, run) of live leases])."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    live = []
+    recently_done = False
+    for comment in comments:
+        for kind, run, at in LEASE_MARKER_RE.findall(comment.get('body') or ''):
+            age = (now - datetime.datetime.fromisoformat(at.replace('Z', '+00:00'))).total_seconds()
+            if age > LEASE_TTL_SECONDS: continue
+            if kind == 'done':
+                # Completion releases every earlier lease.
+                recently_done, live = True, []
+            else:
+                recently_done = False
+                live.append((comment['id'], run))
+    return recently_done, live
 
-def process_issue(issue):
+def claim_issue(full_name, number, body):
+    """Post the acknowledgement as a lease comment and check that this run holds the lease.
+
+    Runs race by posting; the oldest live lease comment wins and losers delete
+    theirs. Returns False when another run holds the issue or just finished it
+    (search results lag the label swap by minutes). A re-run attempt keeps its
+    GITHUB_RUN_ID, so a live lease from this run ID is already ours.
+    """
+    recently_done, live = lease_state(list_comments(full_name, number))
+    if recently_done: return False
+    if live: return live[0][1] == RUN_ID
+    posted = comment_on_issue(full_name, number, f"{body}\n\n{lease_marker('lease')}")
+    if not posted: return False
+    _, live = lease_state(list_comments(full_name, number))
+    if live and live[0][1] != RUN_ID:
+        rest('DELETE', f"/repos/{full_name}/issues/comments/{posted['id']}")
+        return False
+    return True
+
+def swap_labels(full_name, number, remove_label, add_label):
+    rest('DELETE', f"/repos/{full_name}/issues/{number}/labels/{quote(remove_label)}")
+    return rest('POST', f"/repos/{full_name}/issues/{number}/labels", {"labels": [add_label]})
+
+def process_issue(issue, log=print):
+    """Handle one task; returns what happened (done, claimed-elsewhere, dry-run, invalid)."""
     repo_object = issue.get('repository', {})
-    if not repo_object: return
+    if not repo_object: return "invalid"
 
-    repo_url = repo_object.get('url')
     full_name = repo_object.get('nameWithOwner') # e.g. atnplex/repo
-    if not full_name: return
+    if not full_name: return "invalid"
 
     number = issue.get('number')
     title = issue.get('title')
     body = issue.get('body', "")
     
-    print(f"Processing Task: {full_name}#{number}: {title}")
+    log(f"Processing Task: {full_name}#{number}: {title}")
     
     if DRY_RUN:
-        print(f"  [DRY RUN] Would acknowledge and respond to issue #{number}")
-        return
+        log(f"  [DRY RUN] Would acknowledge and respond to issue #{number}")
+        return "dry-run"
 
-    # 1. Acknowledge
-    print(f"  -> Acknowledging on {full_name}#{number}...")
-    ack_cmd = ['gh', 'issue', 'comment', str(number), '--repo', full_name, '--body', "🤖 **AI Worker:** I am analyzing this request..."]
-    run_command(ack_cmd)
-    
-    # 2. "Think" (Simulated LLM)
-    # response = llm.generate(body)
+    # 1. Acknowledge (the acknowledgement doubles as this run's lease on the issue)
+    log(f"  -> Acknowledging on {full_name}#{number}...")
+    if not claim_issue(full_name, number, "🤖 **AI Worker:** I am analyzing this request..."):
+        log("  -> Already claimed by another run; skipping.")
+        return "claimed-elsewhere"
     
-    simulated_response = f"""
-**AI Analysis**:
-I receive your request: "{title}".
-
-**Proposed Action**:
-(This is a simulated response. The AI Worker script is running successfully but currently in "Stub" mode. To enable real AI reasoning, configure the `AI_WORKER_KEY` secret and uncomment the LLM logic in `steps/ai_worker.py`.)
-
-**Context**:
-> {title}
-"""
+    # 2. Think (stub backend until LLM_BASE_URL / AI_WORKER_KEY are configured)
+    response = get_llm().generate(title, body)
     
     # 3. Respond
-    print(f"  -> Responding on {full_name}#{number}...")
-    resp_cmd = ['gh', 'issue', 'comment', str(number), '--repo', full_name, '--body', simulated_response]
-    run_command(resp_cmd)
+    log(f"  -> Responding on {full_name}#{number}...")
+    comment_on_issue(full_name, number, f"{response}\n{lease_marker('done')}")
         
     # 4. Resolve (Swap Labels)
-    print(f"  -> Resolving (swap label to '{LABEL_RESOLVED}')...")
+    log(f"  -> Resolving (swap label to '{LABEL_RESOLVED}')...")
     # remove ai-assigned, add ai-resolved
-    edit_cmd = ['gh', 'issue', 'edit', str(number), '--repo', full_name, '--remove-label', LABEL_TRIGGER, '--add-label', LABEL_RESOLVED]
-    run_command(edit_cmd)
+    swap_labels(full_name, number, LABEL_TRIGGER, LABEL_RESOLVED)
+    return "done"
 
 def main():
     print("Starting AI Worker...")
+    # Label events carry the issue; only the cron/dispatch sweep needs to search.
+    task = event_task()
+    if task is False: return
+    if task:
+        print(f"Event mode: handling {task['repository']['nameWithOwner']}#{task['number']} only.")
+        process_issue(task)
+        return
+
     tasks = fetch_ai_tasks(ORG)
     if not tasks:
         print("No tasks found.")
@@ -101,8 +189,17 @@ def main():
 
     print(f"Found {len(tasks)} tasks.")
     
-    for task in tasks:
-        process_issue(task)
+    outcomes = {}
+    key = lambda t: f"{t['repository']['nameWithOwner']}#{t['number']}"
+    for outcome in fan_out("ai_worker", tasks, process_issue, key=key, concurrency=CONCURRENCY, journal=False):
+        result = outcome['result'] if not outcome['error'] else "failed"
+        outcomes[result] = outcomes.get(result, 0) + 1
+    print("\nSummary: " + ", ".join(f"{k}: {v}" for k, v in sorted(outcomes.items())))
 
 if __name__ == "__main__":
-    main()
+    try:
+        tracing.run(main)
+    finally:
+        llm_backend.report()
+        rate_budget.report()
+        tracing.report()
@@ -1,107 +1,254 @@
 import os
-import subprocess
+import csv
 import json
-import base64
+import argparse
+import datetime
+
+import rate_budget
+import tracing
+from fanout import fan_out
+from github_client import quote, request
+from repo_inventory import load_repos
 
 # Configuration
 ORG = "atnplex"
-
-def run_command(command, use_shell=False, input_text=None):
-    """Run a shell command and return the output."""
-    try:
-        if isinstance(command, list):
-            use_shell = False
-        
-        result = subprocess.run(
-            command,
-            cwd=os.getcwd(), 
-            shell=use_shell,
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            input=input_text
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        return None
+# Report files; the JSONL report doubles as the state the next incremental run reuses.
+REPORT_DIR = os.getenv('AUDIT_REPORT_DIR', '.')
+REPORT_MD = os.path.join(REPORT_DIR, "compliance_report.md")
+REPORT_JSONL = os.path.join(REPORT_DIR, "compliance_report.jsonl")
+REPORT_CSV = os.path.join(REPORT_DIR, "compliance_report.csv")
+DELTA_MD = os.path.join(REPORT_DIR, "compliance_delta.md")
 
 def fetch_all_repos(org):
     print(f"Fetching all repositories for {org}...")
-    # Fetch Topics and Description directly
-    cmd = ['gh', 'repo', 'list', org, '--limit', '1000', '--json', 'name,description,repositoryTopics,defaultBranchRef']
-    output = run_command(cmd)
-    if output: return json.loads(output)
-    return []
+    return load_repos(org)
+
+# Required paths: check name -> accepted locations. A trailing '/' means a
+# directory that must contain at least one file. New checks only need an entry
+# here; they are answered from the tree already fetched for each repo.
+REQUIRED_PATHS = {
+    "README": ["README.md", "README", "README.rst"],
+    "LICENSE": ["LICENSE", "LICENSE.md", "LICENSE.txt"],
+    "CODEOWNERS": ["CODEOWNERS", ".github/CODEOWNERS", "docs/CODEOWNERS"],
+    "Workflows": [".github/workflows/"],
+    "SECURITY": ["SECURITY.md", ".github/SECURITY.md", "docs/SECURITY.md"],
+}
 
 def check_file_exists(org, repo_name, file_path):
-    cmd = ['gh', 'api', f'/repos/{org}/{repo_name}/contents/{file_path}', '--silent']
-    # If 0, exists. If 1, not found.
+    # 200 if it exists, 404 if not found.
+    status, _ = request('GET', f'/repos/{org}/{repo_name}/contents/{quote(file_path, safe="/")}')
+    return status == 200
+
+def fetch_tree(org, repo_name, branch):
+    """Return (set of file paths on `branch`, truncated flag), or (None, False) on error.
+
+    One recursive git tree call per repo; an empty repository yields an empty set.
+    """
+    status, data = request('GET', f'/repos/{org}/{repo_name}/git/trees/{quote(branch)}?recursive=1')
+    if status == 409: return set(), False  # Git Repository is empty
+    if status != 200 or not isinstance(data, dict): return None, False
+    paths = {entry['path'] for entry in data.get('tree', []) if entry.get('type') == 'blob'}
+    return paths, bool(data.get('truncated'))
+
+def path_present(paths, candidate):
+    if candidate.endswith('/'):
+        return any(p.startswith(candidate) for p in paths)
+    return candidate in paths
+
+def check_required_paths(org, repo_name, branch):
+    """Evaluate every REQUIRED_PATHS check for one repo; returns ({check name: bool}, tree fetched?)."""
+    paths, truncated = fetch_tree(org, repo_name, branch) if branch else (set(), False)
+    results = {}
+    for check, candidates in REQUIRED_PATHS.items():
+        if paths is None:
+            results[check] = False
+            continue
+        found = any(path_present(paths, c) for c in candidates)
+        if not found and truncated:
+            # Very large trees come back truncated; probe the missing paths directly.
+            found = any(check_file_exists(org, repo_name, c.rstrip('/')) for c in candidates)
+        results[check] = found
+    return results, paths is not None
+
+def audit_repo(repo):
+    """Compliance checks for one repo (no printing, so repos can be audited concurrently)."""
+    desc = repo.get('description', '')
+    topics = repo.get('repositoryTopics', []) or []
+    branch = (repo.get('defaultBranchRef') or {}).get('name')
+    
+    has_topics = len(topics) > 0
+    has_desc = bool(desc)
+    files, complete = check_required_paths(ORG, repo['name'], branch)
+    
+    return {
+        "name": repo['name'],
+        "pushed_at": repo.get('pushedAt'),
+        "updated_at": repo.get('updatedAt'),
+        "checked_at": datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "has_topics": has_topics,
+        "has_desc": has_desc,
+        "files": files,
+        "compliant": has_topics and has_desc and all(files.values()),
+        # Rows whose tree could not be fetched are re-checked next run even if the repo is unchanged.
+        "incomplete": not complete
+    }
+
+def error_row(repo, error):
+    """Report row for a repo whose check failed; it counts as non-compliant and is re-checked next run."""
+    return {
+        "name": repo['name'],
+        "pushed_at": repo.get('pushedAt'),
+        "updated_at": repo.get('updatedAt'),
+        "checked_at": datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "has_topics": False,
+        "has_desc": False,
+        "files": {},
+        "compliant": False,
+        "incomplete": True,
+        "error": error,
+    }
+
+def load_previous(path=REPORT_JSONL):
+    """Results of the last audit by repo name ({} when there is none)."""
+    previous = {}
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                previous[row['name']] = row
+    except OSError:
+        pass
+    return previous
+
+def is_current(row, repo):
+    """A previous result still holds if the repo has not changed and covers every current check."""
+    return (row is not None
+            and not row.get('incomplete')
+            and row.get('pushed_at') == repo.get('pushedAt')
+            and row.get('updated_at') == repo.get('updatedAt')
+            and set(REQUIRED_PATHS) <= set(row.get('files', {})))
+
+class ReportWriter:
+    """Stream audit rows to JSONL, CSV and Markdown as they arrive.
+
+    Files are written under a temporary name and moved into place by
+    `close()`, so an interrupted run leaves the previous report intact.
+    """
+
+    def __init__(self, checks):
+        self.checks = checks
+        self.rows = 0
+        self.compliant = 0
+        self.errors = 0
+        self.jsonl = open(f"{REPORT_JSONL}.tmp", 'w', encoding='utf-8')
+        self.csv_file = open(f"{REPORT_CSV}.tmp", 'w', encoding='utf-8', newline='')
+        self.csv = csv.writer(self.csv_file)
+        self.csv.writerow(["name", "has_topics", "has_desc"] + checks + ["compliant", "pushed_at", "checked_at", "error"])
+        self.md_rows = open(f"{REPORT_MD}.rows.tmp", 'w', encoding='utf-8')
+
+    def write(self, r):
+        self.rows += 1
+        if r['compliant']: self.compliant += 1
+        if r.get('error'): self.errors += 1
+        self.jsonl.write(json.dumps(r) + "\n")
+        self.csv.writerow([r['name'], r['has_topics'], r['has_desc']] + [r['files'].get(c, False) for c in self.checks]
+                          + [r['compliant'], r.get('pushed_at'), r.get('checked_at'), r.get('error') or ''])
+        status = "❗ not checked" if r.get('error') else "✅" if r['compliant'] else "⚠️"
+        file_cells = " | ".join('✅' if r['files'].get(c) else '❌' for c in self.checks)
+        self.md_rows.write(f"| {r['name']} | {'✅' if r['has_topics'] else '❌'} | {'✅' if r['has_desc'] else '❌'} | {file_cells} | {status} |\n")
+
+    def close(self):
+        for f in (self.jsonl, self.csv_file, self.md_rows): f.close()
+        with open(f"{REPORT_MD}.tmp", 'w', encoding='utf-8') as f:
+            f.write(f"# Compliance Report for {ORG}\n\n")
+            f.write(f"**Score**: {self.compliant}/{self.rows} ({int(self.compliant/self.rows*100) if self.rows > 0 else 0}%)"
+                    + (f", {self.errors} could not be checked" if self.errors else "") + "\n\n")
+            f.write("| Repository | Topics | Description | " + " | ".join(self.checks) + " | Status |\n")
+            f.write("|------------|--------|-------------|" + "|".join("-" * (len(c) + 2) for c in self.checks) + "|--------|\n")
+            with open(f"{REPORT_MD}.rows.tmp", encoding='utf-8') as rows:
+                for line in rows: f.write(line)
+        os.remove(f"{REPORT_MD}.rows.tmp")
+        for path in (REPORT_JSONL, REPORT_CSV, REPORT_MD): os.replace(f"{path}.tmp", path)
+
+def write_delta(previous, current):
+    """Report repos whose compliance changed since the previous audit; returns the number of changes.
+
+    `current` maps repo name -> compliant, or None when the repo could not be checked.
+    """
+    sections = {
+        "Became compliant": sorted(n for n, ok in current.items() if ok is True and n in previous and not previous[n]['compliant']),
+        "Became non-compliant": sorted(n for n, ok in current.items() if ok is False and n in previous and previous[n]['compliant']),
+        "Could not be checked": sorted(n for n, ok in current.items() if ok is None),
+        "New repositories": sorted(n for n in current if n not in previous),
+        "Removed repositories": sorted(n for n in previous if n not in current),
+    }
+    with open(DELTA_MD, 'w', encoding='utf-8') as f:
+        f.write(f"# Compliance Delta for {ORG}\n\n")
+        for title, names in sections.items():
+            f.write(f"## {title} ({len(names)})\n\n")
+            f.write("".join(f"- {n}\n" for n in names) or "_None_\n")
+            f.write("\n")
+    print("\nChanges since the previous audit:")
+    for title, names in sections.items():
+        print(f"  {title}: {len(names)}" + (f" ({', '.join(names[:10])}{', ...' if len(names) > 10 else ''})" if names else ""))
+    return sum(len(names) for title, names in sections.items() if title.startswith("Became"))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Audit repository compliance across the organization.")
+    parser.add_argument('--full', action='store_true', help="Re-check every repository, ignoring the previous report.")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     print(f"Starting Repository Audit for {ORG}...\n")
     repos = fetch_all_repos(ORG)
+    previous = load_previous()
+    checks = list(REQUIRED_PATHS)
     
-    report_data = []
+    stale = [r for r in repos if args.full or not is_current(previous.get(r['name']), r)]
+    print(f"{len(stale)}/{len(repos)} repositories changed since the last audit; re-checking those.\n")
     
     # Print Header
-    print(f"{'Repository':<30} | {'Topics':<8} | {'Desc':<8} | {'README':<8}")
-    print("-" * 65)
+    header = f"{'Repository':<30} | {'Topics':<8} | {'Desc':<8} | " + " | ".join(f"{c:<10}" for c in checks)
+    print(header)
+    print("-" * len(header))
     
-    compliance_score = 0
-    total_repos = len(repos)
+    writer = ReportWriter(checks)
+    current = {}
     
-    for repo in repos:
-        name = repo['name']
-        desc = repo.get('description', '')
-        topics = repo.get('repositoryTopics', []) or []
-        
-        has_topics = len(topics) > 0
-        has_desc = bool(desc)
-        has_readme = check_file_exists(ORG, name, "README.md")
-        # has_workflows = check_file_exists(ORG, name, ".github/workflows")
-
-        # Score
-        score = 0
-        if has_topics: score += 1
-        if has_desc: score += 1
-        if has_readme: score += 1
-        
+    def emit(r):
         # print specific status
-        t_icon = "✅" if has_topics else "❌"
-        d_icon = "✅" if has_desc else "❌"
-        r_icon = "✅" if has_readme else "❌"
-        
-        print(f"{name:<30} | {t_icon:<8} | {d_icon:<8} | {r_icon:<8}")
-        
-        if score == 3: compliance_score += 1
-        
-        report_data.append({
-            "name": name,
-            "has_topics": has_topics,
-            "has_desc": has_desc,
-            "has_readme": has_readme
-        })
-
-    print("-" * 65)
-    print(f"\n Compliance Summary: {compliance_score}/{total_repos} Repositories are Fully Compliant.")
+        t_icon = "✅" if r['has_topics'] else "❌"
+        d_icon = "✅" if r['has_desc'] else "❌"
+        file_icons = " | ".join(f"{'✅' if r['files'].get(c) else '❌':<10}" for c in checks)
+        print(f"{r['name']:<30} | {t_icon:<8} | {d_icon:<8} | {file_icons}" + (f" | error: {r['error']}" if r.get('error') else ""))
+        writer.write(r)
+        current[r['name']] = None if r.get('error') else r['compliant']
+    
+    stale_names = {r['name'] for r in stale}
+    for repo in repos:
+        if repo['name'] not in stale_names: emit(previous[repo['name']])
+    def on_result(outcome):
+        # A failed re-check keeps the previous result, or reports the error, rather than dropping the repo.
+        emit(outcome['result'] or previous.get(outcome['key']) or error_row(outcome['item'], outcome['error']))
+    
+    outcomes = fan_out("audit_repos", stale, lambda repo, log: audit_repo(repo), on_result=on_result, fingerprint=REQUIRED_PATHS)
+    for outcome in outcomes:
+        if outcome['resumed']: on_result(outcome)
     
-    # Generate Markdown Report
-    with open("compliance_report.md", "w", encoding='utf-8') as f:
-        f.write(f"# Compliance Report for {ORG}\n\n")
-        f.write(f"**Score**: {compliance_score}/{total_repos} ({int(compliance_score/total_repos*100) if total_repos > 0 else 0}%)\n\n")
-        f.write("| Repository | Topics | Description | README | Status |\n")
-        f.write("|------------|--------|-------------|--------|--------|\n")
-        for r in report_data:
-            status = "✅" if (r['has_topics'] and r['has_desc'] and r['has_readme']) else "⚠️"
-            f.write(f"| {r['name']} | {'✅' if r['has_topics'] else '❌'} | {'✅' if r['has_desc'] else '❌'} | {'✅' if r['has_readme'] else '❌'} | {status} |\n")
-            
-    print("Report saved to compliance_report.md")
+    print("-" * len(header))
+    print(f"\n Compliance Summary: {writer.compliant}/{writer.rows} Repositories are Fully Compliant."
+          + (f" {writer.errors} could not be checked." if writer.errors else ""))
+    writer.close()
+    print(f"Report saved to {REPORT_MD} ({REPORT_JSONL}, {REPORT_CSV})")
+    if previous: write_delta(previous, current)
 
 if __name__ == "__main__":
-    main()
+    try:
+        tracing.run(main)
+    finally:
+        rate_budget.report()
+        tracing.report()
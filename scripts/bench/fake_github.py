@@ -0,0 +1,699 @@
+"""Local stand-in for the GitHub REST and GraphQL endpoints used by the org scripts.
+
+The server is seeded from a synthetic organization (repos, issues/PRs, one
+ProjectV2 board) and adds a configurable latency to every call, so the scripts
+can be benchmarked at org scale without touching the real organization.
+
+    python scripts/bench/fake_github.py --repos 1000 --items 20000 --latency 0.05
+
+Point a script at it with GITHUB_API_URL / GITHUB_GRAPHQL_URL and any GH_TOKEN.
+`GET /_bench/stats` returns call counts and GraphQL cost; `POST /_bench/reset`
+clears them.
+"""
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from minigql import GraphQLError, execute
+
+RATE_LIMIT = 5000
+STATUS_OPTIONS = ["Todo", "In Progress", "Done"]
+PRIORITY_OPTIONS = ["P0", "P1", "P2", "P3"]
+LABEL_NAMES = ["bug", "enhancement", "documentation", "critical", "high", "feature", "ai-pending", "ai-assigned", "ai-resolved", "question"]
+TOPIC_POOL = ["infrastructure", "automation", "docker", "python", "homelab", "api", "web", "ai"]
+CI_WORKFLOW = """name: CI
+
+on:
+  push:
+    branches: [ "main" ]
+  pull_request:
+    branches: [ "main" ]
+  workflow_dispatch:
+
+jobs:
+  governance:
+    uses: atnplex/legacy-actions/.github/workflows/reusable-governance.yml@main
+"""
+
+def iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def blob_sha(content):
+    data = content.encode('utf-8')
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+# GitHub reports the true issueCount/total_count but only pages through this many results.
+SEARCH_RESULT_CAP = 1000
+
+def in_range(value, spec):
+    """Match an ISO timestamp against a search range: A..B, >=A, >A, <=A, <A or A."""
+    if '..' in spec:
+        low, _, high = spec.partition('..')
+        return (low in ('', '*') or value >= low) and (high in ('', '*') or value <= high)
+    for op, test in (('>=', lambda a, b: a >= b), ('<=', lambda a, b: a <= b), ('>', lambda a, b: a > b), ('<', lambda a, b: a < b)):
+        if spec.startswith(op): return test(value, spec[len(op):])
+    return value.startswith(spec)
+
+def connection(items, view=lambda x: x):
+    """Cursor connection over a sequence; cursors are plain offsets."""
+    def resolve(first=100, after=None, **_):
+        start = int(after) if after else 0
+        page = items[start:start + first]
+        end = start + len(page)
+        return {
+            "nodes": [view(x) for x in page],
+            "totalCount": len(items),
+            "pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end) if page else after},
+        }
+    return resolve
+
+class SyntheticOrg:
+    """Deterministic synthetic organization: repos, issues/PRs and one project board."""
+
+    def __init__(self, org="atnplex", repos=1000, items=20000, orphans=0.05, seed=1):
+        rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.org = org
+        self.now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        self.repos = {}
+        self.issues = {}
+        self.nodes = {}
+        self.repo_order = []
+        self.last_comment_id = 0
+
+        for r in range(repos):
+            name = f"repo-{r:04d}" if r % 7 else f"{rng.choice(['infra', 'ai', 'docs', 'api', 'web'])}-{r:04d}"
+            files = {}
+            if rng.random() < 0.8: files["README.md"] = f"# {name}\n"
+            if rng.random() < 0.4: files["LICENSE"] = "MIT\n"
+            if rng.random() < 0.5:
+                # Most deployed workflows match the template; some have drifted.
+                files[".github/workflows/ci.yml"] = CI_WORKFLOW if rng.random() < 0.8 else CI_WORKFLOW.replace("@main", "@v1")
+            if rng.random() < 0.3: files[".github/CODEOWNERS"] = "* @atnplex/maintainers\n"
+            if rng.random() < 0.2: files["SECURITY.md"] = "# Security Policy\n"
+            for i in range(rng.randint(0, 20)): files[f"src/module_{i}.py"] = f"# module {i}\n"
+            repo = {
+                "id": f"R_{r}", "name": name, "owner": org,
+                "description": f"Synthetic repository {name}" if rng.random() < 0.7 else "",
+                "topics": rng.sample(TOPIC_POOL, rng.randint(0, 3)),
+                "default_branch": "main",
+                "pushed_at": iso(self.now - datetime.timedelta(days=rng.randint(0, 400))),
+                "archived": rng.random() < 0.05,
+                "files": files,
+                "labels": {label: f"LA_{r}_{i}" for i, label in enumerate(LABEL_NAMES)},
+                "issues": [],
+            }
+            repo["updated_at"] = repo["pushed_at"]
+            self.repos[name] = repo
+            self.repo_order.append(name)
+            self.nodes[repo["id"]] = ("repo", name)
+
+        total_content = int(items * (1 + orphans))
+        for c in range(total_content):
+            repo = self.repos[self.repo_order[rng.randrange(repos)]]
+            typename = "PullRequest" if rng.random() < 0.3 else "Issue"
+            state = rng.choices(["OPEN", "CLOSED", "MERGED" if typename == "PullRequest" else "CLOSED"], [0.6, 0.2, 0.2])[0]
+            issue = {
+                "id": f"{'PR' if typename == 'PullRequest' else 'I'}_{c}", "typename": typename,
+                "number": len(repo["issues"]) + 1, "repo": repo["name"],
+                "title": f"{typename} {c} in {repo['name']}", "body": f"Synthetic body {c}",
+                "state": state,
+                "labels": rng.sample(LABEL_NAMES[:6], rng.randint(0, 2)) + ["ai-pending"] * (c % 50 == 0) + ["ai-assigned"] * (c % 50 == 25),
+                "assignees": ["octocat"] if rng.random() < 0.2 else [],
+                "author": "octocat",
+                "updated_at": iso(self.now - datetime.timedelta(days=rng.randint(0, 90), minutes=rng.randint(0, 1440))),
+                "comments": [],
+            }
+            # Derived rather than drawn from rng, so existing orgs generate identically.
+            issue["created_at"] = iso(datetime.datetime.fromisoformat(issue["updated_at"].replace('Z', '+00:00'))
+                                      - datetime.timedelta(days=c % 700, seconds=c))
+            repo["issues"].append(issue["id"])
+            self.issues[issue["id"]] = issue
+            self.nodes[issue["id"]] = ("issue", issue["id"])
+
+        self.fields = [
+            {"id": "PVTF_title", "name": "Title", "dataType": "TITLE", "options": None},
+            {"id": "PVTSSF_status", "name": "Status", "dataType": "SINGLE_SELECT",
+             "options": [{"id": f"opt_status_{i}", "name": n} for i, n in enumerate(STATUS_OPTIONS)]},
+            {"id": "PVTSSF_priority", "name": "Priority", "dataType": "SINGLE_SELECT",
+             "options": [{"id": f"opt_priority_{i}", "name": n} for i, n in enumerate(PRIORITY_OPTIONS)]},
+        ]
+        self.project = {"id": "PVT_1", "number": 4, "items": [], "by_content": {}}
+        self.nodes["PVT_1"] = ("project", None)
+        for content_id in list(self.issues)[:items]:
+            values = {}
+            if rng.random() < 0.7: values["Status"] = rng.choice(STATUS_OPTIONS)
+            if rng.random() < 0.5: values["Priority"] = rng.choice(PRIORITY_OPTIONS)
+            self.add_item(content_id, values)
+
+    # --- Mutable state helpers ---
+
+    def add_item(self, content_id, values=None):
+        with self.lock:
+            if content_id in self.project["by_content"]:
+                return self.project["by_content"][content_id]
+            item = {"id": f"PVTI_{len(self.project['items'])}", "content_id": content_id,
+                    "updated_at": iso(self.now), "values": values or {}}
+            self.project["items"].append(item)
+            self.project["by_content"][content_id] = item
+            self.nodes[item["id"]] = ("item", item)
+            return item
+
+    def ordered_repos(self, order_by):
+        if not order_by: return self.repo_order
+        key = {"UPDATED_AT": "updated_at", "PUSHED_AT": "pushed_at", "NAME": "name"}.get(order_by.get("field"), "name")
+        return sorted(self.repo_order, key=lambda n: self.repos[n][key], reverse=order_by.get("direction") == "DESC")
+
+    def field(self, field_id):
+        return next((f for f in self.fields if f["id"] == field_id), None)
+
+    def touch(self, record):
+        record["updated_at"] = iso(datetime.datetime.now(datetime.timezone.utc))
+
+    # --- GraphQL views ---
+
+    def field_view(self, f):
+        view = {"__typename": "ProjectV2SingleSelectField" if f["options"] else "ProjectV2Field",
+                "__interfaces": ("ProjectV2FieldCommon",), "id": f["id"], "name": f["name"], "dataType": f["dataType"]}
+        if f["options"]: view["options"] = lambda **_: f["options"]
+        return view
+
+    def owner_view(self, login):
+        return {"__typename": "Organization", "login": login}
+
+    def repo_view(self, repo):
+        def issues_of(typename):
+            def resolve(states=None, first=100, after=None, **_):
+                ids = [i for i in repo["issues"] if self.issues[i]["typename"] == typename
+                       and (not states or self.issues[i]["state"] in states)]
+                return connection(ids, lambda i: self.issue_view(self.issues[i]))(first=first, after=after)
+            return resolve
+        return {
+            "__typename": "Repository", "id": repo["id"], "name": repo["name"],
+            "nameWithOwner": f"{repo['owner']}/{repo['name']}", "owner": self.owner_view(repo["owner"]),
+            "description": repo["description"] or None,
+            "pushedAt": repo["pushed_at"], "updatedAt": repo["updated_at"], "isArchived": repo["archived"],
+            "defaultBranchRef": {"name": repo["default_branch"]},
+            "repositoryTopics": connection(repo["topics"], lambda t: {"topic": {"name": t}}),
+            "issues": issues_of("Issue"),
+            "pullRequests": issues_of("PullRequest"),
+            "label": lambda name: {"id": repo["labels"][name], "name": name} if name in repo["labels"] else None,
+        }
+
+    def issue_view(self, issue):
+        repo = self.repos[issue["repo"]]
+        return {
+            "__typename": issue["typename"], "id": issue["id"], "number": issue["number"],
+            "title": issue["title"], "body": issue["body"], "state": issue["state"],
+            "updatedAt": issue["updated_at"],
+            "url": f"https://github.com/{repo['owner']}/{repo['name']}/issues/{issue['number']}",
+            "author": {"login": issue["author"]},
+            "repository": {"name": repo["name"], "nameWithOwner": f"{repo['owner']}/{repo['name']}",
+                           "owner": self.owner_view(repo["owner"])},
+            "labels": connection(issue["labels"], lambda n: {"name": n}),
+            "assignees": connection(issue["assignees"], lambda a: {"login": a}),
+            "projectItems": lambda first=100, after=None, **_: connection(
+                [self.project["by_content"][issue["id"]]] if issue["id"] in self.project["by_content"] else [],
+                self.item_view)(first=first, after=after),
+        }
+
+    def item_view(self, item):
+        def field_values(first=100, after=None, **_):
+            values = []
+            for f in self.fields:
+                if f["name"] in item["values"]:
+                    values.append({"__typename": "ProjectV2ItemFieldSingleSelectValue",
+                                   "name": item["values"][f["name"]], "field": self.field_view(f)})
+            return connection(values)(first=first, after=after)
+        content = self.issues.get(item["content_id"])
+        return {
+            "__typename": "ProjectV2Item", "id": item["id"], "updatedAt": item["updated_at"],
+            "project": {"id": self.project["id"]},
+            "content": self.issue_view(content) if content else None,
+            "fieldValues": field_values,
+        }
+
+    def project_view(self):
+        return {
+            "__typename": "ProjectV2", "id": self.project["id"], "number": self.project["number"],
+            "fields": connection(self.fields, self.field_view),
+            "items": connection(self.project["items"], self.item_view),
+        }
+
+    def node_view(self, node_id):
+        kind, ref = self.nodes.get(node_id, (None, None))
+        if kind == "repo": return self.repo_view(self.repos[ref])
+        if kind == "issue": return self.issue_view(self.issues[ref])
+        if kind == "item": return self.item_view(ref)
+        if kind == "project": return self.project_view()
+        return None
+
+    def search(self, query):
+        """Evaluate the issue-search qualifiers the scripts use; returns matching issue dicts."""
+        terms = query.split()
+        result = []
+        for issue in self.issues.values():
+            repo = self.repos[issue["repo"]]
+            ok = True
+            for term in terms:
+                negate = term.startswith('-')
+                key, _, value = term.lstrip('-').partition(':')
+                if key == 'org': match = repo["owner"] == value
+                elif key == 'is' and value in ('issue', 'pr'): match = issue["typename"] == ("Issue" if value == 'issue' else "PullRequest")
+                elif key in ('is', 'state') and value in ('open', 'closed'): match = (issue["state"] == "OPEN") == (value == 'open')
+                elif key == 'label': match = value.strip('"') in issue["labels"]
+                elif key == 'project': match = issue["id"] in self.project["by_content"]
+                elif key == 'updated': match = in_range(issue["updated_at"], value)
+                elif key == 'created': match = in_range(issue.get("created_at", issue["updated_at"]), value)
+                elif key == 'repo': match = f"{repo['owner']}/{repo['name']}" == value
+                else: match = True
+                if match == negate:
+                    ok = False
+                    break
+            if ok: result.append(issue)
+        return result
+
+    def query_root(self, cost, remaining, reset_at):
+        def search(query, type=None, first=100, after=None, **_):
+            matches = self.search(query)
+            page = connection(matches[:SEARCH_RESULT_CAP], self.issue_view)(first=first, after=after)
+            page["issueCount"] = len(matches)
+            return page
+        return {
+            "organization": lambda login: {
+                "login": login,
+                "projectV2": lambda number: self.project_view() if number == self.project["number"] else None,
+                "repositories": lambda first=100, after=None, orderBy=None, **_: connection(
+                    self.ordered_repos(orderBy), lambda n: self.repo_view(self.repos[n]))(first=first, after=after),
+            } if login == self.org else None,
+            "repository": lambda owner, name: self.repo_view(self.repos[name]) if owner == self.org and name in self.repos else None,
+            "node": lambda id: self.node_view(id),
+            "nodes": lambda ids: [self.node_view(i) for i in ids],
+            "search": search,
+            "rateLimit": {"cost": cost, "remaining": remaining, "limit": RATE_LIMIT, "resetAt": iso(reset_at)},
+        }
+
+    def mutation_root(self):
+        def update_field(input):
+            with self.lock:
+                kind, item = self.nodes.get(input.get("itemId"), (None, None))
+                if kind != "item": raise GraphQLError(f"Could not resolve to a node with the global id of '{input.get('itemId')}'")
+                field = self.field(input.get("fieldId"))
+                if not field: raise GraphQLError(f"Could not resolve to a field with the global id of '{input.get('fieldId')}'")
+                option_id = (input.get("value") or {}).get("singleSelectOptionId")
+                option = next((o for o in field["options"] or [] if o["id"] == option_id), None)
+                if not option: raise GraphQLError(f"The single select option Id does not belong to the field")
+                item["values"][field["name"]] = option["name"]
+                self.touch(item)
+                return {"projectV2Item": {"id": item["id"]}}
+
+        def add_item(input):
+            if input.get("contentId") not in self.issues:
+                raise GraphQLError(f"Could not resolve to a node with the global id of '{input.get('contentId')}'")
+            return {"item": {"id": self.add_item(input["contentId"])["id"]}}
+
+        def edit_labels(adding):
+            def resolve(input):
+                with self.lock:
+                    issue = self.issues.get(input.get("labelableId"))
+                    if not issue: raise GraphQLError("Could not resolve labelable")
+                    names = {v: k for k, v in self.repos[issue["repo"]]["labels"].items()}
+                    for label_id in input.get("labelIds") or []:
+                        if label_id not in names: raise GraphQLError(f"Could not resolve label '{label_id}'")
+                        if adding and names[label_id] not in issue["labels"]: issue["labels"].append(names[label_id])
+                        if not adding and names[label_id] in issue["labels"]: issue["labels"].remove(names[label_id])
+                    self.touch(issue)
+                    return {"clientMutationId": input.get("clientMutationId")}
+            return resolve
+
+        def update_topics(input):
+            kind, name = self.nodes.get(input.get("repositoryId"), (None, None))
+            if kind != "repo": raise GraphQLError("Could not resolve repository")
+            self.repos[name]["topics"] = list(input.get("topicNames") or [])
+            self.touch(self.repos[name])
+            return {"repository": {"id": input["repositoryId"]}, "invalidTopicNames": []}
+
+        def update_repository(input):
+            kind, name = self.nodes.get(input.get("repositoryId"), (None, None))
+            if kind != "repo": raise GraphQLError("Could not resolve repository")
+            if "description" in input: self.repos[name]["description"] = input["description"]
+            self.touch(self.repos[name])
+            return {"repository": {"id": input["repositoryId"]}}
+
+        return {
+            "updateProjectV2ItemFieldValue": update_field,
+            "addProjectV2ItemById": add_item,
+            "addLabelsToLabelable": edit_labels(True),
+            "removeLabelsFromLabelable": edit_labels(False),
+            "updateTopics": update_topics,
+            "updateRepository": update_repository,
+        }
+
+    # --- REST views ---
+
+    def rest_repo(self, repo):
+        return {
+            "id": int(repo["id"].split('_')[1]), "node_id": repo["id"], "name": repo["name"],
+            "full_name": f"{repo['owner']}/{repo['name']}", "description": repo["description"] or None,
+            "topics": repo["topics"], "default_branch": repo["default_branch"], "archived": repo["archived"],
+            "pushed_at": repo["pushed_at"], "updated_at": repo["updated_at"],
+        }
+
+    def rest_issue(self, issue):
+        repo = self.repos[issue["repo"]]
+        full_name = f"{repo['owner']}/{repo['name']}"
+        return {
+            "node_id": issue["id"], "number": issue["number"], "title": issue["title"], "body": issue["body"],
+            "state": "open" if issue["state"] == "OPEN" else "closed", "updated_at": issue["updated_at"],
+            "labels": [{"name": n} for n in issue["labels"]],
+            "repository_url": f"https://api.github.com/repos/{full_name}",
+            "html_url": f"https://github.com/{full_name}/issues/{issue['number']}",
+            **({"pull_request": {"url": f"https://api.github.com/repos/{full_name}/pulls/{issue['number']}"}}
+               if issue["typename"] == "PullRequest" else {}),
+        }
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.by_endpoint = {}
+        self.graphql_cost = 0
+        self.bytes_out = 0
+        self.window_reset = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+        self.spent = {"core": 0, "search": 0, "graphql": 0}
+
+    def record(self, endpoint, resource, cost, size):
+        with self.lock:
+            self.calls += 1
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+            self.spent[resource] = self.spent.get(resource, 0) + cost
+            if resource == 'graphql': self.graphql_cost += cost
+            self.bytes_out += size
+
+    def remaining(self, resource):
+        return max(0, RATE_LIMIT - self.spent.get(resource, 0))
+
+    def snapshot(self):
+        with self.lock:
+            return {"calls": self.calls, "graphql_cost": self.graphql_cost, "rate_spent": sum(self.spent.values()),
+                    "bytes_out": self.bytes_out,
+                    "by_endpoint": dict(sorted(self.by_endpoint.items(), key=lambda kv: -kv[1]))}
+
+def make_handler(org, stats, latency, faults=0.0, seed=1):
+    fault_rng = random.Random(seed)
+    fault_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, payload, endpoint, resource='core', cost=1, headers=None):
+            body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+            headers = dict(headers or {})
+            if self.command == 'GET' and status == 200 and resource != 'graphql':
+                # Like GitHub: every GET carries an ETag and a matching
+                # If-None-Match gets a free 304.
+                headers['ETag'] = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == headers['ETag']:
+                    status, body, cost, endpoint = 304, b'', 0, f"{endpoint} (304)"
+            if not endpoint.startswith('/_bench'):
+                stats.record(endpoint, resource, cost, len(body))
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('X-RateLimit-Limit', str(RATE_LIMIT))
+            self.send_header('X-RateLimit-Remaining', str(stats.remaining(resource)))
+            self.send_header('X-RateLimit-Reset', str(int(stats.window_reset.timestamp())))
+            self.send_header('X-RateLimit-Resource', resource)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length)) if length else None
+
+        def handle_any(self, method):
+            if latency: time.sleep(latency)
+            parsed = urllib.parse.urlsplit(self.path)
+            path = parsed.path
+            params = dict(urllib.parse.parse_qsl(parsed.query))
+            body = self.read_body() if method in ('POST', 'PUT', 'PATCH') else None
+
+            if path == '/_bench/stats': return self.reply(200, stats.snapshot(), path)
+            if path == '/_bench/reset':
+                stats.reset()
+                return self.reply(200, {}, path)
+            if faults:
+                with fault_lock:
+                    fault = fault_rng.random() < faults and fault_rng.choice(('502', '403'))
+                if fault == '502':
+                    return self.reply(502, {"message": "Server Error"}, "fault 502")
+                if fault == '403':
+                    # A secondary rate limit: rejected before doing anything, retry after a second.
+                    return self.reply(403, {"message": "You have exceeded a secondary rate limit."}, "fault 403",
+                                      cost=0, headers={"Retry-After": "1"})
+            if path == '/graphql' and method == 'POST': return self.graphql(body)
+
+            for pattern, handler in ROUTES:
+                match = re.fullmatch(pattern[1], path)
+                if match and pattern[0] == method:
+                    return handler(self, org, params, body, *[urllib.parse.unquote(g) for g in match.groups()])
+            self.reply(404, {"message": "Not Found"}, f"{method} {path}")
+
+        def graphql(self, body):
+            try:
+                def root_for(kind, cost):
+                    if kind == 'mutation': return org.mutation_root()
+                    return org.query_root(cost, stats.remaining('graphql') - cost, stats.window_reset)
+                response, kind, cost = execute(body.get('query', ''), body.get('variables') or {}, root_for)
+                endpoint = f"graphql {kind}"
+            except GraphQLError as e:
+                response, cost, endpoint = {"errors": [{"message": str(e)}]}, 1, "graphql error"
+            self.reply(200, response, endpoint, resource='graphql', cost=cost)
+
+        def do_GET(self): self.handle_any('GET')
+        def do_POST(self): self.handle_any('POST')
+        def do_PUT(self): self.handle_any('PUT')
+        def do_PATCH(self): self.handle_any('PATCH')
+        def do_DELETE(self): self.handle_any('DELETE')
+
+    return Handler
+
+# --- REST routes: (method, path regex) -> handler(request, org, params, body, *groups) ---
+
+def paginate(items, params):
+    per_page = int(params.get('per_page', 30))
+    page = int(params.get('page', 1))
+    return items[(page - 1) * per_page:page * per_page], per_page, page
+
+def link_header(path, params, page, has_next):
+    if not has_next: return {}
+    query = dict(params, page=str(page + 1))
+    return {"Link": f'<http://localhost{path}?{urllib.parse.urlencode(query)}>; rel="next"'}
+
+def list_org_repos(req, org, params, body, login):
+    if login != org.org: return req.reply(404, {"message": "Not Found"}, "GET /orgs/{org}/repos")
+    names, _, page = paginate(org.repo_order, params)
+    has_next = page * int(params.get('per_page', 30)) < len(org.repo_order)
+    req.reply(200, [org.rest_repo(org.repos[n]) for n in names], "GET /orgs/{org}/repos",
+              headers=link_header(f"/orgs/{login}/repos", params, page, has_next))
+
+def repo_or_404(req, org, owner, name, endpoint):
+    repo = org.repos.get(name) if owner == org.org else None
+    if not repo: req.reply(404, {"message": "Not Found"}, endpoint)
+    return repo
+
+def get_contents(req, org, params, body, owner, name, path):
+    endpoint = "GET /repos/{repo}/contents"
+    repo = repo_or_404(req, org, owner, name, endpoint)
+    if not repo: return
+    if path in repo["files"]:
+        content = repo["files"][path]
+        return req.reply(200, {"type": "file", "path": path, "sha": blob_sha(content), "encoding": "base64",
+                               "content": base64.b64encode(content.encode('utf-8')).decode('ascii')}, endpoint)
+    children = sorted({p[len(path) + 1:].split('/')[0] for p in repo["files"] if p.startswith(path + '/')})
+    if children:
+        return req.reply(200, [{"type": "file", "name": c, "path": f"{path}/{c}"} for c in children], endpoint)
+    req.reply(404, {"message": "Not Found"}, endpoint)
+
+def put_contents(req, org, params, body, owner, name, path):
+    endpoint = "PUT /repos/{repo}/contents"
+    repo = repo_or_404(req, org, owner, name, endpoint)
+    if not repo: return
+    with org.lock:
+        existing = repo["files"].get(path)
+        if existing is not None and body.get("sha") != blob_sha(existing):
+            return req.reply(409, {"message": f"{path} does not match {body.get('sha')}"}, endpoint)
+        if existing is None and body.get("sha"):
+            return req.reply(422, {"message": "sha supplied for a file that does not exist"}, endpoint)
+        content = base64.b64decode(body["content"]).decode('utf-8')
+        repo["files"][path] = content
+        repo["pushed_at"] = repo["updated_at"] = iso(datetime.datetime.now(datetime.timezone.utc))
+    req.reply(201 if existing is None else 200, {"content": {"path": path, "sha": blob_sha(content)},
+                                                  "commit": {"sha": hashlib.sha1(content.encode()).hexdigest()}}, endpoint)
+
+def get_tree(req, org, params, body, owner, name, ref):
+    endpoint = "GET /repos/{repo}/git/trees"
+    repo = repo_or_404(req, org, owner, name, endpoint)
+    if not repo: return
+    if ref != repo["default_branch"]: return req.reply(404, {"message": "Not Found"}, endpoint)
+    if not repo["files"]: return req.reply(409, {"message": "Git Repository is empty."}, endpoint)
+    entries = [{"path": p, "type": "blob", "mode": "100644", "sha": blob_sha(c), "size": len(c)}
+               for p, c in sorted(repo["files"].items())]
+    if params.get('recursive'):
+        dirs = sorted({p.rsplit('/', i)[0] for p in repo["files"] for i in range(1, p.count('/') + 1)})
+        entries += [{"path": d, "type": "tree", "mode": "040000"} for d in dirs]
+    else:
+        entries = [e for e in entries if '/' not in e["path"]]
+    req.reply(200, {"sha": blob_sha(ref), "tree": entries, "truncated": False}, endpoint)
+
+def search_issues(req, org, params, body):
+    matches = org.search(params.get('q', ''))
+    reachable = matches[:SEARCH_RESULT_CAP]
+    page_items, per_page, page = paginate(reachable, params)
+    req.reply(200, {"total_count": len(matches), "incomplete_results": False,
+                    "items": [org.rest_issue(i) for i in page_items]}, "GET /search/issues", resource='search',
+              headers=link_header("/search/issues", params, page, page * per_page < len(reachable)))
+
+def find_issue(org, owner, name, number):
+    repo = org.repos.get(name) if owner == org.org else None
+    if not repo: return None
+    return next((org.issues[i] for i in repo["issues"] if org.issues[i]["number"] == int(number)), None)
+
+def post_comment(req, org, params, body, owner, name, number):
+    issue = find_issue(org, owner, name, number)
+    if not issue: return req.reply(404, {"message": "Not Found"}, "POST /repos/{repo}/issues/{n}/comments")
+    with org.lock:
+        org.last_comment_id += 1
+        comment = {"id": org.last_comment_id, "body": body.get("body", ""),
+                   "created_at": iso(datetime.datetime.now(datetime.timezone.utc)), "user": {"login": "bench"}}
+        issue["comments"].append(comment)
+    req.reply(201, comment, "POST /repos/{repo}/issues/{n}/comments")
+
+def list_comments(req, org, params, body, owner, name, number):
+    issue = find_issue(org, owner, name, number)
+    if not issue: return req.reply(404, {"message": "Not Found"}, "GET /repos/{repo}/issues/{n}/comments")
+    comments, _, _ = paginate(issue["comments"], params)
+    req.reply(200, comments, "GET /repos/{repo}/issues/{n}/comments")
+
+def delete_comment(req, org, params, body, owner, name, comment_id):
+    repo = repo_or_404(req, org, owner, name, "DELETE /repos/{repo}/issues/comments/{id}")
+    if not repo: return
+    with org.lock:
+        for issue_id in repo["issues"]:
+            comments = org.issues[issue_id]["comments"]
+            match = next((c for c in comments if c["id"] == int(comment_id)), None)
+            if match:
+                comments.remove(match)
+                return req.reply(204, None, "DELETE /repos/{repo}/issues/comments/{id}")
+    req.reply(404, {"message": "Not Found"}, "DELETE /repos/{repo}/issues/comments/{id}")
+
+def add_labels(req, org, params, body, owner, name, number):
+    issue = find_issue(org, owner, name, number)
+    if not issue: return req.reply(404, {"message": "Not Found"}, "POST /repos/{repo}/issues/{n}/labels")
+    with org.lock:
+        for label in body.get("labels", []):
+            if label not in issue["labels"]: issue["labels"].append(label)
+        org.touch(issue)
+    req.reply(200, [{"name": n} for n in issue["labels"]], "POST /repos/{repo}/issues/{n}/labels")
+
+def remove_label(req, org, params, body, owner, name, number, label):
+    issue = find_issue(org, owner, name, number)
+    if not issue or label not in issue["labels"]:
+        return req.reply(404, {"message": "Label does not exist"}, "DELETE /repos/{repo}/issues/{n}/labels")
+    with org.lock:
+        issue["labels"].remove(label)
+        org.touch(issue)
+    req.reply(200, [{"name": n} for n in issue["labels"]], "DELETE /repos/{repo}/issues/{n}/labels")
+
+def get_issue(req, org, params, body, owner, name, number):
+    issue = find_issue(org, owner, name, number)
+    if not issue: return req.reply(404, {"message": "Not Found"}, "GET /repos/{repo}/issues/{n}")
+    req.reply(200, org.rest_issue(issue), "GET /repos/{repo}/issues/{n}")
+
+def put_topics(req, org, params, body, owner, name):
+    repo = repo_or_404(req, org, owner, name, "PUT /repos/{repo}/topics")
+    if not repo: return
+    repo["topics"] = list(body.get("names", []))
+    org.touch(repo)
+    req.reply(200, {"names": repo["topics"]}, "PUT /repos/{repo}/topics")
+
+def patch_repo(req, org, params, body, owner, name):
+    repo = repo_or_404(req, org, owner, name, "PATCH /repos/{repo}")
+    if not repo: return
+    if "description" in body: repo["description"] = body["description"]
+    org.touch(repo)
+    req.reply(200, org.rest_repo(repo), "PATCH /repos/{repo}")
+
+def get_repo(req, org, params, body, owner, name):
+    repo = repo_or_404(req, org, owner, name, "GET /repos/{repo}")
+    if repo: req.reply(200, org.rest_repo(repo), "GET /repos/{repo}")
+
+ROUTES = [
+    (('GET', r'/orgs/([^/]+)/repos'), list_org_repos),
+    (('GET', r'/repos/([^/]+)/([^/]+)/contents/(.+)'), get_contents),
+    (('PUT', r'/repos/([^/]+)/([^/]+)/contents/(.+)'), put_contents),
+    (('GET', r'/repos/([^/]+)/([^/]+)/git/trees/(.+)'), get_tree),
+    (('GET', r'/search/issues'), search_issues),
+    (('GET', r'/repos/([^/]+)/([^/]+)/issues/(\d+)'), get_issue),
+    (('GET', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/comments'), list_comments),
+    (('POST', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/comments'), post_comment),
+    (('POST', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/labels'), add_labels),
+    (('DELETE', r'/repos/([^/]+)/([^/]+)/issues/comments/(\d+)'), delete_comment),
+    (('DELETE', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/labels/([^/]+)'), remove_label),
+    (('PUT', r'/repos/([^/]+)/([^/]+)/topics'), put_topics),
+    (('PATCH', r'/repos/([^/]+)/([^/]+)'), patch_repo),
+    (('GET', r'/repos/([^/]+)/([^/]+)'), get_repo),
+]
+
+def serve(org, port=0, latency=0.0, host='127.0.0.1', faults=0.0):
+    """Start the fake API in a background thread; returns (server, stats).
+
+    `faults` is the fraction of calls answered with a 502 or a secondary
+    rate-limit 403 instead of being handled.
+    """
+    stats = Stats()
+    server = ThreadingHTTPServer((host, port), make_handler(org, stats, latency, faults))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic GitHub organization locally.")
+    parser.add_argument('--org', default='atnplex')
+    parser.add_argument('--repos', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added to every call.")
+    parser.add_argument('--faults', type=float, default=0.0, help="Fraction of calls failed with a 502 or a secondary rate limit.")
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Generating {args.repos} repos / {args.items} project items...")
+    org = SyntheticOrg(args.org, args.repos, args.items, seed=args.seed)
+    server, _ = serve(org, args.port, args.latency, faults=args.faults)
+    url = f"http://127.0.0.1:{server.server_port}"
+    print(f"Fake GitHub API listening on {url}")
+    print(f"  export GITHUB_API_URL={url} GITHUB_GRAPHQL_URL={url}/graphql GH_TOKEN=bench")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
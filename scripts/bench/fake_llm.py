@@ -0,0 +1,87 @@
+"""OpenAI-compatible stand-in for the LLM gateway, for benchmarks and local runs.
+
+    python scripts/bench/fake_llm.py --latency 2.0
+    export LLM_BASE_URL=http://127.0.0.1:8788/v1 AI_WORKER_KEY=bench
+
+Answers `POST /v1/chat/completions` after a fixed latency with a canned reply
+and word-count token usage; `GET /_bench/stats` returns the request count.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+def make_handler(stats, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/_bench/stats': return self.reply(200, stats.snapshot())
+            self.reply(404, {"error": {"message": "Not Found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not self.path.endswith('/chat/completions'):
+                return self.reply(404, {"error": {"message": "Not Found"}})
+            if latency: time.sleep(latency)
+            prompt = " ".join(m.get('content', '') for m in request.get('messages', []))
+            text = f"**AI Analysis**: (fake model) {len(prompt.split())} words read.\n\n**Proposed Action**: none."
+            usage = {"prompt_tokens": len(prompt.split()), "completion_tokens": len(text.split())}
+            with stats.lock:
+                stats.requests += 1
+                stats.prompt_tokens += usage['prompt_tokens']
+                stats.completion_tokens += usage['completion_tokens']
+            self.reply(200, {
+                "id": f"chatcmpl-{stats.requests}", "object": "chat.completion", "model": request.get('model'),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": dict(usage, total_tokens=sum(usage.values())),
+            })
+
+    return Handler
+
+def serve(port=0, latency=0.0, host='127.0.0.1'):
+    """Start the fake LLM in a background thread; returns (server, stats)."""
+    stats = Stats()
+    server = ThreadingHTTPServer((host, port), make_handler(stats, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI-compatible chat completions endpoint.")
+    parser.add_argument('--latency', type=float, default=2.0, help="Seconds per completion.")
+    parser.add_argument('--port', type=int, default=8788)
+    args = parser.parse_args()
+    server, _ = serve(args.port, args.latency)
+    print(f"Fake LLM listening on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
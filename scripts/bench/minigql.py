@@ -0,0 +1,207 @@
+"""Just enough GraphQL to serve the documents our scripts send to the fake GitHub API.
+
+Supports queries and mutations with variables, aliases, arguments (scalars, lists,
+input objects, enums), nested selection sets and inline fragments. There is no
+schema: resolvers return plain dicts, and dict values that are callables are
+treated as fields with arguments.
+"""
+import json
+import re
+
+TOKEN_RE = re.compile(r'''
+    (?P<skip>[\s,]+|\#[^\n]*)
+  | (?P<spread>\.\.\.)
+  | (?P<punct>[{}()\[\]:!$=@])
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+''', re.VERBOSE)
+
+class GraphQLError(Exception):
+    pass
+
+def tokenize(source):
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        match = TOKEN_RE.match(source, pos)
+        if not match: raise GraphQLError(f"Syntax error at offset {pos}: {source[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind != 'skip': tokens.append((kind, match.group()))
+    return tokens
+
+class Parser:
+    def __init__(self, source):
+        self.tokens = tokenize(source)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise GraphQLError(f"Expected {value!r}, got {token[1]!r}")
+        self.pos += 1
+        return token[1]
+
+    def parse_document(self):
+        """Return (operation type, variable defaults, selection set) for the single operation."""
+        kind = 'query'
+        defaults = {}
+        if self.peek()[1] in ('query', 'mutation'):
+            kind = self.take()
+            if self.peek()[0] == 'name': self.take()
+            if self.peek()[1] == '(': defaults = self.parse_variable_definitions()
+        return kind, defaults, self.parse_selection_set()
+
+    def parse_variable_definitions(self):
+        defaults = {}
+        self.take('(')
+        while self.peek()[1] != ')':
+            self.take('$')
+            name = self.take()
+            self.take(':')
+            self.parse_type()
+            if self.peek()[1] == '=':
+                self.take('=')
+                defaults[name] = self.parse_value()
+        self.take(')')
+        return defaults
+
+    def parse_type(self):
+        if self.peek()[1] == '[':
+            self.take('[')
+            self.parse_type()
+            self.take(']')
+        else:
+            self.take()
+        if self.peek()[1] == '!': self.take('!')
+
+    def parse_selection_set(self):
+        self.take('{')
+        selections = []
+        while self.peek()[1] != '}':
+            if self.peek()[0] == 'spread':
+                self.take()
+                self.take('on')
+                type_name = self.take()
+                selections.append(('fragment', type_name, self.parse_selection_set()))
+                continue
+            name = self.take()
+            alias = name
+            if self.peek()[1] == ':':
+                self.take(':')
+                name = self.take()
+            args = self.parse_arguments() if self.peek()[1] == '(' else {}
+            children = self.parse_selection_set() if self.peek()[1] == '{' else None
+            selections.append(('field', alias, name, args, children))
+        self.take('}')
+        return selections
+
+    def parse_arguments(self):
+        args = {}
+        self.take('(')
+        while self.peek()[1] != ')':
+            name = self.take()
+            self.take(':')
+            args[name] = self.parse_value()
+        self.take(')')
+        return args
+
+    def parse_value(self):
+        kind, value = self.peek()
+        if value == '$':
+            self.take('$')
+            return ('var', self.take())
+        if value == '[':
+            self.take('[')
+            items = []
+            while self.peek()[1] != ']': items.append(self.parse_value())
+            self.take(']')
+            return ('list', items)
+        if value == '{':
+            self.take('{')
+            fields = {}
+            while self.peek()[1] != '}':
+                key = self.take()
+                self.take(':')
+                fields[key] = self.parse_value()
+            self.take('}')
+            return ('object', fields)
+        self.take()
+        if kind == 'string': return ('const', json.loads(value))
+        if kind == 'number': return ('const', float(value) if '.' in value or 'e' in value.lower() else int(value))
+        if value in ('true', 'false'): return ('const', value == 'true')
+        if value == 'null': return ('const', None)
+        return ('const', value)  # enum
+
+def evaluate_value(value, variables):
+    kind, payload = value
+    if kind == 'var': return variables.get(payload)
+    if kind == 'list': return [evaluate_value(v, variables) for v in payload]
+    if kind == 'object': return {k: evaluate_value(v, variables) for k, v in payload.items()}
+    return payload
+
+def type_matches(obj, type_name):
+    return obj.get('__typename') == type_name or type_name in obj.get('__interfaces', ())
+
+def resolve_selection(obj, selections, variables, path, errors):
+    result = {}
+    for selection in selections:
+        if selection[0] == 'fragment':
+            if type_matches(obj, selection[1]):
+                result.update(resolve_selection(obj, selection[2], variables, path, errors))
+            continue
+        _, alias, name, args, children = selection
+        try:
+            value = obj.get(name)
+            if callable(value):
+                value = value(**{k: evaluate_value(v, variables) for k, v in args.items()})
+        except GraphQLError as e:
+            errors.append({"message": str(e), "path": path + [alias]})
+            result[alias] = None
+            continue
+        result[alias] = project(value, children, variables, path + [alias], errors)
+    return result
+
+def project(value, children, variables, path, errors):
+    if children is None or value is None: return value
+    if isinstance(value, list):
+        return [project(v, children, variables, path + [i], errors) for i, v in enumerate(value)]
+    return resolve_selection(value, children, variables, path, errors)
+
+def connection_requests(selections, variables, multiplier=1):
+    """Approximate GitHub's query cost: requests needed to fill every connection."""
+    total = 0
+    for selection in selections:
+        if selection[0] == 'fragment':
+            total += connection_requests(selection[2], variables, multiplier)
+            continue
+        _, _, _, args, children = selection
+        if not children: continue
+        first = evaluate_value(args['first'], variables) if 'first' in args else None
+        if first:
+            total += multiplier
+            total += connection_requests(children, variables, multiplier * first)
+        else:
+            total += connection_requests(children, variables, multiplier)
+    return total
+
+def execute(document, variables, root_for):
+    """Run a document; returns (response dict, operation type, cost).
+
+    `root_for(kind, cost)` supplies the root object, so a `rateLimit` field can
+    report the cost of the very query it is part of.
+    """
+    kind, defaults, selections = Parser(document).parse_document()
+    merged = {name: evaluate_value(value, {}) for name, value in defaults.items()}
+    merged.update(variables or {})
+    errors = []
+    cost = 1 if kind == 'mutation' else max(1, connection_requests(selections, merged) // 100)
+    data = resolve_selection(root_for(kind, cost), selections, merged, [], errors)
+    response = {"data": data}
+    if errors: response["errors"] = errors
+    return response, kind, cost
@@ -0,0 +1,206 @@
+"""Run the org scripts against the fake GitHub API and report how they scale.
+
+For every scenario a fresh synthetic org is served (unless the scenario reuses
+the previous one, e.g. an incremental gardener run), the script runs as a
+subprocess and the harness records wall time, API calls, GraphQL cost and the
+child's peak RSS.
+
+    python scripts/bench/run_bench.py --repos 1000 --items 20000 --latency 0.05
+    python scripts/bench/run_bench.py --output bench.json
+    python scripts/bench/run_bench.py --baseline bench.json --threshold 0.2
+
+With --baseline the run exits non-zero when any metric regressed by more than
+the threshold, so it can gate a deploy.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import fake_llm
+from fake_github import SyntheticOrg, serve
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCH_DIR)
+
+# (name, script, arguments, reuse the previous scenario's org and state)
+SCENARIOS = [
+    ("gardener", "project_gardener.py", ["--full"], False),
+    ("gardener-incremental", "project_gardener.py", [], True),
+    ("gardener-orphans", "project_gardener.py", ["--full"], False),
+    ("audit", "audit_repos.py", [], False),
+    ("audit-repeat", "audit_repos.py", [], True),
+    ("deploy", "deploy_workflows.py", [], False),
+    ("deploy-repeat", "deploy_workflows.py", [], True),
+    ("fix-compliance", "fix_compliance.py", [], False),
+    ("ai-worker", "ai_worker.py", [], False),
+    ("ai-worker-event", "ai_worker.py", [], False),
+]
+METRICS = ["wall_seconds", "api_calls", "rate_spent", "graphql_cost", "peak_rss_mb"]
+
+def issue_event_env(org, cwd):
+    """Simulate an `issues: labeled` run for the first open issue carrying the trigger label."""
+    issue = next(i for i in org.issues.values() if i["typename"] == "Issue" and i["state"] == "OPEN" and "ai-assigned" in i["labels"])
+    path = os.path.join(cwd, "event.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"action": "labeled", "label": {"name": "ai-assigned"}, "issue": org.rest_issue(issue)}, f)
+    return {"GITHUB_EVENT_NAME": "issues", "GITHUB_EVENT_PATH": path}
+
+# Extra environment for scenarios that need it: name -> f(org, cwd) -> env
+SCENARIO_ENV = {
+    "ai-worker-event": issue_event_env,
+}
+
+# Org generation overrides: name -> f(args) -> SyntheticOrg keyword arguments.
+SCENARIO_ORG = {
+    # Well over 1000 open orphans, past what one search can page through.
+    "gardener-orphans": lambda args: {"items": 2000, "orphans": 1.5},
+}
+
+def all_open_on_board(org):
+    """Every open issue/PR must be on the board after a full gardener run."""
+    missing = [i for i in org.issues.values() if i["state"] == "OPEN" and i["id"] not in org.project["by_content"]]
+    return f"{len(missing)} open issues/PRs missing from the board" if missing else None
+
+# Correctness checks run against the fake org after a scenario: name -> f(org) -> error or None
+SCENARIO_CHECKS = {
+    "gardener-orphans": all_open_on_board,
+}
+
+def run_script(script, args, env, cwd, timeout):
+    """Run one script; returns (exit code, wall seconds, peak RSS in MB)."""
+    log_path = os.path.join(cwd, f"{os.path.splitext(script)[0]}.log")
+    with open(log_path, 'a', encoding='utf-8') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, os.path.join(SCRIPTS_DIR, script)] + args,
+                                cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        deadline = start + timeout
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid: break
+            if time.perf_counter() > deadline:
+                proc.kill()
+                pid, status, usage = os.wait4(proc.pid, 0)
+                break
+            time.sleep(0.05)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux
+    return proc.returncode, wall, usage.ru_maxrss / 1024
+
+def run_benchmarks(args):
+    work_dir = tempfile.mkdtemp(prefix="gh-bench-")
+    results = []
+    org = server = None
+    generation = 0
+    llm_server, llm_stats = fake_llm.serve(latency=args.llm_latency)
+    selected = set(args.only.split(',')) if args.only else None
+
+    for name, script, script_args, reuse in SCENARIOS:
+        if selected and name not in selected: continue
+        if not reuse or org is None or name in SCENARIO_ORG:
+            if server: server.shutdown()
+            options = dict({"repos": args.repos, "items": args.items}, **SCENARIO_ORG.get(name, lambda a: {})(args))
+            print(f"[{name}] Generating {options['repos']} repos / {options['items']} items...")
+            org = SyntheticOrg(args.org, seed=args.seed, **options)
+            generation += 1
+            server, stats = serve(org, latency=args.latency, faults=args.faults)
+            url = f"http://127.0.0.1:{server.server_port}"
+        stats.reset()
+        cwd = os.path.join(work_dir, name)
+        os.makedirs(cwd, exist_ok=True)
+        os.makedirs(os.path.join(work_dir, f"audit-{generation}"), exist_ok=True)
+        env = dict(os.environ,
+                   GITHUB_API_URL=url, GITHUB_GRAPHQL_URL=f"{url}/graphql", GH_TOKEN="bench",
+                   GARDENER_STATE_DIR=os.path.join(work_dir, "gardener-state"),
+                   GH_HTTP_CACHE=os.path.join(work_dir, "http-cache.sqlite"),
+                   REPO_INVENTORY_DIR=os.path.join(work_dir, f"inventory-{generation}"),
+                   AUDIT_REPORT_DIR=os.path.join(work_dir, f"audit-{generation}"),
+                   LLM_BASE_URL=f"http://127.0.0.1:{llm_server.server_port}/v1", AI_WORKER_KEY="bench",
+                   LLM_CACHE=os.path.join(work_dir, "llm-cache.sqlite"),
+                   PYTHONUNBUFFERED="1")
+        env.pop('GITHUB_TOKEN', None)
+        for var in ('GITHUB_EVENT_NAME', 'GITHUB_EVENT_PATH'): env.pop(var, None)
+        if name in SCENARIO_ENV: env.update(SCENARIO_ENV[name](org, cwd))
+
+        print(f"[{name}] Running {script} {' '.join(script_args)}".rstrip())
+        llm_before = llm_stats.snapshot()['requests']
+        code, wall, rss = run_script(script, script_args, env, cwd, args.timeout)
+        snapshot = stats.snapshot()
+        check = SCENARIO_CHECKS[name](org) if name in SCENARIO_CHECKS else None
+        if check: print(f"[{name}] check failed: {check}")
+        results.append({
+            "name": name, "script": script, "exit_code": code,
+            "wall_seconds": round(wall, 2), "api_calls": snapshot['calls'], "rate_spent": snapshot['rate_spent'],
+            "graphql_cost": snapshot['graphql_cost'], "peak_rss_mb": round(rss, 1),
+            "llm_requests": llm_stats.snapshot()['requests'] - llm_before,
+            "top_endpoints": dict(list(snapshot['by_endpoint'].items())[:5]),
+            "check_error": check,
+        })
+        if code != 0: print(f"[{name}] exited with {code}; see {cwd}")
+
+    if server: server.shutdown()
+    llm_server.shutdown()
+    return {"config": {"repos": args.repos, "items": args.items, "latency": args.latency, "llm_latency": args.llm_latency, "faults": args.faults, "seed": args.seed},
+            "work_dir": work_dir, "results": results}
+
+def print_table(report):
+    print(f"\n{'Scenario':<22} | {'Exit':>4} | {'Wall (s)':>9} | {'API calls':>9} | {'Rate spent':>10} | {'GQL cost':>8} | {'RSS (MB)':>8}")
+    print("-" * 88)
+    for r in report['results']:
+        print(f"{r['name']:<22} | {r['exit_code']:>4} | {r['wall_seconds']:>9.2f} | {r['api_calls']:>9} | {r['rate_spent']:>10} | {r['graphql_cost']:>8} | {r['peak_rss_mb']:>8.1f}")
+
+def compare(report, baseline, threshold):
+    """Return a list of regression messages against a previous report."""
+    previous = {r['name']: r for r in baseline.get('results', [])}
+    regressions = []
+    for r in report['results']:
+        old = previous.get(r['name'])
+        if not old: continue
+        for metric in METRICS:
+            before, after = old.get(metric) or 0, r.get(metric) or 0
+            # Ignore noise on tiny values (sub-second wall times, a handful of calls).
+            if after > before * (1 + threshold) and after - before > (1 if metric == 'wall_seconds' else 5):
+                regressions.append(f"{r['name']}: {metric} {before} -> {after} (+{(after / before - 1) * 100 if before else 100:.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the org scripts against a fake GitHub API.")
+    parser.add_argument('--org', default='atnplex')
+    parser.add_argument('--repos', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added to every API call.")
+    parser.add_argument('--llm-latency', type=float, default=1.0, help="Seconds per fake LLM completion.")
+    parser.add_argument('--faults', type=float, default=0.0, help="Fraction of API calls failed with a 502 or a secondary rate limit.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', help="Comma-separated scenario names to run.")
+    parser.add_argument('--timeout', type=float, default=3600, help="Per-scenario timeout in seconds.")
+    parser.add_argument('--output', help="Write the JSON report here.")
+    parser.add_argument('--baseline', help="Previous JSON report to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed regression as a fraction (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args)
+    print_table(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    failed = [r['name'] for r in report['results'] if r['exit_code'] != 0 or r.get('check_error')]
+    if failed: print(f"\nScenarios failed: {', '.join(failed)} (logs in {report['work_dir']})")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions: print(f"  - {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+    if failed: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
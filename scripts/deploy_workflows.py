@@ -1,41 +1,23 @@
-import os
-import subprocess
-import json
 import base64
-import sys
+import difflib
+import hashlib
+
+import rate_budget
+import tracing
+from fanout import fan_out
+from github_client import quote, rest
+from repo_inventory import load_repos, mark_stale
 
 # Configuration
 ORG = "atnplex"
 REUSABLE_WORKFLOW = "atnplex/legacy-actions/.github/workflows/reusable-governance.yml@main"
 DRY_RUN = False # Set to True to verify first
-
-def run_command(command, use_shell=False, input_text=None):
-    """Run a shell command and return the output."""
-    try:
-        if isinstance(command, list):
-            use_shell = False
-        result = subprocess.run(
-            command,
-            cwd=os.getcwd(), 
-            shell=use_shell,
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            input=input_text
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        # print(f"Error running command: {command}")
-        # print(f"Stderr: {e.stderr}")
-        return None
+# Lines of drift shown per repo before the workflow is overwritten
+DIFF_PREVIEW_LINES = 6
 
 def fetch_all_repos(org):
     print(f"Fetching all repositories for {org}...")
-    cmd = ['gh', 'repo', 'list', org, '--limit', '1000', '--json', 'name,defaultBranchRef']
-    output = run_command(cmd)
-    if output: return json.loads(output)
-    return []
+    return load_repos(org)
 
 def create_workflow_file(repo_name, default_branch):
     content = f"""name: CI
@@ -53,16 +35,28 @@ jobs:
 """
     return content
 
-def deploy_to_repo(repo):
+def git_blob_sha(content):
+    """SHA GitHub reports for a file with this content (sha1 of the git blob object)."""
+    data = content.encode('utf-8')
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def drift_summary(current, desired, max_lines=DIFF_PREVIEW_LINES):
+    """Short unified diff of the deployed file against the rendered one."""
+    diff = list(difflib.unified_diff(current.splitlines(), desired.splitlines(), 'deployed', 'rendered', lineterm='', n=0))
+    added = sum(1 for l in diff if l.startswith('+') and not l.startswith('+++'))
+    removed = sum(1 for l in diff if l.startswith('-') and not l.startswith('---'))
+    preview = [l for l in diff[2:] if not l.startswith('@@')][:max_lines]
+    return f"+{added}/-{removed} lines", preview
+
+def deploy_to_repo(repo, log=print):
+    """Deploy the workflow to one repo; returns the outcome (created, updated, unchanged, skipped, failed, dry-run)."""
     name = repo['name']
-    default_branch = repo.get('defaultBranchRef', {}).get('name', 'main')
+    default_branch = (repo.get('defaultBranchRef') or {}).get('name') or 'main'
     
     # Skip infrastructure and legacy-actions (they manage themselves)
     if name in ['infrastructure', 'legacy-actions', '.github']:
-        print(f"Skipping special repo {name}")
-        return
-
-    print(f"Deploying to {name} (branch: {default_branch})...")
+        log(f"Skipping special repo {name}")
+        return "skipped"
 
     workflow_content = create_workflow_file(name, default_branch)
     
@@ -71,14 +65,21 @@ def deploy_to_repo(repo):
     
     # 1. Get SHA if exists
     sha = None
-    try:
-        cmd_get = ['gh', 'api', f'/repos/{ORG}/{name}/contents/{file_path}']
-        output = run_command(cmd_get)
-        if output:
-            data = json.loads(output)
-            sha = data.get('sha')
-    except:
-        pass # File doesn't exist
+    existing = rest('GET', f'/repos/{ORG}/{name}/contents/{file_path}?ref={quote(default_branch)}')
+    if existing:
+        sha = existing.get('sha')
+
+    # Identical content has the identical blob SHA: nothing to commit, no CI run to trigger.
+    if sha == git_blob_sha(workflow_content):
+        log(f"{name}: up to date.")
+        return "unchanged"
+
+    log(f"Deploying to {name} (branch: {default_branch})...")
+    if sha and existing.get('encoding') == 'base64':
+        current = base64.b64decode(existing.get('content', '')).decode('utf-8', errors='replace')
+        summary, preview = drift_summary(current, workflow_content)
+        log(f"  -> Drift: {summary}")
+        for line in preview: log(f"     {line}")
         
     # 2. Update/Create
     content_b64 = base64.b64encode(workflow_content.encode('utf-8')).decode('utf-8')
@@ -90,26 +91,34 @@ def deploy_to_repo(repo):
     }
     if sha:
         data["sha"] = sha
-        print(f"  -> Updating existing workflow...")
+        log(f"  -> Updating existing workflow...")
     else:
-        print(f"  -> Creating new workflow...")
+        log(f"  -> Creating new workflow...")
         
     if not DRY_RUN:
-        cmd_put = ['gh', 'api', f'/repos/{ORG}/{name}/contents/{file_path}', '-X', 'PUT', '--input', '-']
-        # Use input_text argument for run_command to pass JSON body
-        result = run_command(cmd_put, input_text=json.dumps(data))
+        result = rest('PUT', f'/repos/{ORG}/{name}/contents/{file_path}', data)
         if result:
-            print(f"  -> Success.")
-        else:
-            print(f"  -> Failed.")
-    else:
-        print(f"  -> [DRY RUN] Would deploy.")
+            log(f"  -> Success.")
+            return "updated" if sha else "created"
+        log(f"  -> Failed.")
+        return "failed"
+    log(f"  -> [DRY RUN] Would deploy.")
+    return "dry-run"
 
 def main():
     print("Starting Workflow Deployment...")
     repos = fetch_all_repos(ORG)
-    for repo in repos:
-        deploy_to_repo(repo)
+    outcomes = {}
+    for outcome in fan_out("deploy_workflows", repos, deploy_to_repo, journal=not DRY_RUN,
+                           fingerprint=create_workflow_file("{repo}", "{branch}")):
+        result = outcome['result'] if not outcome['error'] else "failed"
+        outcomes[result] = outcomes.get(result, 0) + 1
+    if outcomes.get("created") or outcomes.get("updated"): mark_stale(ORG)
+    print("\nDeployment summary: " + ", ".join(f"{k}: {v}" for k, v in sorted(outcomes.items())))
 
 if __name__ == "__main__":
-    main()
+    try:
+        tracing.run(main)
+    finally:
+        rate_budget.report()
+        tracing.report()
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import tracing
+
+# Per-repo work in the org scripts is independent and I/O bound.
+CONCURRENCY = int(os.getenv('FANOUT_CONCURRENCY', '8'))
+# A repo still running after this many seconds is reported as timed out.
+TASK_TIMEOUT = float(os.getenv('FANOUT_TIMEOUT', '300'))
+# Journals of completed repos; an interrupted run resumes from here.
+JOURNAL_DIR = os.getenv('FANOUT_JOURNAL_DIR', '.fanout')
+# A journal older than this (from the first run that wrote it) is not resumed;
+# 0 never resumes. Completed entries must not outlive the state they describe.
+JOURNAL_TTL = float(os.getenv('FANOUT_JOURNAL_TTL', str(6 * 3600)))
+
+def inputs_hash(items, key, fingerprint=None):
+    """Hash of a run's inputs: every item (with its key) plus the caller's fingerprint."""
+    digest = hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode('utf-8'))
+    for item in items:
+        digest.update(json.dumps([key(item), item], sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+class Journal:
+    """Append-only JSONL record of completed keys and their results.
+
+    The file is removed once a run finishes without failures, so only an
+    interrupted or partly failed run leaves one behind to resume from. Its
+    first line records when the journal was started and the hash of the run's
+    inputs; a journal for other inputs, or older than `ttl`, is discarded
+    instead of resumed.
+    """
+
+    def __init__(self, path, inputs, ttl=JOURNAL_TTL):
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = {}
+        header, entries = self.load(path)
+        if header and header.get('inputs') == inputs and time.time() - header.get('started_at', 0) < ttl:
+            self.completed = entries
+        else:
+            if header or entries:
+                if not header: reason = "no header"
+                elif header.get('inputs') != inputs: reason = "inputs changed"
+                else: reason = "expired"
+                print(f"[fanout] Ignoring journal {path} ({reason}); starting over.")
+            header = {"started_at": time.time(), "inputs": inputs}
+            if os.path.exists(path): os.remove(path)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fresh = not os.path.exists(path)
+        self.file = open(path, 'a', encoding='utf-8')
+        if fresh:
+            self.file.write(json.dumps({"header": header}) + "\n")
+            self.file.flush()
+
+    @staticmethod
+    def load(path):
+        """Return (header, {key: result}) of an existing journal (None, {} if there is none)."""
+        header, entries = None, {}
+        if not os.path.exists(path): return header, entries
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                if 'header' in entry: header = entry['header']
+                else: entries[entry['key']] = entry.get('result')
+        return header, entries
+
+    def record(self, key, result):
+        with self.lock:
+            self.file.write(json.dumps({"key": key, "result": result}) + "\n")
+            self.file.flush()
+
+    def finish(self):
+        self.file.close()
+        os.remove(self.path)
+
+    def close(self):
+        self.file.close()
+
+def task_log(lines):
+    """print()-like function that collects one task's output in `lines`."""
+    def log(*args, sep=' ', end='\n'):
+        lines.append(sep.join(str(a) for a in args) + end)
+    return log
+
+def fan_out(name, items, work, key=lambda item: item['name'], concurrency=CONCURRENCY,
+            timeout=TASK_TIMEOUT, on_result=None, journal=True, fingerprint=None):
+    """Run `work(item, log)` for every item on a pool of worker threads.
+
+    Returns one {key, item, result, error, resumed} dict per item, in input
+    order. Items already completed in the journal of an interrupted `name` run
+    are not run again; their journaled result is returned instead, so results
+    must be JSON-serializable. Failures and timeouts are not journaled and are
+    retried on the next run. A journal is only resumed by a run with the same
+    items and `fingerprint` (anything else the results depend on, e.g. a
+    rendered template) within JOURNAL_TTL of the run that started it.
+    `on_result(outcome)` is called on the main thread as each item finishes.
+
+    `log` is a print()-like function whose lines are printed together when
+    the item finishes, so concurrent items do not interleave their progress.
+    A task still running after `timeout` seconds is abandoned: it is reported
+    as timed out, a fresh worker takes its place, and its thread is left to
+    finish on its own. Workers are daemon threads, so an abandoned task never
+    holds up interpreter exit.
+    """
+    journal = Journal(os.path.join(JOURNAL_DIR, f"{name}.jsonl"), inputs_hash(items, key, fingerprint)) if journal else None
+    outcomes = [None] * len(items)
+    resumed = 0
+    for index, item in enumerate(items):
+        if journal and key(item) in journal.completed:
+            outcomes[index] = {"key": key(item), "item": item, "result": journal.completed[key(item)], "error": None, "resumed": True}
+            resumed += 1
+    if resumed: print(f"[{name}] Resuming: {resumed}/{len(items)} already completed in {journal.path}.")
+
+    tasks, results = queue.Queue(), queue.Queue()
+    started, output = {}, {}
+
+    def worker():
+        while True:
+            entry = tasks.get()
+            if entry is None: return
+            index, item = entry
+            lines = output[index] = []
+            started[index] = time.monotonic()
+            try:
+                with tracing.span(name, "task", key=key(item)):
+                    results.put((index, work(item, task_log(lines)), None))
+            except BaseException as e:
+                results.put((index, None, f"{type(e).__name__}: {e}"))
+
+    workers = []
+    def add_worker():
+        thread = threading.Thread(target=worker, name=f"{name}_{len(workers)}", daemon=True)
+        workers.append(thread)
+        thread.start()
+
+    def finish(index, result, error):
+        text = ''.join(output.pop(index, None) or [])
+        if text: sys.stdout.write(text)
+        outcome = {"key": key(items[index]), "item": items[index], "result": result, "error": error, "resumed": False}
+        outcomes[index] = outcome
+        if journal and error is None: journal.record(outcome['key'], result)
+        if on_result: on_result(outcome)
+
+    pending = {i for i, outcome in enumerate(outcomes) if outcome is None}
+    for index in sorted(pending): tasks.put((index, items[index]))
+    for _ in range(min(max(1, concurrency), len(pending))): add_worker()
+    try:
+        while pending:
+            try:
+                index, result, error = results.get(timeout=1)
+                # Results of abandoned (timed-out) tasks arrive too late and are dropped.
+                if index in pending:
+                    pending.discard(index)
+                    finish(index, result, error)
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            for index in sorted(pending):
+                if index in started and now - started[index] > timeout:
+                    pending.discard(index)
+                    finish(index, None, f"timed out after {int(timeout)}s")
+                    add_worker()
+    except BaseException:
+        if journal: journal.close()
+        raise
+    finally:
+        # Drop queued items and let idle workers exit; busy ones stop after their task.
+        while True:
+            try:
+                tasks.get_nowait()
+            except queue.Empty:
+                break
+        for _ in workers: tasks.put(None)
+
+    failed = [o for o in outcomes if o['error']]
+    if failed:
+        print(f"[{name}] {len(failed)} of {len(items)} failed:")
+        for o in failed: print(f"  - {o['key']}: {o['error']}")
+    if journal:
+        # Keep the journal after failures so a rerun only retries those.
+        if failed: journal.close()
+        else: journal.finish()
+    return outcomes
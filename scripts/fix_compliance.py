@@ -1,12 +1,15 @@
 import os
-import subprocess
-import json
-import time
+
+import rate_budget
+import tracing
+from graphql_batch import MutationBatcher
+from repo_inventory import load_repos, mark_stale
 
 # Configuration
 ORG = "atnplex"
 # DRY_RUN defaults to False unless set to 'true' in env
 DRY_RUN = os.getenv('DRY_RUN', 'False').lower() == 'true'
+MUTATION_BATCH_SIZE = int(os.getenv('MUTATION_BATCH_SIZE', '20'))
 
 # Heuristic Mapping
 TOPIC_MAP = {
@@ -24,34 +27,9 @@ TOPIC_MAP = {
 }
 DEFAULT_TOPICS = ["atnplex"]
 
-def run_command(command, use_shell=False, input_text=None):
-    """Run a shell command and return the output."""
-    try:
-        if isinstance(command, list):
-            use_shell = False
-        
-        result = subprocess.run(
-            command,
-            cwd=os.getcwd(), 
-            shell=use_shell,
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            input=input_text
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command: {command}")
-        return None
-
 def fetch_repos(org):
     print(f"Fetching all repositories for {org}...")
-    # Fetch Topics and Description directly
-    cmd = ['gh', 'repo', 'list', org, '--limit', '1000', '--json', 'name,description,repositoryTopics']
-    output = run_command(cmd)
-    if output: return json.loads(output)
-    return []
+    return load_repos(org)
 
 def get_topics_for_repo(name):
     # Start with default
@@ -69,45 +47,68 @@ def get_topics_for_repo(name):
     
     return list(topics)
 
+def plan_remediation(repo):
+    """Return the fixes one repo needs: {'name', 'id', 'topics'?, 'description'?}, or None if compliant."""
+    name = repo['name']
+    desc = repo.get('description', '')
+    current_topics = repo.get('repositoryTopics', []) or []
+    fix = {"name": name, "id": repo.get('id')}
+    
+    # 1. Fix Topics
+    if not current_topics:
+        # The repo has no topics yet, so replacing the set is the same as adding.
+        fix["topics"] = get_topics_for_repo(name)
+    
+    # 2. Fix Description
+    if not desc:
+        # Generate a smart default
+        new_desc = f"Official repository for {name} within the atnplex ecosystem."
+        if name == '.github': new_desc = "Organization-wide configuration and governance."
+        fix["description"] = new_desc
+    
+    return fix if len(fix) > 2 else None
+
+def apply_remediation(fixes):
+    """Apply all fixes as batched GraphQL mutations; returns {repo name: [error, ...]} for failures."""
+    batcher = MutationBatcher(batch_size=MUTATION_BATCH_SIZE)
+    for fix in fixes:
+        if 'topics' in fix:
+            batcher.update_topics(fix['id'], fix['topics'], description=f"{fix['name']}: topics", key=fix['name'])
+        if 'description' in fix:
+            batcher.update_description(fix['id'], fix['description'], description=f"{fix['name']}: description", key=fix['name'])
+    results = batcher.flush()
+    failures = {}
+    for r in results:
+        if not r['ok']: failures.setdefault(r['key'], []).extend(r['errors'])
+    print(f"\nApplied {len(results) - sum(1 for r in results if not r['ok'])}/{len(results)} changes in {batcher.requests_sent} requests.")
+    return failures
+
 def main():
     print(f"Starting Compliance Remediation for {ORG}...\n")
     if DRY_RUN: print("[DRY RUN MODE] No changes will be applied.\n")
     
     repos = fetch_repos(ORG)
+    fixes = [fix for fix in (plan_remediation(r) for r in repos) if fix]
     
-    for repo in repos:
-        name = repo['name']
-        desc = repo.get('description', '')
-        current_topics = repo.get('repositoryTopics', []) or []
-        
-        print(f"Checking {name}...")
-        
-        # 1. Fix Topics
-        if not current_topics:
-            new_topics = get_topics_for_repo(name)
-            print(f"  -> Missing Topics. Identifying: {new_topics}")
-            
-            if not DRY_RUN:
-                # Construct command: gh repo edit ORG/REPO --add-topic topic1 --add-topic topic2
-                cmd = ['gh', 'repo', 'edit', f"{ORG}/{name}"]
-                for t in new_topics:
-                    cmd.extend(['--add-topic', t])
-                
-                print(f"  -> Applying topics...")
-                run_command(cmd)
-        
-        # 2. Fix Description
-        if not desc:
-            # Generate a smart default
-            new_desc = f"Official repository for {name} within the atnplex ecosystem."
-            if name == '.github': new_desc = "Organization-wide configuration and governance."
-            
-            print(f"  -> Missing Description. Setting to: '{new_desc}'")
-            
-            if not DRY_RUN:
-                run_command(['gh', 'repo', 'edit', f"{ORG}/{name}", '--description', new_desc])
+    for fix in fixes:
+        print(f"{fix['name']}:")
+        if 'topics' in fix: print(f"  -> Missing Topics. Identifying: {fix['topics']}")
+        if 'description' in fix: print(f"  -> Missing Description. Setting to: '{fix['description']}'")
+    print(f"\n{len(fixes)}/{len(repos)} repositories need remediation.")
+    
+    if fixes and not DRY_RUN:
+        failures = apply_remediation(fixes)
+        mark_stale(ORG)
+        if failures:
+            print(f"Failed for {len(failures)} repositories:")
+            for name, errors in failures.items():
+                print(f"  - {name}: {'; '.join(errors)}")
 
     print("\nRemediation Complete.")
 
 if __name__ == "__main__":
-    main()
+    try:
+        tracing.run(main)
+    finally:
+        rate_budget.report()
+        tracing.report()
@@ -0,0 +1,365 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import argparse
+import datetime
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rate_budget
+import tracing
+from gardener_rules import build_schema, item_view
+from gardener_state import GardenerState
+from github_client import graphql
+from graphql_batch import MutationBatcher
+from project_gardener import (CONTENT_FIELDS, DRY_RUN, FIELD_VALUE_FRAGMENT, MUTATION_BATCH_SIZE, TARGETS, apply_plan,
+                              complete_item_connections, garden_item, is_schema_error, load_project_schema, new_plan,
+                              parse_targets, state_path)
+
+# Webhook receiver that gardens only the items an event touched, seconds after
+# it happened. The scheduled project_gardener.py run stays as a low-frequency
+# reconciliation for anything a missed delivery left behind. It gardens the
+# same boards (GARDENER_TARGETS) as the scheduled run.
+HOST = os.getenv('GARDENER_DAEMON_HOST', '127.0.0.1')
+PORT = int(os.getenv('GARDENER_DAEMON_PORT', '8090'))
+# Required: behind a reverse proxy every delivery arrives from localhost, so the
+# signature is the only thing telling GitHub's events from forged ones.
+WEBHOOK_SECRET = os.getenv('GARDENER_WEBHOOK_SECRET', '')
+LOCALHOST = ('127.0.0.1', 'localhost', '::1')
+# An item is gardened once no event for it arrived for DEBOUNCE_SECONDS, but
+# never later than MAX_DELAY_SECONDS after its first event.
+DEBOUNCE_SECONDS = float(os.getenv('GARDENER_DEBOUNCE', '5'))
+MAX_DELAY_SECONDS = float(os.getenv('GARDENER_DEBOUNCE_MAX', '60'))
+NODES_PER_QUERY = 50
+
+EVENTS = ('issues', 'pull_request', 'label', 'projects_v2_item')
+
+ITEM_FIELDS = """
+      id
+      updatedAt
+      project { id }
+      fieldValues(first: 20) {
+        nodes {""" + FIELD_VALUE_FRAGMENT + """}
+        pageInfo { hasNextPage endCursor }
+      }
+"""
+
+NODES_QUERY = """
+query($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    __typename
+    ... on ProjectV2Item {""" + ITEM_FIELDS + """
+      content {
+        ... on Issue {""" + CONTENT_FIELDS + """}
+        ... on PullRequest {""" + CONTENT_FIELDS + """}
+      }
+    }
+    ... on Issue {""" + CONTENT_FIELDS + """
+      projectItems(first: 20) { nodes {""" + ITEM_FIELDS + """} }
+    }
+    ... on PullRequest {""" + CONTENT_FIELDS + """
+      projectItems(first: 20) { nodes {""" + ITEM_FIELDS + """} }
+    }
+  }
+}
+"""
+
+LABEL_SEARCH_QUERY = """
+query($q: String!, $after: String) {
+  search(query: $q, type: ISSUE, first: 100, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on Issue { id }
+      ... on PullRequest { id }
+    }
+  }
+}
+"""
+
+def sign(secret, body):
+    return "sha256=" + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+def verify_signature(secret, body, signature):
+    """Check `X-Hub-Signature-256` against the shared webhook secret."""
+    return bool(signature) and hmac.compare_digest(sign(secret, body), signature)
+
+def targets_for(event, payload, project_ids):
+    """Map one webhook delivery to the work it implies: a list of (kind, id) targets.
+
+    kind is 'item' (a project item node ID), 'content' (an issue or PR node ID)
+    or 'label' ("owner/repo:label name", gardened through a search). Events
+    for other projects, deletions and label changes that cannot move a
+    priority are ignored. `project_ids` are the boards this daemon gardens.
+    """
+    action = payload.get('action')
+    if event in ('issues', 'pull_request'):
+        content = payload.get('issue' if event == 'issues' else 'pull_request') or {}
+        if action in ('deleted', 'transferred') or not content.get('node_id'): return []
+        return [('content', content['node_id'])]
+    if event == 'projects_v2_item':
+        item = payload.get('projects_v2_item') or {}
+        if action == 'deleted' or item.get('project_node_id') not in project_ids: return []
+        return [('item', item['node_id'])]
+    if event == 'label':
+        # A renamed label changes the priority of every open item carrying it.
+        repo = (payload.get('repository') or {}).get('full_name')
+        name = (payload.get('label') or {}).get('name')
+        if action != 'edited' or not repo or not name: return []
+        return [('label', f"{repo}:{name}")]
+    return []
+
+class Stats:
+    """Delivery and gardening counters, updated from the handler threads and the worker."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"received": 0, "rejected": 0, "gardened": 0, "failed": 0}
+
+    def add(self, name, count=1):
+        with self.lock:
+            self.counts[name] += count
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+class Debouncer:
+    """Coalesce bursts of events per target and release them once they go quiet."""
+
+    def __init__(self, quiet=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS):
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.lock = threading.Condition()
+        self.pending = {}   # target -> [first seen, last seen]
+
+    def add(self, target):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.pending.setdefault(target, [now, now])
+            entry[1] = now
+            self.lock.notify()
+
+    def take_ready(self, timeout=1.0):
+        """Wait up to `timeout` and return the targets that are due, removing them."""
+        with self.lock:
+            self.lock.wait(timeout=timeout)
+            now = time.monotonic()
+            ready = [t for t, (first, last) in self.pending.items()
+                     if now - last >= self.quiet or now - first >= self.max_delay]
+            for target in ready: del self.pending[target]
+            return ready
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pending)
+
+def search_label(target):
+    """Node IDs of open issues/PRs carrying a label, for a 'label' target."""
+    repo, _, name = target.partition(':')
+    query = f'repo:{repo} is:open label:"{name}"'
+    ids, cursor = [], None
+    while True:
+        response = graphql(LABEL_SEARCH_QUERY, {"q": query, "after": cursor})
+        result = ((response or {}).get('data') or {}).get('search')
+        if not result: break
+        ids.extend(n['id'] for n in result['nodes'] if n)
+        if not result['pageInfo']['hasNextPage']: break
+        cursor = result['pageInfo']['endCursor']
+    return ids
+
+def fetch_nodes(ids):
+    nodes = []
+    for start in range(0, len(ids), NODES_PER_QUERY):
+        response = graphql(NODES_QUERY, {"ids": ids[start:start + NODES_PER_QUERY]})
+        nodes.extend(n for n in (((response or {}).get('data') or {}).get('nodes') or []) if n)
+    return nodes
+
+def fetch_targets(targets):
+    """Fetch the issue, PR and project item nodes behind a batch of targets."""
+    ids = []
+    for kind, value in targets:
+        ids.extend(search_label(value) if kind == 'label' else [value])
+    return fetch_nodes(list(dict.fromkeys(ids)))
+
+def board_items(nodes, project_id, org):
+    """Split fetched nodes into one board's items and the open `org` content missing from it."""
+    items, orphans = {}, {}
+    for node in nodes:
+        if node['__typename'] == 'ProjectV2Item':
+            if (node.get('project') or {}).get('id') == project_id: items[node['id']] = node
+            continue
+        on_board = [i for i in (node.get('projectItems') or {}).get('nodes', []) if i and (i.get('project') or {}).get('id') == project_id]
+        content = {k: v for k, v in node.items() if k != 'projectItems'}
+        for item in on_board: items[item['id']] = dict(item, content=content)
+        owner = ((node.get('repository') or {}).get('owner') or {}).get('login') or ''
+        if not on_board and node.get('state') == 'OPEN' and owner.lower() == org.lower(): orphans[node['id']] = node
+    for item in items.values(): complete_item_connections(item)
+    return list(items.values()), list(orphans.values())
+
+class Gardener:
+    """Applies the gardening rules for one board (the worker thread owns every Gardener)."""
+
+    def __init__(self, target):
+        self.org, self.number, self.name = target['org'], target['number'], target['name']
+        self.store = None
+        self.load_schema()
+
+    def load_schema(self, refresh=False):
+        rate_budget.start_phase("schema")
+        self.project_id, fields = load_project_schema(self.org, self.number, refresh=refresh)
+        if not self.project_id: raise RuntimeError(f"Project {self.name} not found")
+        self.schema = build_schema(self.project_id, fields)
+
+    def garden(self, targets, nodes):
+        # SQLite connections belong to the thread that opened them.
+        if self.store is None: self.store = GardenerState(state_path(self.org, self.number))
+        rate_budget.start_phase("webhook")
+        now = datetime.datetime.now(datetime.timezone.utc)
+        items, orphans = board_items(nodes, self.project_id, self.org)
+        if not items and not orphans: return
+        plan = new_plan(self.org, self.number, self.project_id, now)
+        print(f"\n[Daemon] {self.name}: gardening {len(items)} items ({len(orphans)} orphans) for {len(targets)} targets...")
+        for item in items:
+            if item.get('content'): garden_item(item_view(item), self.schema, self.store, now, plan, record=not DRY_RUN)
+        for node in orphans:
+            print(f"  [Sweeper] Found Orphan in {node['repository']['name']}: '{node['title']}'")
+            plan['mutations'].append({"op": "add_item", "content_id": node['id']})
+        if DRY_RUN:
+            print(f"[DRY RUN] Plan has {len(plan['mutations'])} mutations; nothing applied.")
+        elif plan['mutations']:
+            failed = apply_plan(plan, MutationBatcher(batch_size=MUTATION_BATCH_SIZE))
+            for result in failed:
+                if result['key']: self.store.forget_item(result['key'])
+            if any(is_schema_error(r) for r in failed): self.load_schema(refresh=True)
+        self.store.commit()
+
+def make_handler(project_ids, debouncer, secret, stats):
+    """Request handler class; deliveries are only checked against `secret` when one is given (--insecure)."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, payload=None):
+            body = json.dumps(payload or {}).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/healthz': return self.reply(404)
+            self.reply(200, dict(stats.snapshot(), pending=len(debouncer)))
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if secret and not verify_signature(secret, body, self.headers.get('X-Hub-Signature-256')):
+                stats.add('rejected')
+                return self.reply(401, {"error": "bad signature"})
+            event = self.headers.get('X-GitHub-Event', '')
+            if event == 'ping': return self.reply(200, {"ok": True})
+            if event not in EVENTS: return self.reply(202, {"ignored": event})
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                return self.reply(400, {"error": "invalid JSON"})
+            targets = targets_for(event, payload, project_ids)
+            for target in targets: debouncer.add(target)
+            stats.add('received')
+            self.reply(202, {"queued": len(targets)})
+
+    return Handler
+
+def run_worker(gardeners, debouncer, stats, stop):
+    while not stop.is_set():
+        targets = debouncer.take_ready()
+        if not targets: continue
+        failed = False
+        try:
+            nodes = fetch_targets(targets)
+        except Exception as e:
+            print(f"[Daemon] Fetching batch failed: {e}")
+            stats.add('failed', len(targets))
+            continue
+        for gardener in gardeners:
+            try:
+                with rate_budget.tenant(gardener.name):
+                    gardener.garden(targets, nodes)
+            except Exception as e:
+                print(f"[Daemon] Gardening batch for {gardener.name} failed: {e}")
+                failed = True
+        stats.add('failed' if failed else 'gardened', len(targets))
+
+def serve(targets, host=HOST, port=PORT, secret=WEBHOOK_SECRET, insecure=False):
+    if not secret and not insecure:
+        raise SystemExit("GARDENER_WEBHOOK_SECRET is required (pass --insecure to skip signature checks in local testing).")
+    if not secret and host not in LOCALHOST:
+        raise SystemExit("--insecure only listens on localhost.")
+    gardeners = [Gardener(target) for target in targets]
+    debouncer = Debouncer()
+    stats = Stats()
+    stop = threading.Event()
+    worker = threading.Thread(target=run_worker, args=(gardeners, debouncer, stats, stop), daemon=True)
+    worker.start()
+    project_ids = {g.project_id for g in gardeners}
+    server = ThreadingHTTPServer((host, port), make_handler(project_ids, debouncer, secret, stats))
+    print(f"Gardener daemon for {', '.join(g.name for g in gardeners)} listening on http://{host}:{server.server_port}"
+          f" (debounce {DEBOUNCE_SECONDS:g}s{'' if secret else ', INSECURE: signatures NOT verified'}).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stop.set()
+        worker.join(timeout=MAX_DELAY_SECONDS)
+
+def post(url, event, path, secret=WEBHOOK_SECRET):
+    """Deliver a recorded payload to a running daemon, signed like GitHub would."""
+    with open(path, 'rb') as f:
+        body = f.read()
+    headers = {"Content-Type": "application/json", "X-GitHub-Event": event,
+               "X-GitHub-Delivery": f"local-{time.time_ns()}"}
+    if secret: headers["X-Hub-Signature-256"] = sign(secret, body)
+    request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            print(f"{event} {path}: HTTP {response.status} {response.read().decode('utf-8')}")
+    except urllib.error.HTTPError as e:
+        print(f"{event} {path}: HTTP {e.code} {e.read().decode('utf-8')}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Garden project items as webhook events arrive.")
+    sub = parser.add_subparsers(dest='command')
+    run = sub.add_parser('serve', help="Run the webhook receiver (default).")
+    run.add_argument('--host', default=HOST)
+    run.add_argument('--port', type=int, default=PORT)
+    run.add_argument('--target', action='append', metavar='ORG/NUMBER',
+                     help="Project board to garden (repeatable); defaults to GARDENER_TARGETS.")
+    run.add_argument('--insecure', action='store_true',
+                     help="Accept unsigned deliveries when no GARDENER_WEBHOOK_SECRET is set (local testing only).")
+    send = sub.add_parser('post', help="Post recorded webhook payloads to a running daemon.")
+    send.add_argument('event', help="X-GitHub-Event value, e.g. issues or projects_v2_item.")
+    send.add_argument('payloads', nargs='+', help="JSON payload files.")
+    send.add_argument('--url', default=f"http://{HOST}:{PORT}/")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.command == 'post':
+        for path in args.payloads: post(args.url, args.event, path)
+        return
+    target = getattr(args, 'target', None)
+    serve(parse_targets(','.join(target) if target else TARGETS), getattr(args, 'host', HOST),
+          getattr(args, 'port', PORT), insecure=getattr(args, 'insecure', False))
+
+if __name__ == "__main__":
+    try:
+        tracing.run(main)
+    finally:
+        rate_budget.report()
+        tracing.report()
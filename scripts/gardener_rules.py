@@ -0,0 +1,180 @@
+import datetime
+import functools
+
+from item_index import ItemRecord
+
+# Mappings for Label -> Priority (If Priority field exists)
+LABEL_PRIORITY_MAP = {
+    "critical": "P0",
+    "high": "P1",
+    "bug": "P1",
+    "enhancement": "P2",
+    "feature": "P2",
+    "documentation": "P3"
+}
+DEFAULT_PRIORITY = "P2"
+# Items inactive for longer than this are flagged as stale
+STALE_AFTER_DAYS = 30
+
+def build_schema(project_id, fields):
+    """Index project fields as {name: {'id', 'options': {option name: option id}}}.
+
+    The Priority field also gets `targets`: every priority the rules can ask
+    for, resolved to its option name once per run.
+    """
+    schema = {"project_id": project_id, "fields": {}}
+    for f in fields:
+        if not f or 'name' not in f: continue
+        schema["fields"][f['name']] = {
+            "id": f['id'],
+            "options": {opt['name']: opt['id'] for opt in f.get('options') or []},
+        }
+    priority = schema["fields"].get('Priority')
+    if priority:
+        targets = {'P0', 'P1', DEFAULT_PRIORITY, *LABEL_PRIORITY_MAP.values()}
+        priority["targets"] = {t: resolve_priority_option(priority["options"], t) for t in targets}
+    return schema
+
+def item_view(item):
+    """Flatten a raw GraphQL project item into the compact record the rules read."""
+    return ItemRecord.from_item(item)
+
+def resolve_priority_option(priority_options, target_priority):
+    # Fuzzy match "P0" in "P0 - Critical"
+    for name in priority_options:
+        if target_priority in name:
+            return name
+    return None
+
+def desired_status(view, status_options):
+    """First matching status rule wins; returns (option name, log line) or (None, None)."""
+    current = view['current_values'].get('Status')
+    is_closed = view['state'] in ['CLOSED', 'MERGED']
+
+    # 1. State Sync: Closed/Merged -> Done
+    if is_closed:
+        if current != 'Done':
+            if 'Done' in status_options:
+                return 'Done', "[Sync] Content is closed. Setting Project Status to 'Done'."
+            return None, "[Warning] 'Done' status option not found for Status field."
+        return None, None
+
+    has_wip = 'In Progress' in status_options
+    # 2a. Auto-Progression: AI Assigned -> In Progress
+    if has_wip and 'ai-assigned' in view['labels'] and current != 'In Progress':
+        return 'In Progress', "[Progression] Item is AI Assigned. Setting Status to 'In Progress'."
+    # 2b. Auto-Progression: PR Open -> In Progress
+    if has_wip and view['typename'] == 'PullRequest' and current != 'In Progress':
+        return 'In Progress', "[Progression] PR is Open. Setting Status to 'In Progress'."
+    # 3. Auto-Progression: Issue Assigned -> In Progress (if currently Todo or Empty)
+    if has_wip and view['typename'] == 'Issue' and view['assignees'] and current in [None, 'Todo']:
+        return 'In Progress', "[Progression] Issue is Assigned. Setting Status to 'In Progress'."
+    # 4. Rule: Set Status to Todo if empty
+    if not current and 'Todo' in status_options:
+        return 'Todo', "[Triage] Status is empty. Setting to 'Todo'."
+    return None, None
+
+@functools.lru_cache(maxsize=None)
+def label_priority(label):
+    """(forced priority, derived priority) for one label name.
+
+    Label names repeat across the whole board, so each distinct name goes
+    through the substring rules once and is a table lookup afterwards.
+    """
+    normalized = label.lower()
+    # High/Critical labels FORCE an update
+    if 'critical' in normalized or 'p0' in normalized: forced = 'P0'
+    elif 'high' in normalized or 'p1' in normalized: forced = 'P1'
+    else: forced = None
+    derived = next((prio for key, prio in LABEL_PRIORITY_MAP.items() if key in normalized), None)
+    return forced, derived
+
+def desired_priority(view, priority_field):
+    """Priority derived from labels; returns (option name, log line) or (None, None)."""
+    classified = [label_priority(label) for label in view['labels']]
+    current = view['current_values'].get('Priority')
+    target_priority = next((forced for forced, _ in classified if forced), None)
+    force_update = target_priority is not None
+
+    # If no forced priority, check if empty and derive defaults
+    if not target_priority and 'Priority' not in view['current_values'] and view['state'] == 'OPEN':
+        target_priority = next((derived for _, derived in classified if derived), DEFAULT_PRIORITY)
+
+    if not target_priority: return None, None
+    target_option = priority_field['targets'].get(target_priority)
+    if not target_option: return None, None
+    # Update if: Forced (and different) OR Empty
+    if (force_update and current != target_option) or (not current and not force_update):
+        reason = "Enforced" if force_update else "Derived"
+        return target_option, f"[Priority] {reason} '{target_priority}' from labels."
+    return None, None
+
+def evaluate(view, schema, now):
+    """Compute an item's desired state in one pure pass.
+
+    Returns {'fields': {field name: option name}, 'dispatch': bool, 'log': [...],
+    'decisions': [...], 'recheck_at': datetime or None}. Nothing is written here;
+    `diff` turns the result into mutations.
+    """
+    fields = schema['fields']
+    result = {"fields": {}, "dispatch": False, "log": [], "decisions": [], "recheck_at": None}
+
+    if 'Status' in fields:
+        status, line = desired_status(view, fields['Status']['options'])
+        if line: result['log'].append(line)
+        if status: result['fields']['Status'] = status
+
+    if 'Priority' in fields:
+        priority, line = desired_priority(view, fields['Priority'])
+        if line: result['log'].append(line)
+        if priority: result['fields']['Priority'] = priority
+
+    # Stale Detection (report only)
+    if view['state'] == 'OPEN' and view['updated_at']:
+        last_update = datetime.datetime.fromisoformat(view['updated_at'].replace('Z', '+00:00'))
+        days_inactive = (now - last_update).days
+        if days_inactive > STALE_AFTER_DAYS and view['current_values'].get('Status') != 'Done':
+            result['log'].append(f"[Stale] Inactive for {days_inactive} days. Review required.")
+            result['decisions'].append('stale')
+        elif days_inactive <= STALE_AFTER_DAYS:
+            result['recheck_at'] = last_update + datetime.timedelta(days=STALE_AFTER_DAYS + 1)
+
+    # AI Dispatcher
+    if 'ai-pending' in view['labels'] and view['number'] and view['repo_name']:
+        result['log'].append("[AI Dispatch] Found 'ai-pending'. Dispatching Agent...")
+        result['dispatch'] = True
+    return result
+
+def diff(view, desired, schema):
+    """Return only the mutations needed to move `view` to `desired` (no-op writes are dropped)."""
+    mutations = []
+    for field_name, option_name in sorted(desired['fields'].items()):
+        if view['current_values'].get(field_name) == option_name: continue
+        field = schema['fields'][field_name]
+        mutations.append({
+            "op": "update_field",
+            "item_id": view['item_id'],
+            "field": field_name,
+            "field_id": field['id'],
+            "from": view['current_values'].get(field_name),
+            "to": option_name,
+            "option_id": field['options'][option_name],
+        })
+    if desired['dispatch']:
+        mutations.append({
+            "op": "swap_labels",
+            "item_id": view['item_id'],
+            "content_id": view['content_id'],
+            "owner": view['repo_owner'],
+            "repo": view['repo_name'],
+            "number": view['number'],
+            "remove": "ai-pending",
+            "add": "ai-assigned",
+        })
+    return mutations
+
+def decisions_for(desired, mutations):
+    """Summarize what was decided for an item, for the state store."""
+    decisions = [f"{m['field'].lower()}:{m['to']}" for m in mutations if m['op'] == 'update_field']
+    if desired['dispatch']: decisions.append('ai-dispatch')
+    return decisions + desired['decisions']
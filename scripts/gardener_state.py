@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id      TEXT PRIMARY KEY,
+    content_id   TEXT,
+    updated_at   TEXT,
+    field_values TEXT,
+    decisions    TEXT,
+    recheck_at   TEXT,
+    evaluated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class GardenerState:
+    """Per-item gardening history persisted in SQLite between runs.
+
+    For every project item it keeps the `updatedAt` last evaluated, the field
+    values seen at that point, the decisions taken and the time at which a
+    time-based rule (stale detection) will next need the item re-evaluated.
+    Run-level values such as the sweeper watermark live in `meta`.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def get_item(self, item_id):
+        row = self.conn.execute(
+            "SELECT content_id, updated_at, field_values, decisions, recheck_at FROM items WHERE item_id = ?",
+            (item_id,)
+        ).fetchone()
+        if not row: return None
+        return {
+            "content_id": row[0],
+            "updated_at": row[1],
+            "field_values": json.loads(row[2] or '{}'),
+            "decisions": json.loads(row[3] or '[]'),
+            "recheck_at": row[4],
+        }
+
+    def record_item(self, item_id, content_id, updated_at, field_values, decisions, recheck_at, evaluated_at):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (item_id, content_id, updated_at, json.dumps(field_values, sort_keys=True), json.dumps(decisions), recheck_at, evaluated_at)
+        )
+
+    def forget_item(self, item_id):
+        """Drop an item so the next run re-evaluates it (e.g. after a failed write)."""
+        self.conn.execute("DELETE FROM items WHERE item_id = ?", (item_id,))
+
+    def prune(self, seen_item_ids):
+        """Remove items that are no longer on the board."""
+        seen = set(seen_item_ids)
+        stale = [row[0] for row in self.conn.execute("SELECT item_id FROM items") if row[0] not in seen]
+        self.conn.executemany("DELETE FROM items WHERE item_id = ?", [(i,) for i in stale])
+        return len(stale)
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
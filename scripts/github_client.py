@@ -0,0 +1,266 @@
+import http.client
+import json
+import os
+import queue
+import subprocess
+import time
+import urllib.parse
+
+import tracing
+from http_cache import cache_key, get_cache
+from rate_budget import get_budget, graphql_operation_name, rest_operation_name, with_rate_limit
+from retry_policy import MAX_ATTEMPTS, REJECTED, classify, get_breaker, retry_delay
+
+# Configuration (GITHUB_API_URL / GITHUB_GRAPHQL_URL are set by GitHub Actions)
+API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GRAPHQL_URL = os.getenv('GITHUB_GRAPHQL_URL', f"{API_URL}/graphql")
+POOL_SIZE = int(os.getenv('GH_POOL_SIZE', '8'))
+TIMEOUT = float(os.getenv('GH_TIMEOUT', '30'))
+USER_AGENT = "atnplex-infrastructure-scripts"
+
+class GitHubClient:
+    """REST + GraphQL client over a pool of persistent keep-alive connections.
+
+    Authenticates with `GH_TOKEN` (or `GITHUB_TOKEN`). Without a token every call
+    falls back to the `gh` CLI, so the scripts keep working on a workstation that
+    only has `gh auth login`. Failures are printed and reported as `None`
+    rather than raised.
+    """
+
+    def __init__(self, token=None, api_url=API_URL, graphql_url=GRAPHQL_URL, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        self.token = token if token is not None else (os.getenv('GH_TOKEN') or os.getenv('GITHUB_TOKEN'))
+        self.api_url = api_url
+        self.graphql_url = graphql_url
+        self.timeout = timeout
+        parsed = urllib.parse.urlsplit(api_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.netloc
+        self.base_path = parsed.path.rstrip('/')
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+
+    # --- Connection pool ---
+
+    def new_connection(self):
+        if self.scheme == 'http':
+            return http.client.HTTPConnection(self.host, timeout=self.timeout)
+        return http.client.HTTPSConnection(self.host, timeout=self.timeout)
+
+    def acquire(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return self.new_connection()
+
+    def release(self, conn):
+        try:
+            self.pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def send(self, method, path, body=None, headers=None):
+        """Perform one HTTP request and return (status, headers, body bytes)."""
+        request_headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": USER_AGENT,
+        }
+        if body is not None:
+            request_headers["Content-Type"] = "application/json"
+        request_headers.update(headers or {})
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        tracing.annotate(bytes_out=len(payload or b''))
+
+        for attempt in range(2):
+            conn = self.acquire()
+            try:
+                conn.request(method, path, body=payload, headers=request_headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest):
+                # The server closed an idle keep-alive connection; retry once on a fresh one.
+                conn.close()
+                if attempt: raise
+                tracing.add(retries=1)
+                continue
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close: conn.close()
+            else: self.release(conn)
+            return response.status, response.headers, data
+
+    def resolve(self, path):
+        if path.startswith('http://') or path.startswith('https://'):
+            parsed = urllib.parse.urlsplit(path)
+            return parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        return self.base_path + '/' + path.lstrip('/')
+
+    def call(self, resource, operation, transport, idempotent=True):
+        """Run `transport()` -> (status, headers, body) under the budget and the retry policy.
+
+        Rate-limit, abuse, 5xx and network failures are retried (the last two
+        only when `idempotent`), honoring Retry-After / X-RateLimit-Reset and
+        otherwise backing off with jitter. Every attempt first waits for the
+        shared circuit breaker and releases its budget slot while backing off.
+        The final attempt's result is returned, or its transport error raised;
+        a call refused by the budget returns a None status without being sent.
+        """
+        budget = get_budget()
+        breaker = get_breaker()
+        for attempt in range(MAX_ATTEMPTS):
+            breaker.wait()
+            error = None
+            if not budget.acquire(resource, operation, self.pool.maxsize):
+                # Over the run's share until a window reset too far off to wait for.
+                status, headers, data = None, {}, b''
+                break
+            try:
+                status, headers, data = transport()
+            except (OSError, http.client.HTTPException) as e:
+                status, headers, data, error = None, {}, b'', e
+            finally:
+                budget.release()
+            category = classify(status, headers, data, error)
+            if category is None:
+                breaker.success()
+                break
+            delay = retry_delay(category, attempt, headers)
+            breaker.failure(category, delay)
+            if delay is None or attempt + 1 >= MAX_ATTEMPTS or not (idempotent or category in REJECTED): break
+            tracing.add(retries=1)
+            tracing.annotate(retry_reason=category)
+            print(f"[Retry] {operation}: {error or f'HTTP {status}'} ({category}); attempt {attempt + 2}/{MAX_ATTEMPTS} in {delay:.1f}s.")
+            time.sleep(delay)
+        if error: raise error
+        return status, headers, data
+
+    # --- Public API ---
+
+    def request(self, method, path, body=None):
+        """Call a REST endpoint. Returns (status, parsed JSON or None); status is None on transport errors.
+
+        GETs are revalidated against the on-disk response cache: a 304 answer
+        is served from the cache and costs no rate limit.
+        """
+        budget = get_budget()
+        resource = 'search' if path.lstrip('/').startswith('search/') else 'core'
+        operation = rest_operation_name(method, path)
+        cache = get_cache() if method == 'GET' else None
+        key = cache_key(self.token or 'gh', method, f"{self.host}{self.resolve(path)}") if cache else None
+        cached = cache.get(key) if cache else None
+        extra_headers = cache.validators(cached) if cached else None
+        with tracing.span(operation, "rest", path=path, phase=budget.phase_name) as span:
+            if not self.token:
+                transport = lambda: self.gh_request(method, path, body, extra_headers)
+            else:
+                transport = lambda: self.send(method, self.resolve(path), body, extra_headers)
+            try:
+                # A POST that reached the server may have been applied; only retry it when GitHub rejected it.
+                status, headers, data = self.call(resource, operation, transport, idempotent=method != 'POST')
+            except (OSError, http.client.HTTPException) as e:
+                span['error'] = str(e)
+                print(f"Error calling {method} {path}: {e}")
+                return None, None
+            span.update(status=status, bytes=len(data or b''))
+            if status is None: return None, None
+            if status == 304 and cached:
+                budget.record_headers(resource, operation, headers, default_cost=0)
+                cache.touch(key)
+                span.update(cost=0, cached=True)
+                status, data = cached['status'], cached['body']
+            else:
+                budget.record_headers(resource, operation, headers)
+                span['cost'] = 1
+                if cache and status == 200: cache.put(key, status, headers, data)
+        try:
+            parsed = json.loads(data) if data else {}
+        except json.JSONDecodeError:
+            parsed = None
+        return status, parsed
+
+    def rest(self, method, path, body=None, quiet_statuses=(404,)):
+        """Call a REST endpoint and return the parsed JSON body, or None on any error."""
+        status, parsed = self.request(method, path, body)
+        if status is None: return None
+        if status >= 400:
+            if status not in quiet_statuses:
+                message = (parsed or {}).get('message') if isinstance(parsed, dict) else None
+                print(f"Error calling {method} {path}: HTTP {status} {message or ''}".rstrip())
+            return None
+        return parsed
+
+    def graphql(self, query, variables=None):
+        """Run a GraphQL document and return the full response (`data` and `errors`), or None."""
+        budget = get_budget()
+        operation = graphql_operation_name(query)
+        body = {"query": with_rate_limit(query), "variables": variables or {}}
+        with tracing.span(operation, "graphql", phase=budget.phase_name) as span:
+            if not self.token:
+                transport = lambda: self.gh_graphql(body)
+            else:
+                transport = lambda: self.send('POST', self.resolve(self.graphql_url), body)
+            try:
+                # The mutations the scripts send set absolute values, so GraphQL calls are safe to repeat.
+                status, headers, data = self.call('graphql', operation, transport)
+            except (OSError, http.client.HTTPException) as e:
+                span['error'] = str(e)
+                print(f"Error calling GraphQL: {e}")
+                return None
+            try:
+                parsed = json.loads(data) if data else None
+            except json.JSONDecodeError:
+                print(f"Error decoding GraphQL response: {data[:200]!r}")
+                parsed = None
+            span.update(status=status, bytes=len(data or b''), cost=budget.record_graphql(operation, parsed, headers))
+            if parsed and parsed.get('errors'): span['errors'] = len(parsed['errors'])
+        if (status is None or status >= 400) and not (parsed and 'data' in parsed):
+            print(f"Error calling GraphQL: HTTP {status} {(parsed or {}).get('message', '')}".rstrip())
+            return None
+        return parsed
+
+    # --- gh CLI fallback ---
+
+    def gh_request(self, method, path, body=None, headers=None):
+        """`gh api` equivalent of `send`: returns (status, headers, body) with status None on failure."""
+        cmd = ['gh', 'api', path.lstrip('/'), '-X', method, '--include']
+        for name, value in (headers or {}).items(): cmd.extend(['-H', f"{name}: {value}"])
+        if body is not None: cmd.extend(['--input', '-'])
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8',
+                                input=json.dumps(body) if body is not None else None)
+        # gh exits non-zero on HTTP errors but still prints the response, which is
+        # kept: error statuses and partial GraphQL `data` are still useful.
+        head, _, payload = result.stdout.replace('\r\n', '\n').partition('\n\n')
+        lines = head.split('\n')
+        try:
+            status = int(lines[0].split(' ', 2)[1])
+        except (IndexError, ValueError):
+            print(f"Error calling {method} {path}: {result.stderr.strip()}")
+            return None, {}, b''
+        headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+        return status, headers, payload.encode('utf-8')
+
+    def gh_graphql(self, body):
+        return self.gh_request('POST', 'graphql', body)
+
+_client = None
+
+def get_client():
+    """Shared process-wide client, so every caller reuses the same connection pool."""
+    global _client
+    if _client is None:
+        _client = GitHubClient()
+    return _client
+
+def rest(method, path, body=None, **kwargs):
+    return get_client().rest(method, path, body, **kwargs)
+
+def request(method, path, body=None):
+    return get_client().request(method, path, body)
+
+def graphql(query, variables=None):
+    return get_client().graphql(query, variables)
+
+def quote(value, safe=''):
+    """Quote a URL path segment (pass safe='/' for repository file paths)."""
+    return urllib.parse.quote(value, safe=safe)
@@ -0,0 +1,178 @@
+import json
+import re
+
+from github_client import graphql
+
+# Mutations per GraphQL document. GitHub executes aliased mutations serially
+# server-side, so this only bounds document size / secondary-rate-limit cost.
+DEFAULT_BATCH_SIZE = 20
+
+# Operation templates: (mutation field, {variable: GraphQL type}, input body, selection)
+OPERATIONS = {
+    "update_field": (
+        "updateProjectV2ItemFieldValue",
+        {"projectId": "ID!", "itemId": "ID!", "fieldId": "ID!", "optionId": "String!"},
+        "projectId: $projectId, itemId: $itemId, fieldId: $fieldId, value: { singleSelectOptionId: $optionId }",
+        "projectV2Item { id }"
+    ),
+    "add_item": (
+        "addProjectV2ItemById",
+        {"projectId": "ID!", "contentId": "ID!"},
+        "projectId: $projectId, contentId: $contentId",
+        "item { id }"
+    ),
+    "add_labels": (
+        "addLabelsToLabelable",
+        {"labelableId": "ID!", "labelIds": "[ID!]!"},
+        "labelableId: $labelableId, labelIds: $labelIds",
+        "clientMutationId"
+    ),
+    "remove_labels": (
+        "removeLabelsFromLabelable",
+        {"labelableId": "ID!", "labelIds": "[ID!]!"},
+        "labelableId: $labelableId, labelIds: $labelIds",
+        "clientMutationId"
+    ),
+    "update_topics": (
+        "updateTopics",
+        {"repositoryId": "ID!", "topicNames": "[String!]!"},
+        "repositoryId: $repositoryId, topicNames: $topicNames",
+        "invalidTopicNames repository { id }"
+    ),
+    "update_description": (
+        "updateRepository",
+        {"repositoryId": "ID!", "description": "String!"},
+        "repositoryId: $repositoryId, description: $description",
+        "repository { id }"
+    ),
+}
+
+class MutationBatcher:
+    """Queue project, label and repository mutations and send them as aliased multi-mutation documents.
+
+    Each queued operation gets an alias (`m0`, `m1`, ...) inside its document.
+    `flush()` returns one result per operation, in queue order, with the errors
+    GitHub reported for that alias (matched on `errors[].path[0]`).
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.pending = []
+        self.results = []
+        self.requests_sent = 0
+
+    def queue(self, op, variables, description="", key=None):
+        """Queue one operation; `key` is echoed back in its result so callers can map failures."""
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown mutation operation: {op}")
+        self.pending.append({"op": op, "variables": variables, "description": description, "key": key})
+        if len(self.pending) >= self.batch_size:
+            # Send full documents as soon as they fill up so writes overlap with evaluation.
+            self.send(self.pending)
+            self.pending = []
+
+    def update_field(self, project_id, item_id, field_id, option_id, description="", key=None):
+        self.queue("update_field", {"projectId": project_id, "itemId": item_id, "fieldId": field_id, "optionId": option_id}, description, key)
+
+    def add_item(self, project_id, content_id, description="", key=None):
+        self.queue("add_item", {"projectId": project_id, "contentId": content_id}, description, key)
+
+    def add_labels(self, labelable_id, label_ids, description="", key=None):
+        self.queue("add_labels", {"labelableId": labelable_id, "labelIds": list(label_ids)}, description, key)
+
+    def remove_labels(self, labelable_id, label_ids, description="", key=None):
+        self.queue("remove_labels", {"labelableId": labelable_id, "labelIds": list(label_ids)}, description, key)
+
+    def update_topics(self, repository_id, topic_names, description="", key=None):
+        self.queue("update_topics", {"repositoryId": repository_id, "topicNames": list(topic_names)}, description, key)
+
+    def update_description(self, repository_id, text, description="", key=None):
+        self.queue("update_description", {"repositoryId": repository_id, "description": text}, description, key)
+
+    def build_document(self, ops):
+        """Render a chunk of operations into one mutation document plus its variables."""
+        declarations = []
+        fields = []
+        variables = {}
+        for i, entry in enumerate(ops):
+            name, var_types, input_body, selection = OPERATIONS[entry["op"]]
+            alias = f"m{i}"
+            body = input_body
+            for var, gql_type in var_types.items():
+                local = f"{var}_{i}"
+                declarations.append(f"${local}: {gql_type}")
+                variables[local] = entry["variables"][var]
+                body = re.sub(rf"\${var}\b", f"${local}", body)
+            fields.append(f"  {alias}: {name}(input: {{ {body} }}) {{ {selection} }}")
+        document = "mutation(" + ", ".join(declarations) + ") {\n" + "\n".join(fields) + "\n}"
+        return document, variables
+
+    def flush(self):
+        """Send everything still queued and return all results since the last flush."""
+        if self.pending:
+            self.send(self.pending)
+            self.pending = []
+        results, self.results = self.results, []
+        return results
+
+    def send(self, ops):
+        if self.dry_run:
+            self.results.extend({"op": e["op"], "description": e["description"], "key": e["key"], "ok": True, "data": None, "errors": []} for e in ops)
+            return
+
+        for start in range(0, len(ops), self.batch_size):
+            chunk = ops[start:start + self.batch_size]
+            document, variables = self.build_document(chunk)
+            response = graphql(document, variables)
+            self.requests_sent += 1
+
+            data = (response or {}).get('data') or {}
+            errors_by_alias = {}
+            global_errors = []
+            for err in (response or {}).get('errors', []) or []:
+                path = err.get('path') or []
+                if path: errors_by_alias.setdefault(path[0], []).append(err.get('message'))
+                else: global_errors.append(err.get('message'))
+            if response is None:
+                global_errors.append("No response from GitHub")
+
+            for i, entry in enumerate(chunk):
+                alias = f"m{i}"
+                errs = errors_by_alias.get(alias, [])
+                payload = data.get(alias)
+                if payload is None and not errs:
+                    # Document-level failure (syntax, auth, variable coercion) hits every alias.
+                    errs = list(global_errors) or ["Mutation returned no data"]
+                if payload and payload.get('invalidTopicNames'):
+                    # updateTopics succeeds but silently drops names GitHub rejects.
+                    errs = errs + [f"Invalid topic names: {', '.join(payload['invalidTopicNames'])}"]
+                ok = payload is not None and not errs
+                if not ok:
+                    print(f"    -> [Batch Error] {entry['description'] or entry['op']}: {'; '.join(errs)}")
+                self.results.append({"op": entry["op"], "description": entry["description"], "key": entry["key"], "ok": ok, "data": payload, "errors": errs})
+
+def fetch_label_ids(repos, names):
+    """Resolve label names to node IDs for many repositories in one aliased query.
+
+    `repos` is an iterable of (owner, name). Returns {(owner, name): {label_name: id}};
+    labels that do not exist in a repo are omitted, and so are repos whose
+    lookup failed, so callers can tell "no labels" from "not resolved".
+    """
+    repos = list(dict.fromkeys(repos))
+    resolved = {}
+    if not repos: return resolved
+
+    for start in range(0, len(repos), DEFAULT_BATCH_SIZE * 5):
+        chunk = repos[start:start + DEFAULT_BATCH_SIZE * 5]
+        fields = []
+        for i, (owner, name) in enumerate(chunk):
+            labels = " ".join(f"l{j}: label(name: {json.dumps(label)}) {{ id }}" for j, label in enumerate(names))
+            fields.append(f"  r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {labels} }}")
+        response = graphql("query {\n" + "\n".join(fields) + "\n}")
+        data = (response or {}).get('data') or {}
+        for i, repo in enumerate(chunk):
+            repo_data = data.get(f"r{i}")
+            if repo_data is None: continue
+            resolved[repo] = {label: repo_data[f"l{j}"]['id'] for j, label in enumerate(names) if repo_data.get(f"l{j}")}
+    return resolved
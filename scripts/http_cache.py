@@ -0,0 +1,119 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Persistent cache of REST GET responses, revalidated with ETag / Last-Modified.
+# GitHub does not charge 304 Not Modified answers against the rate limit, so a
+# repeat audit or redeploy only pays for what actually changed.
+# Set GH_HTTP_CACHE=off to disable.
+CACHE_PATH = os.getenv('GH_HTTP_CACHE') or os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'atnplex-scripts', 'http-cache.sqlite')
+MAX_BYTES = int(float(os.getenv('GH_HTTP_CACHE_MB', '64')) * 1024 * 1024)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    status        INTEGER,
+    etag          TEXT,
+    last_modified TEXT,
+    body          BLOB,
+    size          INTEGER,
+    accessed_at   REAL
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at);
+"""
+
+def cache_key(scope, method, path):
+    """Key responses by credentials as well as URL: different tokens can see different data."""
+    scope_hash = hashlib.sha256((scope or '').encode('utf-8')).hexdigest()[:16]
+    return f"{scope_hash} {method} {path}"
+
+class ResponseCache:
+    """On-disk LRU of validated REST responses, shared by all threads of a run.
+
+    Only responses that carry a validator (ETag or Last-Modified) are kept.
+    When the stored bodies exceed `max_bytes`, least recently used entries
+    are evicted down to 90% of the cap.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, etag, last_modified, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if not row: return None
+        return {"status": row[0], "etag": row[1], "last_modified": row[2], "body": row[3]}
+
+    def validators(self, entry):
+        """Conditional request headers for a cached entry."""
+        headers = {}
+        if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, key):
+        """Mark an entry as used after a 304 revalidated it."""
+        self.hits += 1
+        with self.lock:
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+
+    def put(self, key, status, headers, body):
+        self.misses += 1
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        etag, last_modified = headers.get('etag'), headers.get('last-modified')
+        if not etag and not last_modified: return
+        size = len(body or b'')
+        if size > self.max_bytes: return
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, status, etag, last_modified, body, size, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, status, etag, last_modified, body, size, time.time())
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes: self.evict(int(self.max_bytes * 0.9))
+            self.conn.commit()
+
+    def evict(self, target_bytes):
+        # Called with the lock held.
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self.total_bytes <= target_bytes: break
+            doomed.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_cache = None
+
+def get_cache():
+    """Shared process-wide cache, or None when disabled or unusable."""
+    global _cache
+    if _cache is None:
+        _cache = False
+        if CACHE_PATH.lower() not in ('off', 'false', '0'):
+            try:
+                _cache = ResponseCache()
+            except (OSError, sqlite3.Error) as e:
+                print(f"HTTP cache disabled ({CACHE_PATH}): {e}")
+    return _cache or None
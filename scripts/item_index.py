@@ -0,0 +1,135 @@
+import sys
+
+def intern(value):
+    """Share one copy of a repeated string (labels, statuses, repo names, ...)."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+class ItemRecord:
+    """One project item, flattened to the values the rules, the store and reports read.
+
+    Raw GraphQL items are dropped as soon as their record is built. Strings
+    that repeat across items are interned, so thousands of items share a few
+    label and status objects. Records also answer `record['field']`, the way
+    the rules read views.
+    """
+
+    __slots__ = ('item_id', 'content_id', 'typename', 'title', 'state', 'labels', 'assignees', 'updated_at',
+                 'changed_at', 'current_values', 'repo_owner', 'repo_name', 'number')
+
+    def __init__(self, item_id, content_id, typename, title, state, labels, assignees, updated_at, changed_at,
+                 current_values, repo_owner, repo_name, number):
+        self.item_id = item_id
+        self.content_id = content_id
+        self.typename = typename
+        self.title = title
+        self.state = state
+        self.labels = labels
+        self.assignees = assignees
+        self.updated_at = updated_at
+        self.changed_at = changed_at
+        self.current_values = current_values
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.number = number
+
+    @classmethod
+    def from_item(cls, item):
+        content = item.get('content') or {}
+        current_values = {}
+        for fv in item.get('fieldValues', {}).get('nodes', []):
+            if not fv: continue
+            if 'name' in fv: val = intern(fv['name'])
+            elif 'text' in fv: val = fv['text']
+            elif 'date' in fv: val = intern(fv['date'])
+            else: val = None
+            current_values[intern(fv['field'].get('name'))] = val
+        repository = content.get('repository') or {}
+        # Latest of the item's and its content's updatedAt (ISO strings compare in order).
+        changed_at = max((s for s in (item.get('updatedAt'), content.get('updatedAt')) if s), default=None)
+        return cls(
+            item['id'],
+            content.get('id'),
+            intern(content.get('__typename')),
+            content.get('title', 'Unknown'),
+            intern(content.get('state')),  # OPEN, CLOSED, MERGED
+            tuple(intern(l['name']) for l in content.get('labels', {}).get('nodes', [])),
+            tuple(intern(a['login']) for a in content.get('assignees', {}).get('nodes', []) if a),
+            item.get('updatedAt'),
+            changed_at,
+            current_values,
+            intern((repository.get('owner') or {}).get('login')),
+            intern(repository.get('name')),
+            content.get('number'),
+        )
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+class ItemIndex:
+    """Board items by item ID, indexed for the lookups the gardener makes.
+
+    `by_content` answers the sweeper's membership check; `by_field` maps each
+    Status and Priority value to the set of item IDs having it, for the board
+    summary. The rules read every record exactly once, so they iterate the
+    index rather than look anything up.
+    """
+
+    INDEXED_FIELDS = ('Status', 'Priority')
+
+    def __init__(self):
+        self.records = {}
+        self.by_content = {}
+        self.by_field = {field: {} for field in self.INDEXED_FIELDS}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def __contains__(self, item_id):
+        return item_id in self.records
+
+    def add(self, record):
+        if record.item_id in self.records: self.remove(record.item_id)
+        self.records[record.item_id] = record
+        if record.content_id: self.by_content[record.content_id] = record.item_id
+        for field, index in self.by_field.items():
+            index.setdefault(record.current_values.get(field), set()).add(record.item_id)
+        return record
+
+    def remove(self, item_id):
+        record = self.records.pop(item_id)
+        self.by_content.pop(record.content_id, None)
+        for field, index in self.by_field.items(): discard(index, record.current_values.get(field), item_id)
+
+    def set_value(self, item_id, field, value):
+        """Record a field change (e.g. after a mutation) and keep the field index in sync."""
+        record = self.records[item_id]
+        index = self.by_field.get(field)
+        if index is not None:
+            discard(index, record.current_values.get(field), item_id)
+            index.setdefault(value, set()).add(item_id)
+        record.current_values[intern(field)] = intern(value)
+
+    def get(self, item_id):
+        return self.records.get(item_id)
+
+    def has_content(self, content_id):
+        return content_id in self.by_content
+
+    def counts(self, field):
+        """{value: number of items} for an indexed field (None counts items without a value)."""
+        return {value: len(ids) for value, ids in self.by_field[field].items()}
+
+def discard(index, key, item_id):
+    ids = index.get(key)
+    if ids is None: return
+    ids.discard(item_id)
+    if not ids: del index[key]
@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+import tracing
+
+# Configuration. LLM_BASE_URL points at an OpenAI-compatible endpoint, e.g. the
+# LiteLLM gateway from deployment/utility (http://<host>:4000/v1). Without it,
+# or without AI_WORKER_KEY, the stub backend answers.
+BASE_URL = os.getenv('LLM_BASE_URL', '').rstrip('/')
+API_KEY = os.getenv('AI_WORKER_KEY', '')
+MODEL = os.getenv('LLM_MODEL') or 'gemini-2.5-flash'
+MAX_TOKENS = int(os.getenv('LLM_MAX_TOKENS', '1024'))
+CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '4'))
+TIMEOUT = float(os.getenv('LLM_TIMEOUT', '120'))
+CACHE_PATH = os.getenv('LLM_CACHE') or os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'atnplex-scripts', 'llm-cache.sqlite')
+
+SYSTEM_PROMPT = (
+    "You are the atnplex AI worker. Read the GitHub issue and reply with a short analysis "
+    "and a concrete proposed action, formatted as GitHub Markdown."
+)
+
+def normalize(text):
+    return re.sub(r'\s+', ' ', (text or '').strip().lower())
+
+def prompt_key(model, title, body):
+    """Cache/coalescing key: the same issue text asked of the same model is the same request."""
+    return hashlib.sha256(f"{model}\0{normalize(title)}\0{normalize(body)}".encode('utf-8')).hexdigest()
+
+class StubBackend:
+    """Canned reply used until a real model is configured."""
+    model = "stub"
+
+    async def complete(self, title, body):
+        return {"text": f"""
+**AI Analysis**:
+I receive your request: "{title}".
+
+**Proposed Action**:
+(This is a simulated response. The AI Worker script is running successfully but currently in "Stub" mode. To enable real AI reasoning, configure the `AI_WORKER_KEY` secret and `LLM_BASE_URL`.)
+
+**Context**:
+> {title}
+""", "prompt_tokens": 0, "completion_tokens": 0}
+
+class OpenAICompatibleBackend:
+    """Chat completions over HTTP against any OpenAI-compatible server (LiteLLM, vLLM, ...).
+
+    The blocking request runs in a worker thread so many completions can be in
+    flight from one event loop.
+    """
+
+    def __init__(self, base_url=BASE_URL, api_key=API_KEY, model=MODEL, timeout=TIMEOUT, max_tokens=MAX_TOKENS):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme, self.host, self.path = parsed.scheme, parsed.netloc, parsed.path.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+
+    def post(self, payload):
+        conn_class = http.client.HTTPConnection if self.scheme == 'http' else http.client.HTTPSConnection
+        conn = conn_class(self.host, timeout=self.timeout)
+        with tracing.span("chat/completions", "llm", model=self.model) as span:
+            try:
+                conn.request('POST', f"{self.path}/chat/completions", body=json.dumps(payload).encode('utf-8'),
+                             headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"})
+                response = conn.getresponse()
+                data = response.read()
+            finally:
+                conn.close()
+            span.update(status=response.status, bytes=len(data))
+            if response.status >= 400:
+                raise RuntimeError(f"LLM HTTP {response.status}: {data[:200]!r}")
+            return json.loads(data)
+
+    async def complete(self, title, body):
+        payload = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"# {title}\n\n{body}"},
+            ],
+        }
+        result = await asyncio.to_thread(self.post, payload)
+        usage = result.get('usage') or {}
+        return {
+            "text": result['choices'][0]['message']['content'],
+            "prompt_tokens": usage.get('prompt_tokens', 0),
+            "completion_tokens": usage.get('completion_tokens', 0),
+        }
+
+class ResponseCache:
+    """Completions persisted in SQLite by prompt key, so a re-labelled or duplicate issue costs nothing."""
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, model TEXT, response TEXT, created_at REAL)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, model, response):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)", (key, model, json.dumps(response), time.time()))
+            self.conn.commit()
+
+class LLMClient:
+    """Async front for a backend: persistent cache, in-flight coalescing, a concurrency cap and metrics.
+
+    Identical prompts asked while one is in flight share its result instead of
+    being sent again. Each call appends {key, latency, prompt_tokens,
+    completion_tokens, source} to `metrics`, where source is llm, cache or
+    coalesced.
+    """
+
+    def __init__(self, backend, cache=None, concurrency=CONCURRENCY):
+        self.backend = backend
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.semaphore = None
+        self.in_flight = {}
+        self.metrics = []
+
+    async def complete(self, title, body):
+        if self.semaphore is None: self.semaphore = asyncio.Semaphore(self.concurrency)
+        key = prompt_key(self.backend.model, title, body)
+        start = time.monotonic()
+        cached = self.cache.get(key) if self.cache else None
+        if cached:
+            return self.record(key, start, cached, "cache")
+        if key in self.in_flight:
+            result = await asyncio.shield(self.in_flight[key])
+            return self.record(key, start, result, "coalesced")
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            async with self.semaphore:
+                result = await self.backend.complete(title, body)
+            if self.cache and self.backend.model != "stub": self.cache.put(key, self.backend.model, result)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters re-raise it themselves
+            raise
+        finally:
+            del self.in_flight[key]
+        return self.record(key, start, result, "llm")
+
+    def record(self, key, start, result, source):
+        entry = {
+            "key": key[:12],
+            "latency": round(time.monotonic() - start, 3),
+            "prompt_tokens": result.get('prompt_tokens', 0) if source == "llm" else 0,
+            "completion_tokens": result.get('completion_tokens', 0) if source == "llm" else 0,
+            "source": source,
+        }
+        self.metrics.append(entry)
+        return result['text']
+
+    def report(self):
+        if not self.metrics: return
+        calls = [m for m in self.metrics if m['source'] == 'llm']
+        print(f"\n--- LLM ({self.backend.model}) ---")
+        for source in ("llm", "cache", "coalesced"):
+            entries = [m for m in self.metrics if m['source'] == source]
+            if entries:
+                print(f"{source:<10} | {len(entries):>5} calls | avg {sum(m['latency'] for m in entries) / len(entries):.2f}s | max {max(m['latency'] for m in entries):.2f}s")
+        if calls:
+            print(f"Tokens: {sum(m['prompt_tokens'] for m in calls)} prompt + {sum(m['completion_tokens'] for m in calls)} completion.")
+
+class SyncLLM:
+    """Blocking facade for the threaded scripts: one event loop in a background thread serves every caller."""
+
+    def __init__(self, client):
+        self.client = client
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def generate(self, title, body):
+        return asyncio.run_coroutine_threadsafe(self.client.complete(title, body), self.loop).result()
+
+    def report(self):
+        self.client.report()
+
+def default_backend():
+    if BASE_URL and API_KEY: return OpenAICompatibleBackend()
+    return StubBackend()
+
+_llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """Shared process-wide LLM facade built from the environment."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            backend = default_backend()
+            cache = None
+            if not isinstance(backend, StubBackend):
+                try:
+                    cache = ResponseCache()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"LLM cache disabled ({CACHE_PATH}): {e}")
+            _llm = SyncLLM(LLMClient(backend, cache))
+    return _llm
+
+def report():
+    """Print the LLM summary, if any completion was asked for in this process."""
+    if _llm is not None: _llm.report()
@@ -1,47 +1,47 @@
 import os
-import subprocess
 import json
+import argparse
 import datetime
-import sys
+import queue
+import re
+import threading
+import time
+
+import rate_budget
+import tracing
+from gardener_rules import build_schema, decisions_for, diff, evaluate, item_view
+from gardener_state import GardenerState
+from github_client import graphql
+from graphql_batch import MutationBatcher, fetch_label_ids
+from fanout import fan_out
+from item_index import ItemIndex
 
 # Configuration
 ORG = "atnplex"
 PROJECT_NUMBER = 4
+# Boards gardened by one run, as "org/number[,org/number...]"; boards are
+# gardened concurrently and split the run's rate-limit share between them.
+TARGETS = os.getenv('GARDENER_TARGETS') or f"{ORG}/{PROJECT_NUMBER}"
+WORKERS = int(os.getenv('GARDENER_WORKERS', '4'))
+TARGET_TIMEOUT = int(os.getenv('GARDENER_TARGET_TIMEOUT', '3600'))
 # DRY_RUN defaults to False unless set to 'true' in env
 DRY_RUN = os.getenv('DRY_RUN', 'False').lower() == 'true'
-
-# Mappings for Label -> Priority (If Priority field exists)
-LABEL_PRIORITY_MAP = {
-    "critical": "P0",
-    "high": "P1",
-    "bug": "P1",
-    "enhancement": "P2",
-    "feature": "P2",
-    "documentation": "P3"
-}
-DEFAULT_PRIORITY = "P2"
-
-def run_command(command, use_shell=False, input_text=None):
-    """Run a shell command and return the output."""
-    try:
-        if isinstance(command, list):
-            use_shell = False
-        
-        result = subprocess.run(
-            command,
-            cwd=os.getcwd(), 
-            shell=use_shell,
-            check=True,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            input=input_text
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command: {command}")
-        print(f"Stderr: {e.stderr}")
-        return None
+# Number of mutations sent per aliased GraphQL document
+MUTATION_BATCH_SIZE = int(os.getenv('MUTATION_BATCH_SIZE', '20'))
+# Project items requested per page (GraphQL maximum is 100)
+ITEMS_PAGE_SIZE = 100
+
+# Local state store (per-item history + sweeper watermark), persisted between runs
+STATE_PATH = os.path.join(os.getenv('GARDENER_STATE_DIR', '.gardener'), 'state.sqlite')
+SWEEPER_OVERLAP = datetime.timedelta(minutes=10)
+SEARCH_RESULT_CAP = 1000
+# Lower bound for `created:` slices of a search (before GitHub existed).
+SEARCH_EPOCH = datetime.datetime(2008, 1, 1, tzinfo=datetime.timezone.utc)
+# Field and option definitions rarely change, so they are cached next to the
+# state and re-fetched after SCHEMA_TTL, on --full, or as soon as a mutation is
+# rejected for naming a field or option the project no longer has.
+SCHEMA_TTL = int(os.getenv('GARDENER_SCHEMA_TTL', str(24 * 3600)))
+SCHEMA_ERROR_RE = re.compile(r"single select option|resolve to a field|global id of 'PVT[A-Z]*F_", re.IGNORECASE)
 
 def fetch_project_data(org, number):
     print(f"Fetching Project Data for {org}/projects/{number}...")
@@ -63,47 +63,46 @@ def fetch_project_data(org, number):
       }
     }
     """
-    cmd = ['gh', 'api', 'graphql', '-f', f'query={query}', '-F', f'org={org}', '-F', f'number={number}']
-    output = run_command(cmd)
-    if not output: return None, None
-    data = json.loads(output)
-    project = data['data']['organization']['projectV2']
+    response = graphql(query, {"org": org, "number": number})
+    project = (((response or {}).get('data') or {}).get('organization') or {}).get('projectV2')
+    if not project: return None, None
     return project['id'], project['fields']['nodes']
 
-def fetch_items(project_id):
-    print("Fetching Project Items for Gardening...")
-    query = """
-    query($projectId: ID!) {
-      node(id: $projectId) {
-        ... on ProjectV2 {
-          items(first: 100) {
-            nodes {
-              id
-              updatedAt
-              content {
-                ... on Issue {
-                  id
-                  number
-                  repository { name, owner { login } }
-                  title
-                  state
-                  author { login }
-                  labels(first: 10) { nodes { name } }
-                  assignees(first: 1) { nodes { login } }
-                }
-                ... on PullRequest {
-                  id
-                  number
-                  repository { name, owner { login } }
-                  title
-                  state
-                  author { login }
-                  labels(first: 10) { nodes { name } }
-                  assignees(first: 1) { nodes { login } }
-                }
-              }
-              fieldValues(first: 20) {
-                nodes {
+def schema_cache_path(org, number):
+    return os.path.join(os.path.dirname(STATE_PATH), f"schema-{org}-{number}.json")
+
+def load_project_schema(org, number, refresh=False):
+    """Return (project id, field definitions), from the on-disk cache unless it is stale or `refresh`."""
+    path = schema_cache_path(org, number)
+    if not refresh:
+        try:
+            with open(path, encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - cached['fetched_at'] < SCHEMA_TTL:
+                print(f"Using cached project schema for {org}/projects/{number}.")
+                return cached['project_id'], cached['fields']
+        except (OSError, ValueError, KeyError):
+            pass
+    project_id, fields = fetch_project_data(org, number)
+    if project_id:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"project_id": project_id, "fields": fields, "fetched_at": time.time()}, f)
+        os.replace(tmp, path)
+    return project_id, fields
+
+def invalidate_project_schema(org, number):
+    try:
+        os.remove(schema_cache_path(org, number))
+    except FileNotFoundError:
+        pass
+
+def is_schema_error(result):
+    """True when a mutation failed because the cached schema named a field or option that is gone."""
+    return any(SCHEMA_ERROR_RE.search(error or '') for error in result['errors'])
+
+FIELD_VALUE_FRAGMENT = """
                   ... on ProjectV2ItemFieldSingleSelectValue {
                     field { ... on ProjectV2FieldCommon { name } }
                     name
@@ -113,10 +112,47 @@ def fetch_items(project_id):
                     text
                   }
                   ... on ProjectV2ItemFieldDateValue {
-                   field { ... on ProjectV2FieldCommon { name } }
+                    field { ... on ProjectV2FieldCommon { name } }
                     date
                   }
-                }
+"""
+
+CONTENT_FIELDS = """
+                  __typename
+                  id
+                  updatedAt
+                  number
+                  repository { name, owner { login } }
+                  title
+                  state
+                  author { login }
+                  labels(first: 20) { nodes { name } pageInfo { hasNextPage endCursor } }
+                  assignees(first: 1) { nodes { login } }
+"""
+
+def fetch_item_pages(project_id, page_size=ITEMS_PAGE_SIZE, status=None):
+    """Yield project items one page at a time, following `items.pageInfo.endCursor`.
+
+    Nested `labels` / `fieldValues` connections that overflow their `first:` limit
+    are completed before the page is yielded, so callers always see full items.
+    `status['complete']` is set once the last page has been read.
+    """
+    query = """
+    query($projectId: ID!, $first: Int!, $after: String) {
+      node(id: $projectId) {
+        ... on ProjectV2 {
+          items(first: $first, after: $after) {
+            pageInfo { hasNextPage endCursor }
+            nodes {
+              id
+              updatedAt
+              content {
+                ... on Issue {""" + CONTENT_FIELDS + """}
+                ... on PullRequest {""" + CONTENT_FIELDS + """}
+              }
+              fieldValues(first: 20) {
+                nodes {""" + FIELD_VALUE_FRAGMENT + """}
+                pageInfo { hasNextPage endCursor }
               }
             }
           }
@@ -124,276 +160,479 @@ def fetch_items(project_id):
       }
     }
     """
-    cmd = ['gh', 'api', 'graphql', '-f', f'query={query}', '-F', f'projectId={project_id}']
-    output = run_command(cmd)
-    if output:
-        return json.loads(output)['data']['node']['items']['nodes']
-    return []
-
-def update_item_field(project_id, item_id, field_id, value, is_single_select=True):
-    print(f"    -> Updating field {field_id} to '{value}'...")
-    if DRY_RUN: return
-
-    if is_single_select:
-        mutation = """
-        mutation($projectId: ID!, $itemId: ID!, $fieldId: ID!, $optionId: String!) {
-          updateProjectV2ItemFieldValue(
-            input: {
-              projectId: $projectId, itemId: $itemId, fieldId: $fieldId, value: { singleSelectOptionId: $optionId }
-            }
-          ) { projectV2Item { id } }
-        }
-        """
-        variables = {"projectId": project_id, "itemId": item_id, "fieldId": field_id, "optionId": value}
-        cmd = ['gh', 'api', 'graphql', '-f', f'query={mutation}', '-F', f'variables={json.dumps(variables)}']
-        run_command(cmd)
-
-def add_item_to_project(project_id, content_id):
-    print(f"    -> Adding content {content_id} to project...")
-    if DRY_RUN: return
-    
-    mutation = """
-    mutation($projectId: ID!, $contentId: ID!) {
-      addProjectV2ItemById(input: {projectId: $projectId, contentId: $contentId}) {
-        item { id }
-      }
-    }
+    cursor = None
+    page_number = 0
+    while True:
+        response = graphql(query, {"projectId": project_id, "first": page_size, "after": cursor})
+        node = ((response or {}).get('data') or {}).get('node')
+        if not node:
+            print(f"Failed to fetch items page {page_number + 1}.")
+            return
+        items = node['items']
+        page_number += 1
+        for item in items['nodes']:
+            complete_item_connections(item)
+        yield items['nodes']
+        if not items['pageInfo']['hasNextPage']:
+            if status is not None: status['complete'] = True
+            return
+        cursor = items['pageInfo']['endCursor']
+
+def fetch_remaining_connection(node_id, type_conditions, connection, selection, cursor):
+    """Page through the rest of a nested connection on a single node."""
+    fragments = " ".join(
+        f"... on {t} {{ {connection}(first: 100, after: $after) {{ nodes {{ {selection} }} pageInfo {{ hasNextPage endCursor }} }} }}"
+        for t in type_conditions
+    )
+    query = f"query($id: ID!, $after: String) {{ node(id: $id) {{ {fragments} }} }}"
+    nodes = []
+    while cursor:
+        response = graphql(query, {"id": node_id, "after": cursor})
+        conn = ((((response or {}).get('data') or {}).get('node')) or {}).get(connection)
+        if not conn: break
+        nodes.extend(conn['nodes'])
+        cursor = conn['pageInfo']['endCursor'] if conn['pageInfo']['hasNextPage'] else None
+    return nodes
+
+def complete_item_connections(item):
+    content = item.get('content')
+    if content and content.get('labels', {}).get('pageInfo', {}).get('hasNextPage'):
+        content['labels']['nodes'].extend(fetch_remaining_connection(
+            content['id'], ['Issue', 'PullRequest'], 'labels', 'name', content['labels']['pageInfo']['endCursor']))
+    field_values = item.get('fieldValues', {})
+    if field_values.get('pageInfo', {}).get('hasNextPage'):
+        field_values['nodes'].extend(fetch_remaining_connection(
+            item['id'], ['ProjectV2Item'], 'fieldValues', FIELD_VALUE_FRAGMENT, field_values['pageInfo']['endCursor']))
+
+def prefetch(iterable, depth=1):
+    """Run `iterable` in a background thread, staying at most `depth` elements ahead.
+
+    Used to keep the next page request in flight while the current page is being
+    evaluated; the bounded queue caps memory at roughly `depth + 1` pages.
     """
-    cmd = ['gh', 'api', 'graphql', '-f', f'query={mutation}', '-F', f'projectId={project_id}', '-F', f'contentId={content_id}']
-    run_command(cmd)
-
-def fetch_all_repos(org):
-    print(f"Fetching all repositories for {org}...")
-    cmd = ['gh', 'repo', 'list', org, '--limit', '1000', '--json', 'name']
-    output = run_command(cmd)
-    if output: return [r['name'] for r in json.loads(output)]
-    return []
-
-def fetch_repo_open_items(org, repo):
-    # Fetch open issues and PRs with their IDs
-    query = """
-    query($owner: String!, $repo: String!) {
-      repository(owner: $owner, name: $repo) {
-        issues(states: OPEN, first: 100) { nodes { id, title } }
-        pullRequests(states: OPEN, first: 100) { nodes { id, title } }
-      }
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+    context = rate_budget.get_budget().context()
+
+    def producer():
+        # Calls made from this thread are charged to the caller's board and phase.
+        rate_budget.get_budget().bind(context)
+        try:
+            for element in iterable:
+                buffer.put(element)
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            buffer.put(done)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        element = buffer.get()
+        if element is done: return
+        if isinstance(element, Exception): raise element
+        yield element
+
+def iter_items(project_id, status=None):
+    print("Fetching Project Items for Gardening...")
+    for page in prefetch(fetch_item_pages(project_id, status=status)):
+        yield from page
+
+def parse_timestamp(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+def needs_evaluation(record, changed_at, current_values, now):
+    """Decide whether an item has to go through the rules again this run."""
+    if record is None: return True
+    if record['updated_at'] != changed_at: return True
+    if record['field_values'] != current_values: return True
+    # Time-based rules: re-run once the stale threshold has been crossed.
+    recheck_at = parse_timestamp(record['recheck_at'])
+    return recheck_at is not None and now >= recheck_at
+
+def garden_item(view, schema, store, now, plan, record):
+    """Evaluate one item, queue its mutations on `plan` and, when `record`, remember the decision."""
+    print(f"Checking '{view['title']}' (State: {view['state']}, Status: {view['current_values'].get('Status')})...")
+    desired = evaluate(view, schema, now)
+    for line in desired['log']: print(f"  {line}")
+    mutations = diff(view, desired, schema)
+    plan['mutations'].extend(mutations)
+    if record:
+        recheck_at = desired['recheck_at']
+        store.record_item(view['item_id'], view['content_id'], view['changed_at'], view['current_values'], decisions_for(desired, mutations),
+                          recheck_at.isoformat() if recheck_at else None, now.isoformat())
+    return mutations
+
+SEARCH_QUERY = """
+query($q: String!, $after: String) {
+  search(query: $q, type: ISSUE, first: 100, after: $after) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on Issue { id, title, repository { name } }
+      ... on PullRequest { id, title, repository { name } }
     }
+  }
+}
+"""
+
+def search_all(search):
+    """Page through an issue search; returns (nodes, issueCount), or (None, issueCount) past the cap."""
+    nodes, cursor = [], None
+    while True:
+        response = graphql(SEARCH_QUERY, {"q": search, "after": cursor})
+        result = ((response or {}).get('data') or {}).get('search')
+        if not result:
+            raise RuntimeError(f"Search failed for '{search}'")
+        # Only the first SEARCH_RESULT_CAP matches can be paged; don't fetch a partial set.
+        if result['issueCount'] > SEARCH_RESULT_CAP: return None, result['issueCount']
+        nodes.extend(node for node in result['nodes'] if node)
+        if not result['pageInfo']['hasNextPage']: return nodes, result['issueCount']
+        cursor = result['pageInfo']['endCursor']
+
+def search_orphan_candidates(org, project_number, since=None, split=True):
+    """Return (open issues/PRs in `org` that search says are not on the project, complete).
+
+    The project filter and the `updated:>=` watermark are applied server-side, so
+    this costs one call per 100 results instead of one call per repository.
+    Issues and PRs are searched separately. GitHub only pages through the first
+    1000 matches, so a search reporting more is split into `created:` date
+    ranges until every slice fits. `complete` is False when some matches were
+    unreachable (with `split=False`, or a one-second slice still over the cap);
+    the caller must not advance its watermark then.
+    With `project_number=None` every open issue/PR is returned, for callers that
+    check several boards against one search.
+    """
+    nodes, seen, complete = [], set(), True
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    for kind in ('issue', 'pr'):
+        base = f"org:{org} is:{kind} is:open"
+        if project_number is not None: base += f" -project:{org}/{project_number}"
+        if since: base += f" updated:>={since}"
+        slices = [None]
+        while slices:
+            window = slices.pop()
+            search = base if window is None else f"{base} created:{window[0].strftime('%Y-%m-%dT%H:%M:%SZ')}..{window[1].strftime('%Y-%m-%dT%H:%M:%SZ')}"
+            found, count = search_all(search)
+            if found is not None:
+                nodes.extend(node for node in found if node['id'] not in seen)
+                seen.update(node['id'] for node in found)
+                continue
+            if not split: return nodes, False
+            low, high = window or (SEARCH_EPOCH, now)
+            if high - low < datetime.timedelta(seconds=2):
+                print(f"  [Warning] {count} matches for '{search}'; only the first {SEARCH_RESULT_CAP} are reachable.")
+                complete = False
+                continue
+            if window is None: print(f"  {count} matches for '{search}'; splitting the search by creation date...")
+            middle = low + (high - low) / 2
+            slices += [(low, middle), (middle + datetime.timedelta(seconds=1), high)]
+    return nodes, complete
+
+def parse_targets(spec):
+    """Parse "org/number,org/number" into target dicts: {'name', 'org', 'number'}."""
+    targets = []
+    for entry in (spec or '').replace(' ', ',').split(','):
+        if not entry: continue
+        org, _, number = entry.rpartition('/')
+        if not org or not number.isdigit(): raise SystemExit(f"Invalid gardener target '{entry}' (expected org/number).")
+        targets.append({"name": f"{org}/{number}", "org": org, "number": int(number)})
+    return list({t['name']: t for t in targets}.values())
+
+def state_path(org, number):
+    # The original board keeps the original file, so existing cached state stays valid.
+    if (org, number) == (ORG, PROJECT_NUMBER): return STATE_PATH
+    return os.path.join(os.path.dirname(STATE_PATH), f"state-{org}-{number}.sqlite")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Garden the organization project boards.")
+    parser.add_argument('--full', action='store_true', help="Re-evaluate every item and sweep all open issues/PRs, ignoring stored state.")
+    parser.add_argument('--plan', metavar='PATH', help="Write the computed mutation plan to PATH (JSON) without applying it.")
+    parser.add_argument('--apply', metavar='PATH', help="Apply a previously written plan file and exit.")
+    parser.add_argument('--target', action='append', metavar='ORG/NUMBER',
+                        help="Project board to garden (repeatable); defaults to GARDENER_TARGETS.")
+    return parser.parse_args()
+
+def new_plan(org, number, project_id, now):
+    return {"project": f"{org}/{number}", "project_id": project_id, "generated_at": now.isoformat(), "mutations": []}
+
+def plan_path(path, target, targets):
+    """With several targets each plan gets its own file: plan.json -> plan-org-4.json."""
+    if len(targets) == 1: return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{target['org']}-{target['number']}{ext}"
+
+def write_plan(plan, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2)
+    print(f"Plan with {len(plan['mutations'])} mutations written to {path}")
+
+def load_plan(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def apply_plan(plan, batcher, label_lookup=fetch_label_ids):
+    """Apply a plan in bulk through the batcher and return the failed mutation results."""
+    project_id = plan['project_id']
+    swaps = []
+    rate_budget.start_phase("apply")
+    print(f"\nApplying {len(plan['mutations'])} planned mutations...")
+    for m in plan['mutations']:
+        if m['op'] == 'update_field':
+            print(f"    -> Updating {m['field']} on {m['item_id']} to '{m['to']}'...")
+            batcher.update_field(project_id, m['item_id'], m['field_id'], m['option_id'], description=f"set {m['field']} on {m['item_id']}", key=m['item_id'])
+        elif m['op'] == 'add_item':
+            print(f"    -> Adding content {m['content_id']} to project...")
+            batcher.add_item(project_id, m['content_id'], description=f"add {m['content_id']}")
+        elif m['op'] == 'swap_labels':
+            swaps.append(m)
+    assign_ai_to_issues(batcher, swaps, label_lookup)
+    failed = report_batch_results("Apply", batcher)
+    if any(is_schema_error(r) for r in failed):
+        print("[Warning] Mutations were rejected for unknown fields/options; the cached project schema will be re-fetched.")
+        org, _, number = plan['project'].rpartition('/')
+        invalidate_project_schema(org, int(number))
+    return failed
+
+class OrgContext:
+    """Work shared by every board of one organization within a run.
+
+    With one board the sweeper keeps the server-side `-project:` filter. With
+    several, a single search for the org's open issues/PRs (from the oldest
+    watermark of those boards) replaces one search per board, and each board
+    checks membership against its own item index. The unfiltered search is
+    never split: when it is over the result cap (likely on --full and first
+    runs), every board falls back to its own `-project:` search instead, so no
+    board works from a truncated result. Label IDs resolved for AI dispatch
+    are cached for the other boards too.
     """
-    cmd = ['gh', 'api', 'graphql', '-f', f'query={query}', '-F', f'owner={org}', '-F', f'repo={repo}']
-    output = run_command(cmd)
-    items = []
-    if output:
-        data = json.loads(output)
-        if 'data' in data and 'repository' in data['data'] and data['data']['repository']:
-            repo_data = data['data']['repository']
-            items.extend(repo_data['issues']['nodes'])
-            items.extend(repo_data['pullRequests']['nodes'])
-    return items
+
+    def __init__(self, org, targets, since):
+        self.org = org
+        self.numbers = [t['number'] for t in targets]
+        self.since = since
+        self.lock = threading.Lock()
+        self.sweep = None
+        self.label_cache = {}
+
+    def orphan_candidates(self, number, since):
+        """Return (search results, complete, time the search started) for one board."""
+        with self.lock:
+            if self.sweep is None and len(self.numbers) > 1:
+                print(f"  Searching {self.org} once for all {len(self.numbers)} boards...")
+                started = datetime.datetime.now(datetime.timezone.utc)
+                try:
+                    nodes, complete = search_orphan_candidates(self.org, None, self.since, split=False)
+                    self.sweep = (nodes, complete, started) if complete else False
+                except RuntimeError as e:
+                    self.sweep = e
+                if self.sweep is False: print(f"  Too many matches to share; each {self.org} board searches on its own.")
+            if isinstance(self.sweep, RuntimeError): raise self.sweep
+            if self.sweep: return self.sweep
+        started = datetime.datetime.now(datetime.timezone.utc)
+        return search_orphan_candidates(self.org, number, since) + (started,)
+
+    def label_ids(self, repos, names):
+        with self.lock:
+            missing = [r for r in dict.fromkeys(repos) if (r, tuple(names)) not in self.label_cache]
+        resolved = fetch_label_ids(missing, names) if missing else {}
+        with self.lock:
+            # Repos missing from a failed lookup are not cached, so the next board retries them.
+            for repo, labels in resolved.items(): self.label_cache[(repo, tuple(names))] = labels
+            return {r: self.label_cache.get((r, tuple(names)), {}) for r in repos}
+
+def sweeper_watermark(target, full):
+    if full: return None
+    store = GardenerState(state_path(target['org'], target['number']))
+    try:
+        return store.get_meta('sweeper_watermark')
+    finally:
+        store.close()
+
+def org_contexts(targets, full):
+    """One OrgContext per organization, searching from the oldest watermark of its boards."""
+    by_org = {}
+    for target in targets: by_org.setdefault(target['org'], []).append(target)
+    contexts = {}
+    for org, boards in by_org.items():
+        marks = [sweeper_watermark(t, full) for t in boards]
+        contexts[org] = OrgContext(org, boards, None if None in marks else min(marks))
+    return contexts
+
+def garden_target(target, args, context):
+    """Garden one project board end to end.
+
+    Returns a summary dict, or None when the project could not be fetched.
+    """
+    org, number = target['org'], target['number']
+    summary = {"gardened": 0, "skipped": 0, "mutations": 0, "failed": 0}
+    batcher = MutationBatcher(batch_size=MUTATION_BATCH_SIZE, dry_run=DRY_RUN)
+    # State is only recorded when this run's plan is actually applied.
+    applying = not DRY_RUN and not args.plan
+
+    rate_budget.start_phase("schema")
+    project_id, fields = load_project_schema(org, number, refresh=args.full)
+    if not project_id:
+        print(f"Failed to fetch project {org}/{number}.")
+        return None
+    schema = build_schema(project_id, fields)
+
+    # --- Phase 1: Garden Existing Items ---
+    store = GardenerState(state_path(org, number))
+    now = datetime.datetime.now(datetime.timezone.utc)
+    plan = new_plan(org, number, project_id, now)
+
+    rate_budget.start_phase("gardening")
+    print(f"Gardening existing items of {org}/projects/{number}...")
+    seen_item_ids = []
+    fetch_status = {'complete': False}
+
+    # Compact records of the board's items; the sweeper and the summary read its indexes.
+    index = ItemIndex()
+
+    for item in iter_items(project_id, fetch_status):
+        seen_item_ids.append(item['id'])
+        if not item['content']: continue
+        view = index.add(item_view(item))
+
+        if not args.full and not needs_evaluation(store.get_item(view.item_id), view.changed_at, view.current_values, now):
+            summary['skipped'] += 1
+            continue
+        summary['gardened'] += 1
+        garden_item(view, schema, store, now, plan, record=applying)
+
+    print(f"Gardened {summary['gardened']} existing items ({summary['skipped']} unchanged since last run).")
+
+    # --- Phase 2: The Sweeper (Find Orphans) ---
+    sweep_complete = fetch_status['complete']
+    sweep_started = None
+    if not fetch_status['complete']:
+        # A partial board would make every missing item look like an orphan.
+        print("\nBoard fetch was incomplete; skipping Sweeper.")
+    else:
+        rate_budget.start_phase("sweeper")
+        print("\nStarting Sweeper (Orphan Detection)...")
+        since = None if args.full else store.get_meta('sweeper_watermark')
+        print(f"  Searching for items updated since {since}..." if since else "  No watermark found, searching all open items...")
+        orphans = set()
+        try:
+            candidates, complete, sweep_started = context.orphan_candidates(number, since)
+            if not complete:
+                print("  [Warning] Some search results were unreachable; the sweeper watermark stays in place.")
+                sweep_complete = False
+            for item in candidates:
+                # Search may lag behind the board, so double-check membership locally.
+                if not index.has_content(item['id']) and item['id'] not in orphans:
+                    print(f"  [Sweeper] Found Orphan in {item['repository']['name']}: '{item['title']}'")
+                    plan['mutations'].append({"op": "add_item", "content_id": item['id']})
+                    orphans.add(item['id'])
+        except RuntimeError as e:
+            print(f"  [Warning] {e}")
+            sweep_complete = False
+
+    summary['mutations'] = len(plan['mutations'])
+    if args.plan:
+        write_plan(plan, plan_path(args.plan, target, args.targets))
+        store.close()
+        return summary
+    if DRY_RUN:
+        print(f"\n[DRY RUN] Plan has {len(plan['mutations'])} mutations; nothing applied.")
+        store.close()
+        return summary
+
+    failed = apply_plan(plan, batcher, context.label_ids)
+    summary['failed'] = len(failed)
+    for result in failed:
+        # Forget items whose writes failed so the next run retries them.
+        if result['key']: store.forget_item(result['key'])
+    failed_items = {r['key'] for r in failed}
+    for m in plan['mutations']:
+        if m['op'] == 'update_field' and m['item_id'] not in failed_items and m['item_id'] in index:
+            index.set_value(m['item_id'], m['field'], m['to'])
+    report_board(index)
+    if fetch_status['complete']: store.prune(seen_item_ids)
+    # Only advance the watermark when every orphan was found and added; back
+    # it off from the search start to absorb search-index lag between runs.
+    if sweep_complete and not any(r['op'] == 'add_item' for r in failed):
+        store.set_meta('sweeper_watermark', (sweep_started - SWEEPER_OVERLAP).strftime('%Y-%m-%dT%H:%M:%SZ'))
+    store.close()
+    return summary
 
 def main():
+    args = parse_args()
     print("Starting Project Gardener...")
     if DRY_RUN: print("[DRY RUN MODE] No changes will be applied.")
 
-    project_id, fields = fetch_project_data(ORG, PROJECT_NUMBER)
-    if not project_id:
-        print("Failed to fetch project.")
+    if args.apply:
+        apply_plan(load_plan(args.apply), MutationBatcher(batch_size=MUTATION_BATCH_SIZE, dry_run=DRY_RUN))
         return
 
-    # Map Fields
-    field_map = {f['name']: f for f in fields}
-    status_field = field_map.get('Status')
-    priority_field = field_map.get('Priority')
-    
-    status_options = {opt['name']: opt['id'] for opt in status_field['options']} if status_field else {}
-    priority_options = {opt['name']: opt['id'] for opt in priority_field['options']} if priority_field else {}
+    if args.full: print("[FULL MODE] Ignoring stored state, reconciling everything.")
+    args.targets = parse_targets(','.join(args.target) if args.target else TARGETS)
+    contexts = org_contexts(args.targets, args.full)
 
-    # --- Phase 1: Garden Existing Items ---
-    project_items = fetch_items(project_id)
-    print(f"Gardening {len(project_items)} existing items...")
-    
-    # Store IDs of content (Issues/PRs) already on board to check for orphans
-    content_ids_on_board = set()
-
-    for item in project_items:
-        item_id = item['id']
-        content = item['content']
-        if not content: continue 
-        
-        # Track content ID
-        content_id = content.get('id')
-        if content_id: content_ids_on_board.add(content_id)
-
-        title = content.get('title', 'Unknown')
-        state = content.get('state') # OPEN, CLOSED, MERGED
-        author = content.get('author', {}).get('login') if content.get('author') else None
-        labels = [l['name'] for l in content.get('labels', {}).get('nodes', [])]
-        assignees = content.get('assignees', {}).get('nodes', [])
-        updated_at_str = item.get('updatedAt')
-        
-        is_closed = state in ['CLOSED', 'MERGED']
-        
-        current_values = {}
-        for fv in item['fieldValues']['nodes']:
-            if not fv: continue
-            field_name = fv['field'].get('name')
-            if 'name' in fv: val = fv['name'] 
-            elif 'text' in fv: val = fv['text']
-            elif 'date' in fv: val = fv['date']
-            else: val = None
-            current_values[field_name] = val
-            
-        current_status = current_values.get('Status')
-        status_updated_in_this_pass = False
-
-        print(f"Checking '{title}' (State: {state}, Status: {current_status})...")
-
-        # 1. State Sync: Closed/Merged -> Done
-        if is_closed and status_field and current_values.get('Status') != 'Done':
-            done_option_id = status_options.get('Done')
-            if done_option_id:
-                print(f"  [Sync] Content is closed. Setting Project Status to 'Done'.")
-                update_item_field(project_id, item_id, status_field['id'], done_option_id)
-                status_updated_in_this_pass = True
-            else:
-                print(f"  [Warning] 'Done' status option not found for Status field.")
-
-        # 2a. Auto-Progression: AI Assigned -> In Progress
-        if not status_updated_in_this_pass and not is_closed and 'ai-assigned' in labels and current_values.get('Status') != 'In Progress':
-             wip_option_id = status_options.get('In Progress')
-             if wip_option_id:
-                 print(f"  [Progression] Item is AI Assigned. Setting Status to 'In Progress'.")
-                 update_item_field(project_id, item_id, status_field['id'], wip_option_id)
-                 status_updated_in_this_pass = True
-
-        # 2b. Auto-Progression: PR Open -> In Progress
-        if not status_updated_in_this_pass and not is_closed and content.get('__typename') == 'PullRequest' and current_values.get('Status') != 'In Progress':
-            wip_option_id = status_options.get('In Progress')
-            if wip_option_id:
-                print(f"  [Progression] PR is Open. Setting Status to 'In Progress'.")
-                update_item_field(project_id, item_id, status_field['id'], wip_option_id)
-                status_updated_in_this_pass = True
-
-        # 3. Auto-Progression: Issue Assigned -> In Progress (if currently Todo or Empty)
-        if not status_updated_in_this_pass and not is_closed and content.get('__typename') == 'Issue' and assignees and current_values.get('Status') in [None, 'Todo']:
-             wip_option_id = status_options.get('In Progress')
-             if wip_option_id:
-                 print(f"  [Progression] Issue is Assigned. Setting Status to 'In Progress'.")
-                 update_item_field(project_id, item_id, status_field['id'], wip_option_id)
-                 status_updated_in_this_pass = True
-
-        # 4. Rule: Set Status to Todo if empty (and still empty after above checks)
-        if not status_updated_in_this_pass and not is_closed and not current_status and status_field:
-            todo_option_id = status_options.get('Todo')
-            if todo_option_id:
-                print(f"  [Triage] Status is empty. Setting to 'Todo'.")
-                update_item_field(project_id, item_id, status_field['id'], todo_option_id)
-                status_updated_in_this_pass = True
-
-        # 5. Priority: Derived from labels (Dynamic)
-        # Check for Critical first (Enforcement)
-        target_priority = None
-        force_update = False
-        
-        # Check for High/Critical labels that should FORCE an update
-        for label in labels:
-            n_label = label.lower()
-            if 'critical' in n_label or 'p0' in n_label:
-                target_priority = 'P0'
-                force_update = True
-                break
-            if 'high' in n_label or 'p1' in n_label:
-                target_priority = 'P1'
-                # Optional: Force update for P1 too? Let's say yes for consistency.
-                force_update = True
-                break
-        
-        # If no forced priority, check if empty and derive defaults
-        if not target_priority and 'Priority' not in current_values and state == 'OPEN':
-            for label in labels:
-                normalized = label.lower()
-                for key, prio in LABEL_PRIORITY_MAP.items():
-                    if key in normalized:
-                        target_priority = prio
-                        break
-                if target_priority: break
-            if not target_priority: target_priority = DEFAULT_PRIORITY
-
-        # Apply Update if needed
-        if target_priority:
-             # Map target string (P0, P1) to Option ID
-             target_option_id = None
-             for name, opt_id in priority_options.items():
-                 # Fuzzy match "P0" in "P0 - Critical"
-                 if target_priority in name:
-                     target_option_id = opt_id
-                     break
-             
-             if target_option_id:
-                 current_prio_val = current_values.get('Priority')
-                 # Update if: Forced (and different) OR Empty
-                 if (force_update and current_prio_val != target_priority) or (not current_prio_val and not force_update):
-                      reason = "Enforced" if force_update else "Derived"
-                      print(f"  [Priority] {reason} '{target_priority}' from labels.")
-                      update_item_field(project_id, item_id, priority_field['id'], target_option_id)
-                      status_updated_in_this_pass = True
-
-        # 5. Stale Detection
-        if state == 'OPEN' and updated_at_str:
-            last_update = datetime.datetime.fromisoformat(updated_at_str.replace('Z', '+00:00'))
-            days_inactive = (datetime.datetime.now(datetime.timezone.utc) - last_update).days
-            if days_inactive > 30 and current_status != 'Done':
-                print(f"  [Stale] Inactive for {days_inactive} days. Review required.")
-
-        # 6. AI Dispatcher
-        if 'ai-pending' in labels:
-            # We need repo/number from content
-            if content and 'number' in content and 'repository' in content:
-                repo_name = content['repository']['name']
-                repo_owner = content['repository']['owner']['login']
-                issue_num = content['number']
-                print(f"  [AI Dispatch] Found 'ai-pending'. Dispatching Agent...")
-                assign_ai_to_issue(repo_owner, repo_name, issue_num)
+    def run(target, log=None):
+        # garden_target and its helpers print directly, so concurrent boards' output interleaves.
+        with rate_budget.tenant(target['name']):
+            return garden_target(target, args, contexts[target['org']])
 
-    # --- Phase 2: The Sweeper (Find Orphans) ---
-    print("\nStarting Sweeper (Orphan Detection)...")
-    repos = fetch_all_repos(ORG)
-    for repo in repos:
-        # print(f"Scanning {repo}...")
-        open_items = fetch_repo_open_items(ORG, repo)
-        for item in open_items:
-            if item['id'] not in content_ids_on_board:
-                print(f"  [Sweeper] Found Orphan in {repo}: '{item['title']}'")
-                add_item_to_project(project_id, item['id'])
-
-def assign_ai_to_issue(owner, repo, issue_number):
-    print(f"  -> Assigning Copilot to issue {owner}/{repo}#{issue_number}...")
+    if len(args.targets) == 1:
+        run(args.targets[0])
+        return
+
+    print(f"Gardening {len(args.targets)} boards with {min(WORKERS, len(args.targets))} workers...")
+    outcomes = fan_out("project_gardener", args.targets, run, concurrency=WORKERS, timeout=TARGET_TIMEOUT, journal=False)
+    print(f"\n{'Board':<30} | {'Gardened':>8} | {'Skipped':>8} | {'Mutations':>9} | {'Failed':>6}")
+    for o in outcomes:
+        r = o['result']
+        if r: print(f"{o['key']:<30} | {r['gardened']:>8} | {r['skipped']:>8} | {r['mutations']:>9} | {r['failed']:>6}")
+        else: print(f"{o['key']:<30} | {o['error'] or 'project not found'}")
+
+def assign_ai_to_issues(batcher, dispatches, label_lookup=fetch_label_ids):
+    """Swap 'ai-pending' for 'ai-assigned' on every dispatched issue.
+
+    This script runs in GH Actions without access to MCP tools, so the Copilot
+    hand-off is expressed through labels. Label IDs are resolved for all affected
+    repos in one query and the swaps are queued on the shared batcher.
+    """
+    if not dispatches: return
+    for d in dispatches:
+        print(f"  -> Assigning Copilot to issue {d['owner']}/{d['repo']}#{d['number']}...")
     if DRY_RUN: return
-    
-    # We use gh api to invoke the copilot assignment if possible, 
-    # OR we use the mcp tool directly if we were running as an agent.
-    # But this script runs in GH Actions. GH Actions doesn't have access to 'mcp tools'.
-    # We will use `gh issue edit` to manage the state via labels.
-    
-    # Workaround: 
-    # I will simply ADD a specific label "copilot:assigned" using `gh issue edit`.
-    # GitHub Copilot Workspace often listens for specific triggers or UI interactions.
-    
-    # Let's assume for now I will just swap the labels, 
-    # and IF the user has the workspace trigger set up, it works.
-    
-    cmd = ['gh', 'issue', 'edit', str(issue_number), '--repo', f"{owner}/{repo}", '--remove-label', 'ai-pending', '--add-label', 'ai-assigned']
-    run_command(cmd)
-
-    # Note: Real "Assignment" to Copilot Workspace might need to be done manually 
+
+    label_ids = label_lookup([(d['owner'], d['repo']) for d in dispatches], ['ai-pending', 'ai-assigned'])
+    for d in dispatches:
+        item_id, content_id, owner, repo, issue_number = d['item_id'], d['content_id'], d['owner'], d['repo'], d['number']
+        repo_labels = label_ids.get((owner, repo), {})
+        if 'ai-assigned' not in repo_labels:
+            print(f"  [Warning] Label 'ai-assigned' does not exist in {owner}/{repo}; skipping #{issue_number}.")
+            continue
+        batcher.add_labels(content_id, [repo_labels['ai-assigned']], description=f"label {owner}/{repo}#{issue_number} ai-assigned", key=item_id)
+        if 'ai-pending' in repo_labels:
+            batcher.remove_labels(content_id, [repo_labels['ai-pending']], description=f"unlabel {owner}/{repo}#{issue_number} ai-pending", key=item_id)
+
+    # Note: Real "Assignment" to Copilot Workspace might need to be done manually
     # or via the specific "Open in Workspace" button until a public API is stable.
     # But managing the *intent* via labels is a good first step.
 
-    # Also, we can add a comment to summon it?
-    # "@github-copilot can you handle this?"
-    comment_cmd = ['gh', 'issue', 'comment', str(issue_number), '--repo', f"{owner}/{repo}", '--body', f"@{ORG}/copilot please handle this issue."]
-    # run_command(comment_cmd) # commenting might be noisy, let's stick to labels.
-
-    pass
+def report_board(index):
+    """Summarize the board after this run's changes from the item index."""
+    if not len(index): return
+    print(f"\nBoard: {len(index)} items.")
+    for field in index.INDEXED_FIELDS:
+        counts = sorted(index.counts(field).items(), key=lambda kv: (kv[0] is None, kv[0] or ''))
+        print(f"  {field}: " + ", ".join(f"{value or '(empty)'} {count}" for value, count in counts))
+
+def report_batch_results(phase, batcher):
+    """Flush the batcher and return the failed mutation results."""
+    results = batcher.flush()
+    if not results: return []
+    failed = [r for r in results if not r['ok']]
+    print(f"[{phase}] Applied {len(results) - len(failed)}/{len(results)} mutations ({batcher.requests_sent} requests so far).")
+    return failed
 
 if __name__ == "__main__":
-    main()
+    try:
+        tracing.run(main)
+    finally:
+        rate_budget.report()
+        tracing.report()
@@ -0,0 +1,275 @@
+import contextlib
+import datetime
+import os
+import re
+import threading
+import time
+
+import tracing
+
+# Share of each hourly rate-limit window one run may consume; the rest is left
+# for ai_worker.py and the other cron jobs sharing the token.
+BUDGET_SHARE = float(os.getenv('GH_BUDGET_SHARE', '0.5'))
+# Below this fraction of our share left, requests are serialized.
+LOW_WATER = 0.2
+# Never sleep longer than this for a window reset; give up the budget instead.
+MAX_WAIT_SECONDS = int(os.getenv('GH_BUDGET_MAX_WAIT', '900'))
+# When tenants (e.g. project boards) share a run, each is held to an equal
+# part of the share once less than this fraction of the share is left.
+FAIR_SHARE_BELOW = 0.5
+
+RATE_LIMIT_SELECTION = "rateLimit { cost remaining resetAt limit }"
+
+def with_rate_limit(query):
+    """Add `rateLimit` to a GraphQL query document so its cost comes back with the data.
+
+    Mutations have no `rateLimit` field and are returned unchanged.
+    """
+    stripped = query.strip()
+    if 'rateLimit' in stripped or stripped.startswith('mutation'): return query
+    end = stripped.rfind('}')
+    if end == -1: return query
+    return stripped[:end] + f"  {RATE_LIMIT_SELECTION}\n" + stripped[end:]
+
+def graphql_operation_name(query):
+    """Label a document by operation type and first root field, e.g. `query:search`."""
+    match = re.search(r'^\s*(query|mutation)?[^{]*\{\s*(?:\w+\s*:\s*)?(\w+)', query)
+    if not match: return "graphql"
+    kind = match.group(1) or "query"
+    return f"{kind}:{match.group(2)}"
+
+def rest_operation_name(method, path):
+    """Collapse a REST path into a template so calls group by endpoint, not by repo."""
+    path = path.split('?', 1)[0]
+    path = re.sub(r'^https?://[^/]+', '', path)
+    path = re.sub(r'/repos/[^/]+/[^/]+', '/repos/{repo}', path)
+    path = re.sub(r'/(contents|labels)/.+$', r'/\1/{name}', path)
+    path = re.sub(r'/\d+(?=/|$)', '/{n}', path)
+    return f"{method} {path}"
+
+class RateBudget:
+    """Track GitHub rate-limit spend for one run and pace requests to stay within a share.
+
+    Every response feeds `record()` with what GitHub reported: `rateLimit` for
+    GraphQL queries, `X-RateLimit-*` headers for everything else. Before each
+    request `acquire()` blocks while the run is over its share of the current
+    window and serializes requests when the share is nearly used up. When the
+    reset is more than MAX_WAIT_SECONDS away it refuses the call instead.
+
+    Calls made inside `tenant(name)` are also charged to that tenant. While
+    the share is plentiful tenants draw from it freely; once it runs low a
+    tenant that has spent its equal part of the window waits for the reset,
+    so one large board cannot starve the others.
+    """
+
+    def __init__(self, share=BUDGET_SHARE):
+        self.share = share
+        self.lock = threading.Condition()
+        self.windows = {}       # resource -> {limit, remaining, reset_at, spent}
+        self.operations = {}    # operation name -> {calls, cost}
+        self.phases = {}        # phase -> {calls, cost}
+        self.tenants = {}       # tenant -> {calls, cost}
+        self.tenant_spent = {}  # (tenant, resource) -> cost in the current window
+        self.active_tenants = []
+        self.default_phase = "run"
+        # Phase and tenant are per thread so concurrent tenants keep their own.
+        self.local = threading.local()
+        self.in_flight = 0
+        self.exhausted = set()  # (resource, reset_at) windows already reported as over budget
+
+    @property
+    def phase_name(self):
+        return getattr(self.local, 'phase', None) or self.default_phase
+
+    @phase_name.setter
+    def phase_name(self, name):
+        self.local.phase = name
+        if threading.current_thread() is threading.main_thread(): self.default_phase = name
+
+    @property
+    def tenant_name(self):
+        return getattr(self.local, 'tenant', None)
+
+    def context(self):
+        """The calling thread's (phase, tenant), for handing to helper threads."""
+        return self.phase_name, self.tenant_name
+
+    def bind(self, context):
+        """Charge calls from the current thread as `context()` was charged."""
+        self.local.phase, self.local.tenant = context
+
+    # --- Accounting ---
+
+    def start_phase(self, name):
+        """Attribute all following calls to `name` (for linear scripts)."""
+        self.phase_name = name
+        tracing.mark(f"phase:{name}")
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        previous, self.phase_name = self.phase_name, name
+        try:
+            with tracing.span(name, "phase"):
+                yield
+        finally:
+            self.phase_name = previous
+
+    @contextlib.contextmanager
+    def tenant(self, name):
+        """Charge calls made by this thread to `name` and give it a fair part of the share."""
+        with self.lock:
+            self.active_tenants.append(name)
+        previous, self.local.tenant = self.tenant_name, name
+        try:
+            yield
+        finally:
+            self.local.tenant = previous
+            with self.lock:
+                self.active_tenants.remove(name)
+                self.lock.notify_all()
+
+    def record(self, resource, operation, cost, remaining=None, limit=None, reset_at=None):
+        tenant = self.tenant_name
+        with self.lock:
+            window = self.windows.setdefault(resource, {"limit": None, "remaining": None, "reset_at": None, "spent": 0})
+            if reset_at and window['reset_at'] and reset_at > window['reset_at']:
+                window['spent'] = 0  # a new window started
+                for key in [k for k in self.tenant_spent if k[1] == resource]: self.tenant_spent[key] = 0
+            window['spent'] += cost
+            if tenant is not None:
+                self.tenant_spent[(tenant, resource)] = self.tenant_spent.get((tenant, resource), 0) + cost
+                entry = self.tenants.setdefault(tenant, {"calls": 0, "cost": 0})
+                entry['calls'] += 1
+                entry['cost'] += cost
+            if limit is not None: window['limit'] = limit
+            if remaining is not None: window['remaining'] = remaining
+            if reset_at is not None: window['reset_at'] = reset_at
+            for table, key in ((self.operations, operation), (self.phases, self.phase_name)):
+                entry = table.setdefault(key, {"calls": 0, "cost": 0})
+                entry['calls'] += 1
+                entry['cost'] += cost
+            self.lock.notify_all()
+
+    def record_graphql(self, operation, response, headers=None):
+        """Record a GraphQL response's cost and return it."""
+        rate = ((response or {}).get('data') or {}).pop('rateLimit', None) if isinstance(response, dict) else None
+        if rate:
+            reset_at = datetime.datetime.fromisoformat(rate['resetAt'].replace('Z', '+00:00')).timestamp()
+            self.record('graphql', operation, rate['cost'], rate['remaining'], rate['limit'], reset_at)
+            return rate['cost']
+        # Mutations carry no rateLimit block; GitHub charges them one point each.
+        self.record_headers('graphql', operation, headers, default_cost=1)
+        return 1
+
+    def record_headers(self, resource, operation, headers, default_cost=1):
+        # gh canonicalizes header names (X-Ratelimit-Remaining), so match case-insensitively.
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        def header(name):
+            value = headers.get(name.lower())
+            return int(value) if value and value.isdigit() else None
+        resource = headers.get('x-ratelimit-resource') or resource
+        self.record(resource, operation, default_cost, header('X-RateLimit-Remaining'),
+                    header('X-RateLimit-Limit'), header('X-RateLimit-Reset'))
+
+    # --- Pacing ---
+
+    def available(self, resource):
+        """Points of our share still unspent in the current window (None if unknown)."""
+        window = self.windows.get(resource)
+        if not window or window['limit'] is None or window['remaining'] is None: return None
+        reserve = window['limit'] * (1 - self.share)
+        return window['remaining'] - reserve
+
+    def expected_cost(self, operation):
+        """Running average cost of `operation` so far (1 until it has been seen)."""
+        entry = self.operations.get(operation)
+        return entry['cost'] / entry['calls'] if entry and entry['calls'] else 1
+
+    def over_fair_share(self, resource, tenant, available):
+        """True when `tenant` has spent its equal part of a share that is running low."""
+        window = self.windows.get(resource)
+        if tenant is None or len(self.active_tenants) < 2 or available is None or not window['limit']: return False
+        share = window['limit'] * self.share
+        if available >= share * FAIR_SHARE_BELOW: return False
+        return self.tenant_spent.get((tenant, resource), 0) >= share / len(self.active_tenants)
+
+    def acquire(self, resource, operation, max_concurrency):
+        """Wait for a request slot; False when the share is spent and the reset is too far off to wait for."""
+        tenant = self.tenant_name
+        announced = False
+        with self.lock:
+            while True:
+                available = self.available(resource)
+                window = self.windows.get(resource) or {}
+                if self.over_fair_share(resource, tenant, available) and window.get('reset_at'):
+                    wait = window['reset_at'] - time.time()
+                    if 0 < wait <= MAX_WAIT_SECONDS:
+                        print(f"[Budget] {tenant} used its part of the {resource} share; waiting up to {int(wait)}s for reset.")
+                        # Re-check periodically: a tenant finishing enlarges everyone's part.
+                        self.lock.wait(timeout=min(wait, 5))
+                        continue
+                if available is not None and available < self.expected_cost(operation) and window.get('reset_at'):
+                    wait = window['reset_at'] - time.time()
+                    if wait > MAX_WAIT_SECONDS:
+                        if (resource, window['reset_at']) not in self.exhausted:
+                            self.exhausted.add((resource, window['reset_at']))
+                            print(f"[Budget] {resource} share exhausted ({window['remaining']} left of {window['limit']}) "
+                                  f"and the reset is {int(wait)}s away; skipping calls until then.")
+                        return False
+                    if wait > 0:
+                        if not announced:
+                            print(f"[Budget] {resource} share exhausted ({window['remaining']} left of {window['limit']}); waiting {int(wait)}s for reset.")
+                            announced = True
+                        # Other threads' record()/release() wake us early; only the reset refills the window.
+                        self.lock.wait(timeout=wait)
+                        continue
+                    window['remaining'] = window['limit']
+                    continue
+                limit = max_concurrency
+                if available is not None and window.get('limit') and available < window['limit'] * self.share * LOW_WATER:
+                    limit = 1
+                if self.in_flight < limit:
+                    self.in_flight += 1
+                    return True
+                self.lock.wait(timeout=1)
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.lock.notify_all()
+
+    # --- Reporting ---
+
+    def report(self):
+        if not self.phases: return
+        print("\n--- GitHub API budget ---")
+        print(f"{'Phase':<30} | {'Calls':>7} | {'Cost':>7}")
+        for name, entry in self.phases.items():
+            print(f"{name:<30} | {entry['calls']:>7} | {entry['cost']:>7}")
+        if len(self.tenants) > 1:
+            print(f"\n{'Target':<30} | {'Calls':>7} | {'Cost':>7}")
+            for name, entry in sorted(self.tenants.items(), key=lambda kv: -kv[1]['cost']):
+                print(f"{name:<30} | {entry['calls']:>7} | {entry['cost']:>7}")
+        print(f"\n{'Operation':<60} | {'Calls':>7} | {'Cost':>7} | {'Avg':>6}")
+        for name, entry in sorted(self.operations.items(), key=lambda kv: -kv[1]['cost']):
+            print(f"{name:<60} | {entry['calls']:>7} | {entry['cost']:>7} | {entry['cost'] / entry['calls']:>6.1f}")
+        for resource, window in self.windows.items():
+            if window['remaining'] is not None:
+                print(f"[{resource}] {window['remaining']}/{window['limit']} remaining after spending {window['spent']} this run.")
+
+_budget = RateBudget()
+
+def get_budget():
+    return _budget
+
+def phase(name):
+    return _budget.phase(name)
+
+def start_phase(name):
+    _budget.start_phase(name)
+
+def tenant(name):
+    return _budget.tenant(name)
+
+def report():
+    _budget.report()
@@ -0,0 +1,142 @@
+import datetime
+import json
+import os
+import time
+
+from github_client import graphql
+
+# One snapshot of the org's repositories, shared by every script that walks
+# the org. Within SNAPSHOT_TTL the snapshot is used as-is; after that only
+# repos updated or pushed since the last refresh are fetched, and a full
+# re-enumeration (which also drops deleted repos) happens every FULL_REFRESH_AFTER.
+SNAPSHOT_DIR = os.getenv('REPO_INVENTORY_DIR') or os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'atnplex-scripts')
+SNAPSHOT_TTL = int(os.getenv('REPO_INVENTORY_TTL', '3600'))
+FULL_REFRESH_AFTER = int(os.getenv('REPO_INVENTORY_FULL_REFRESH', str(24 * 3600)))
+# Repos changed this long before a refresh started are re-fetched, to absorb clock skew.
+WATERMARK_OVERLAP = 600
+
+REPOS_QUERY = """
+query($org: String!, $cursor: String, $order: RepositoryOrderField!) {
+  organization(login: $org) {
+    repositories(first: 100, after: $cursor, orderBy: {field: $order, direction: DESC}) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        id
+        name
+        description
+        isArchived
+        pushedAt
+        updatedAt
+        defaultBranchRef { name }
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+      }
+    }
+  }
+}
+"""
+
+def snapshot_path(org):
+    return os.path.join(SNAPSHOT_DIR, f"repos-{org}.json")
+
+def to_record(node):
+    """Shape a GraphQL repository like `gh repo list --json` output, which the scripts expect."""
+    topics = [n['topic']['name'] for n in (node.get('repositoryTopics') or {}).get('nodes', []) if n]
+    return {
+        "id": node['id'],
+        "name": node['name'],
+        "description": node.get('description') or "",
+        "repositoryTopics": [{"name": t} for t in topics] or None,
+        "defaultBranchRef": node.get('defaultBranchRef') or {},  # None for empty repos
+        "pushedAt": node.get('pushedAt'),
+        "updatedAt": node.get('updatedAt'),
+        "isArchived": node.get('isArchived', False),
+    }
+
+def fetch_pages(org, order, since=None):
+    """Page through repositories newest-first; with `since`, stop at the first older repo.
+
+    Returns (records, totalCount), or (None, None) if a page failed.
+    """
+    records, cursor, total = [], None, None
+    while True:
+        response = graphql(REPOS_QUERY, {"org": org, "cursor": cursor, "order": order})
+        connection = (((response or {}).get('data') or {}).get('organization') or {}).get('repositories')
+        if not connection:
+            print(f"Error listing repositories for {org}: {(response or {}).get('errors')}")
+            return None, None
+        total = connection['totalCount']
+        nodes = [n for n in connection['nodes'] if n]
+        field = 'updatedAt' if order == 'UPDATED_AT' else 'pushedAt'
+        fresh = [n for n in nodes if not since or (n.get(field) or '') >= since]
+        records.extend(to_record(n) for n in fresh)
+        if since and len(fresh) < len(nodes): break
+        if not connection['pageInfo']['hasNextPage']: break
+        cursor = connection['pageInfo']['endCursor']
+    return records, total
+
+def load_snapshot(org):
+    try:
+        with open(snapshot_path(org), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def save_snapshot(org, snapshot):
+    path = snapshot_path(org)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+def refresh(org, snapshot):
+    """Bring a snapshot up to date; returns the new snapshot or None on failure."""
+    now = time.time()
+    started_at = datetime.datetime.fromtimestamp(now - WATERMARK_OVERLAP, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    if snapshot and now - snapshot.get('full_refresh_at', 0) < FULL_REFRESH_AFTER:
+        repos = {r['name']: r for r in snapshot['repos']}
+        since = snapshot['watermark']
+        total = None
+        # A push does not always bump updatedAt (and vice versa), so walk both orders.
+        for order in ('UPDATED_AT', 'PUSHED_AT'):
+            changed, total = fetch_pages(org, order, since)
+            if changed is None: return None
+            repos.update((r['name'], r) for r in changed)
+        if total == len(repos):
+            print(f"Repository inventory: {len(repos)} repos, refreshed incrementally.")
+            return dict(snapshot, repos=sorted(repos.values(), key=lambda r: r['name']),
+                        refreshed_at=now, watermark=started_at)
+        # Repos were deleted, renamed or transferred away; re-enumerate.
+
+    records, _ = fetch_pages(org, 'UPDATED_AT')
+    if records is None: return None
+    print(f"Repository inventory: {len(records)} repos, fully enumerated.")
+    return {"org": org, "repos": sorted(records, key=lambda r: r['name']),
+            "refreshed_at": now, "full_refresh_at": now, "watermark": started_at}
+
+def load_repos(org, max_age=SNAPSHOT_TTL):
+    """All repositories of `org`, from the shared snapshot when it is younger than `max_age` seconds.
+
+    Falls back to a stale snapshot when the refresh fails, and returns [] only
+    when there is nothing to fall back to.
+    """
+    snapshot = load_snapshot(org)
+    if snapshot and time.time() - snapshot.get('refreshed_at', 0) < max_age:
+        return snapshot['repos']
+    fresh = refresh(org, snapshot)
+    if fresh:
+        save_snapshot(org, fresh)
+        return fresh['repos']
+    if snapshot:
+        print(f"Using stale repository inventory from {snapshot_path(org)}.")
+        return snapshot['repos']
+    return []
+
+def mark_stale(org):
+    """Force the next `load_repos` to refresh; call after changing repos in the org."""
+    snapshot = load_snapshot(org)
+    if snapshot:
+        snapshot['refreshed_at'] = 0
+        save_snapshot(org, snapshot)
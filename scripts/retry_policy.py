@@ -0,0 +1,116 @@
+import os
+import random
+import re
+import threading
+import time
+
+# Attempts per call (the first try included) before a failure is returned to the caller.
+MAX_ATTEMPTS = int(os.getenv('GH_RETRY_ATTEMPTS', '5'))
+BACKOFF_BASE = float(os.getenv('GH_RETRY_BACKOFF', '1'))
+BACKOFF_CAP = float(os.getenv('GH_RETRY_BACKOFF_CAP', '60'))
+# A rate-limit reset further away than this is not waited for; the call fails instead.
+MAX_WAIT_SECONDS = int(os.getenv('GH_RETRY_MAX_WAIT', '900'))
+# Consecutive 5xx/network failures (across all workers) that open the circuit, and for how long.
+BREAKER_THRESHOLD = int(os.getenv('GH_BREAKER_THRESHOLD', '5'))
+BREAKER_COOLDOWN = float(os.getenv('GH_BREAKER_COOLDOWN', '30'))
+
+# Failure classes. Rate-limit and abuse rejections are never processed by
+# GitHub, so they are safe to retry for any method; 5xx and network errors
+# may have been applied and are only retried for idempotent calls.
+RATE_LIMIT = "rate_limit"
+ABUSE = "abuse"
+SERVER = "server"
+NETWORK = "network"
+REJECTED = (RATE_LIMIT, ABUSE)
+
+def lower_headers(headers):
+    return {k.lower(): v for k, v in (headers or {}).items()}
+
+def classify(status, headers=None, body=b'', error=None):
+    """Return the failure class of one HTTP attempt, or None when it should not be retried."""
+    if error is not None or status is None: return NETWORK
+    headers = lower_headers(headers)
+    if status in (403, 429):
+        text = body.decode('utf-8', 'replace') if isinstance(body, bytes) else str(body or '')
+        if 'retry-after' in headers or re.search(r'secondary rate limit|abuse', text, re.IGNORECASE): return ABUSE
+        if headers.get('x-ratelimit-remaining') == '0': return RATE_LIMIT
+        return None
+    if status >= 500: return SERVER
+    # GraphQL reports an exhausted primary limit as a 200 with a RATE_LIMITED error.
+    if status == 200 and isinstance(body, bytes) and b'"RATE_LIMITED"' in body: return RATE_LIMIT
+    return None
+
+def backoff(attempt):
+    """Full-jitter exponential backoff for the given 0-based attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def retry_delay(category, attempt, headers=None):
+    """Seconds to wait before the next attempt, or None if it is not worth waiting for."""
+    headers = lower_headers(headers)
+    retry_after = headers.get('retry-after')
+    if retry_after and retry_after.isdigit():
+        delay = float(retry_after)
+    elif category == RATE_LIMIT and (headers.get('x-ratelimit-reset') or '').isdigit():
+        delay = max(0.0, int(headers['x-ratelimit-reset']) - time.time()) + 1
+    elif category == ABUSE:
+        # GitHub asks for at least a minute when a secondary limit comes without Retry-After.
+        delay = max(60.0, backoff(attempt))
+    else:
+        delay = backoff(attempt)
+    return delay if delay <= MAX_WAIT_SECONDS else None
+
+class CircuitBreaker:
+    """Shared pause switch for every worker talking to one API.
+
+    Rate-limit and abuse rejections open it for as long as GitHub asked;
+    BREAKER_THRESHOLD consecutive server/network failures open it for a
+    cooldown that doubles while the API stays degraded. `wait()` blocks until
+    it is closed again, so workers stop hammering the API together.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+
+    def wait(self):
+        """Block while the circuit is open; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.time()
+            if remaining <= 0: return waited
+            time.sleep(remaining)
+            waited += remaining
+
+    def open(self, seconds, reason):
+        with self.lock:
+            until = time.time() + seconds
+            if until <= self.open_until: return
+            self.open_until = until
+        print(f"[Circuit] {reason}; pausing all API calls for {seconds:.0f}s.")
+
+    def success(self):
+        with self.lock:
+            if self.failures >= self.threshold: print("[Circuit] API recovered; resuming.")
+            self.failures = 0
+            self.trips = 0
+
+    def failure(self, category, delay=None):
+        if category in REJECTED:
+            if delay: self.open(delay, f"GitHub {category.replace('_', ' ')}")
+            return
+        with self.lock:
+            self.failures += 1
+            if self.failures < self.threshold: return
+            cooldown = min(self.cooldown * 2 ** self.trips, MAX_WAIT_SECONDS)
+            self.trips += 1
+        self.open(cooldown, f"{self.failures} consecutive {category} failures")
+
+_breaker = CircuitBreaker()
+
+def get_breaker():
+    return _breaker
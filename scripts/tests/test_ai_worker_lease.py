@@ -0,0 +1,113 @@
+import datetime
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_worker
+from ai_worker import LEASE_TTL_SECONDS, claim_issue, lease_state
+
+EXPIRED = LEASE_TTL_SECONDS + 60
+
+class Thread:
+    """An issue's comment thread as the GitHub API would serve it to competing runs."""
+
+    def __init__(self):
+        self.comments = []
+        self.next_id = 1
+
+    def marker(self, kind, run, age=0):
+        at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=age)
+        self.post(f"ack\n\n<!-- ai-worker:{kind} run={run} at={at.strftime('%Y-%m-%dT%H:%M:%SZ')} -->")
+
+    def post(self, body):
+        comment = {"id": self.next_id, "body": body}
+        self.next_id += 1
+        self.comments.append(comment)
+        return comment
+
+    def delete(self, method, path):
+        comment_id = int(path.rsplit('/', 1)[1])
+        self.comments = [c for c in self.comments if c['id'] != comment_id]
+
+    def claim(self, run_id, racer=None, racer_first=False):
+        """claim_issue() as `run_id`; `racer` posts its own lease after our first read, just before or after ours."""
+        def post(full_name, number, body):
+            if racer and racer_first: self.marker('lease', racer)
+            comment = self.post(body)
+            if racer and not racer_first: self.marker('lease', racer)
+            return comment
+        with mock.patch.object(ai_worker, 'RUN_ID', run_id), \
+             mock.patch.object(ai_worker, 'list_comments', side_effect=lambda *a: list(self.comments)), \
+             mock.patch.object(ai_worker, 'comment_on_issue', side_effect=post), \
+             mock.patch.object(ai_worker, 'rest', side_effect=self.delete):
+            return claim_issue("atnplex/repo", 1, "ack")
+
+    def runs(self):
+        return [run for _, run in lease_state(self.comments)[1]]
+
+class LeaseStateTest(unittest.TestCase):
+    def test_plain_comments_carry_no_lease(self):
+        thread = Thread()
+        thread.post("hello")
+        self.assertEqual(lease_state(thread.comments), (False, []))
+
+    def test_expired_markers_are_ignored(self):
+        thread = Thread()
+        thread.marker('done', 'r1', age=EXPIRED)
+        thread.marker('lease', 'r2', age=EXPIRED)
+        self.assertEqual(lease_state(thread.comments), (False, []))
+
+    def test_done_releases_earlier_leases_only(self):
+        thread = Thread()
+        thread.marker('lease', 'r1')
+        thread.marker('done', 'r1')
+        self.assertEqual(lease_state(thread.comments), (True, []))
+        thread.marker('lease', 'r2')
+        self.assertEqual(lease_state(thread.comments), (False, [(3, 'r2')]))
+
+class ClaimIssueTest(unittest.TestCase):
+    def test_free_issue_is_claimed(self):
+        thread = Thread()
+        self.assertTrue(thread.claim('r1'))
+        self.assertEqual(thread.runs(), ['r1'])
+
+    def test_live_lease_of_another_run_is_respected(self):
+        thread = Thread()
+        thread.marker('lease', 'other')
+        self.assertFalse(thread.claim('r1'))
+        self.assertEqual(thread.runs(), ['other'])
+
+    def test_abandoned_lease_is_taken_over(self):
+        thread = Thread()
+        thread.marker('lease', 'crashed', age=EXPIRED)
+        self.assertTrue(thread.claim('r1'))
+
+    def test_recently_finished_issue_is_left_alone(self):
+        thread = Thread()
+        thread.marker('done', 'other')
+        self.assertFalse(thread.claim('r1'))
+        self.assertEqual(len(thread.comments), 1)
+
+    def test_loser_of_a_race_deletes_its_lease(self):
+        thread = Thread()
+        self.assertFalse(thread.claim('r1', racer='early', racer_first=True))
+        self.assertEqual(thread.runs(), ['early'])
+
+    def test_winner_of_a_race_keeps_its_lease(self):
+        thread = Thread()
+        self.assertTrue(thread.claim('r1', racer='late'))
+        self.assertEqual(thread.runs()[0], 'r1')
+
+    def test_rerun_attempt_owns_its_earlier_lease(self):
+        # Re-running a workflow keeps GITHUB_RUN_ID; the first attempt's lease is still live.
+        thread = Thread()
+        thread.marker('lease', 'run-42')
+        self.assertTrue(thread.claim('run-42'))
+        self.assertEqual(thread.runs(), ['run-42'])
+        self.assertEqual(len(thread.comments), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audit_repos
+import fanout
+
+REPOS = [{"name": name, "description": "d", "repositoryTopics": ["t"], "pushedAt": "2026-01-01T00:00:00Z",
+          "updatedAt": "2026-01-01T00:00:00Z", "defaultBranchRef": {"name": "main"}} for name in ("good", "broken")]
+
+def audit(repo):
+    if repo['name'] == "broken": raise RuntimeError("tree fetch exploded")
+    return {"name": repo['name'], "pushed_at": repo['pushedAt'], "updated_at": repo['updatedAt'], "has_topics": True,
+            "has_desc": True, "files": {c: True for c in audit_repos.REQUIRED_PATHS}, "compliant": True, "incomplete": False}
+
+class FailedRecheckTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        paths = {name: os.path.join(tmp.name, os.path.basename(getattr(audit_repos, name)))
+                 for name in ('REPORT_MD', 'REPORT_JSONL', 'REPORT_CSV', 'DELTA_MD')}
+        for patcher in [mock.patch.object(audit_repos, name, path) for name, path in paths.items()] + [
+                mock.patch.object(fanout, 'JOURNAL_DIR', tmp.name),
+                mock.patch.object(audit_repos, 'fetch_all_repos', return_value=REPOS),
+                mock.patch.object(audit_repos, 'audit_repo', side_effect=audit),
+                # load_previous() binds the report path as a default argument.
+                mock.patch.object(audit_repos, 'load_previous', side_effect=lambda load=audit_repos.load_previous:
+                                  load(paths['REPORT_JSONL'])),
+                mock.patch.object(sys, 'argv', ['audit_repos.py'])]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.paths = paths
+
+    def run_audit(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            audit_repos.main()
+        return output.getvalue()
+
+    def test_repo_without_previous_row_is_reported_as_an_error(self):
+        output = self.run_audit()
+        with open(self.paths['REPORT_JSONL'], encoding='utf-8') as f:
+            rows = {r['name']: r for r in map(json.loads, f)}
+        self.assertEqual(set(rows), {"good", "broken"})
+        self.assertEqual(rows["broken"]['error'], "RuntimeError: tree fetch exploded")
+        self.assertTrue(rows["broken"]['incomplete'])
+        with open(self.paths['REPORT_CSV'], encoding='utf-8') as f:
+            self.assertEqual([r['name'] for r in csv.DictReader(f)], ["good", "broken"])
+        with open(self.paths['REPORT_MD'], encoding='utf-8') as f:
+            self.assertIn("**Score**: 1/2 (50%), 1 could not be checked", f.read())
+        self.assertIn("1/2 Repositories are Fully Compliant. 1 could not be checked.", output)
+
+    def test_failed_recheck_keeps_the_previous_row(self):
+        previous = dict(audit(REPOS[0]), name="broken", incomplete=True)
+        with open(self.paths['REPORT_JSONL'], 'w', encoding='utf-8') as f:
+            f.write(json.dumps(previous) + "\n")
+        self.run_audit()
+        with open(self.paths['REPORT_JSONL'], encoding='utf-8') as f:
+            rows = {r['name']: r for r in map(json.loads, f)}
+        self.assertNotIn('error', rows["broken"])
+        self.assertTrue(rows["broken"]['compliant'])
+
+    def test_unchecked_repos_get_their_own_delta_section(self):
+        with open(self.paths['REPORT_JSONL'], 'w', encoding='utf-8') as f:
+            f.write(json.dumps(dict(audit(REPOS[0]), pushed_at="old")) + "\n")
+        self.run_audit()
+        with open(self.paths['DELTA_MD'], encoding='utf-8') as f:
+            delta = f.read()
+        self.assertIn("## Could not be checked (1)\n\n- broken\n", delta)
+        self.assertIn("## Became non-compliant (0)", delta)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fanout
+from fanout import Journal, fan_out, inputs_hash
+
+REPOS = [{"name": f"repo-{i}"} for i in range(6)]
+
+class FanOutTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(fanout, 'JOURNAL_DIR', tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.journal_path = os.path.join(tmp.name, "test.jsonl")
+
+    def run_quietly(self, *args, **kwargs):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            outcomes = fan_out(*args, **kwargs)
+        return outcomes, output.getvalue()
+
+    def test_results_keep_input_order_and_task_output_stays_together(self):
+        def work(repo, log):
+            log("start", repo['name'])
+            time.sleep(0.01 * (6 - int(repo['name'][-1])))
+            log("end", repo['name'])
+            return repo['name'].upper()
+        outcomes, output = self.run_quietly("test", REPOS, work, concurrency=4, journal=False)
+        self.assertEqual([o['result'] for o in outcomes], [r['name'].upper() for r in REPOS])
+        lines = output.splitlines()
+        for repo in REPOS:
+            start = lines.index(f"start {repo['name']}")
+            self.assertEqual(lines[start + 1], f"end {repo['name']}")
+
+    def test_sys_stdout_is_left_alone(self):
+        seen = []
+        fan_out("test", REPOS[:2], lambda repo, log: seen.append(sys.stdout), journal=False)
+        self.assertEqual(seen, [sys.stdout, sys.stdout])
+
+    def test_failures_are_reported_not_raised(self):
+        def work(repo, log):
+            if repo['name'] == "repo-2": raise ValueError("boom")
+            return "ok"
+        outcomes, output = self.run_quietly("test", REPOS, work, journal=False)
+        self.assertEqual(outcomes[2]['error'], "ValueError: boom")
+        self.assertEqual(sum(1 for o in outcomes if o['result'] == "ok"), 5)
+        self.assertIn("1 of 6 failed", output)
+
+    def test_hung_task_is_abandoned_on_a_daemon_thread(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        threads = {}
+        def work(repo, log):
+            threads[repo['name']] = threading.current_thread()
+            if repo['name'] == "repo-0": release.wait()
+            return "ok"
+        started = time.monotonic()
+        outcomes, _ = self.run_quietly("test", REPOS[:3], work, concurrency=1, timeout=0.2, journal=False)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(outcomes[0]['error'], "timed out after 0s")
+        # A replacement worker ran the rest even though the only original worker is stuck.
+        self.assertEqual([o['result'] for o in outcomes[1:]], ["ok", "ok"])
+        self.assertTrue(threads["repo-0"].daemon)
+        self.assertTrue(threads["repo-0"].is_alive())
+
+    def test_hung_task_does_not_block_interpreter_exit(self):
+        script = ("import threading, fanout\n"
+                  "fanout.fan_out('hang', [{'name': 'a'}], lambda repo, log: threading.Event().wait(), timeout=0.2, journal=False)\n")
+        result = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                capture_output=True, text=True, timeout=30)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("a: timed out", result.stdout)
+
+    def test_interrupted_run_resumes_from_the_journal(self):
+        calls = []
+        def flaky(repo, log):
+            calls.append(repo['name'])
+            if repo['name'] == "repo-4": raise RuntimeError("interrupted")
+            return {"name": repo['name']}
+        self.run_quietly("test", REPOS, flaky)
+        self.assertTrue(os.path.exists(self.journal_path))
+        calls.clear()
+        outcomes, output = self.run_quietly("test", REPOS, lambda repo, log: calls.append(repo['name']) or {"name": repo['name']})
+        self.assertEqual(calls, ["repo-4"])
+        self.assertEqual(sum(o['resumed'] for o in outcomes), 5)
+        self.assertIn("Resuming: 5/6", output)
+        # A clean run removes its journal.
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_changed_fingerprint_starts_over(self):
+        self.run_quietly("test", REPOS, lambda repo, log: 1 / (repo['name'] != "repo-0"), fingerprint="v1")
+        outcomes, output = self.run_quietly("test", REPOS, lambda repo, log: 2, fingerprint="v2")
+        self.assertIn("inputs changed", output)
+        self.assertEqual([o['result'] for o in outcomes], [2] * 6)
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "j.jsonl")
+
+    def write(self, lines):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for line in lines: f.write((line if isinstance(line, str) else json.dumps(line)) + "\n")
+
+    def test_resumes_matching_inputs_and_skips_a_torn_line(self):
+        self.write([{"header": {"started_at": time.time(), "inputs": "h"}}, {"key": "a", "result": 1}, '{"key": "b", "res'])
+        journal = Journal(self.path, "h")
+        self.addCleanup(journal.close)
+        self.assertEqual(journal.completed, {"a": 1})
+
+    def test_expired_or_headerless_journals_are_discarded(self):
+        for lines in ([{"header": {"started_at": time.time() - 100, "inputs": "h"}}, {"key": "a", "result": 1}],
+                      [{"key": "a", "result": 1}]):
+            with self.subTest(lines[0]):
+                self.write(lines)
+                with redirect_stdout(io.StringIO()):
+                    journal = Journal(self.path, "h", ttl=50)
+                journal.close()
+                self.assertEqual(journal.completed, {})
+                header, entries = Journal.load(self.path)
+                self.assertEqual((header['inputs'], entries), ("h", {}))
+
+    def test_inputs_hash_depends_on_items_and_fingerprint(self):
+        key = lambda item: item['name']
+        base = inputs_hash(REPOS, key, "template")
+        self.assertEqual(base, inputs_hash([dict(r) for r in REPOS], key, "template"))
+        self.assertNotEqual(base, inputs_hash(REPOS[:-1], key, "template"))
+        self.assertNotEqual(base, inputs_hash(REPOS, key, "other template"))
+
+if __name__ == "__main__":
+    unittest.main()
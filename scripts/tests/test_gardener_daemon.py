@@ -0,0 +1,125 @@
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gardener_daemon
+from gardener_daemon import Debouncer, Stats, board_items, make_handler, serve, sign, targets_for
+
+SECRET = "s3cret"
+
+class TargetsForTest(unittest.TestCase):
+    def test_issue_and_pull_request_events_garden_their_content(self):
+        self.assertEqual(targets_for('issues', {"action": "labeled", "issue": {"node_id": "I_1"}}, {"PVT_1"}),
+                         [('content', "I_1")])
+        self.assertEqual(targets_for('pull_request', {"action": "closed", "pull_request": {"node_id": "PR_1"}}, {"PVT_1"}),
+                         [('content', "PR_1")])
+        self.assertEqual(targets_for('issues', {"action": "deleted", "issue": {"node_id": "I_1"}}, {"PVT_1"}), [])
+
+    def test_item_events_only_for_gardened_boards(self):
+        payload = {"action": "edited", "projects_v2_item": {"node_id": "PVTI_1", "project_node_id": "PVT_2"}}
+        self.assertEqual(targets_for('projects_v2_item', payload, {"PVT_1", "PVT_2"}), [('item', "PVTI_1")])
+        self.assertEqual(targets_for('projects_v2_item', payload, {"PVT_1"}), [])
+
+    def test_only_renamed_labels_matter(self):
+        payload = {"action": "edited", "repository": {"full_name": "atnplex/repo"}, "label": {"name": "bug"}}
+        self.assertEqual(targets_for('label', payload, set()), [('label', "atnplex/repo:bug")])
+        self.assertEqual(targets_for('label', dict(payload, action="created"), set()), [])
+
+class BoardItemsTest(unittest.TestCase):
+    def content(self, node_id, owner, boards=(), state="OPEN"):
+        items = [{"id": f"PVTI_{node_id}_{b}", "project": {"id": b}} for b in boards]
+        return {"__typename": "Issue", "id": node_id, "state": state, "title": node_id,
+                "repository": {"name": "repo", "owner": {"login": owner}}, "projectItems": {"nodes": items}}
+
+    def test_items_and_orphans_are_per_board(self):
+        nodes = [self.content("I_1", "atnplex", ["PVT_1"]), self.content("I_2", "atnplex"),
+                 self.content("I_3", "other-org"), self.content("I_4", "atnplex", state="CLOSED")]
+        with mock.patch.object(gardener_daemon, 'complete_item_connections'):
+            items, orphans = board_items(nodes, "PVT_1", "atnplex")
+            other_items, other_orphans = board_items(nodes, "PVT_2", "other-org")
+        self.assertEqual([i['id'] for i in items], ["PVTI_I_1_PVT_1"])
+        self.assertEqual(items[0]['content']['id'], "I_1")
+        self.assertNotIn('projectItems', items[0]['content'])
+        # Open content of the board's own org only; closed content is never added.
+        self.assertEqual([o['id'] for o in orphans], ["I_2"])
+        self.assertEqual((other_items, [o['id'] for o in other_orphans]), ([], ["I_3"]))
+
+class DebouncerTest(unittest.TestCase):
+    def test_bursts_coalesce_until_quiet(self):
+        debouncer = Debouncer(quiet=0.05, max_delay=10)
+        for _ in range(3): debouncer.add(('content', "I_1"))
+        self.assertEqual(debouncer.take_ready(timeout=0), [])
+        time.sleep(0.06)
+        self.assertEqual(debouncer.take_ready(timeout=0), [('content', "I_1")])
+        self.assertEqual(len(debouncer), 0)
+
+    def test_max_delay_releases_a_busy_target(self):
+        debouncer = Debouncer(quiet=10, max_delay=0.05)
+        debouncer.add(('item', "PVTI_1"))
+        time.sleep(0.06)
+        debouncer.add(('item', "PVTI_1"))
+        self.assertEqual(debouncer.take_ready(timeout=0), [('item', "PVTI_1")])
+
+class WebhookTest(unittest.TestCase):
+    def setUp(self):
+        self.debouncer = Debouncer(quiet=60)
+        self.stats = Stats()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler({"PVT_1"}, self.debouncer, SECRET, self.stats))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def deliver(self, event, payload, signature=None):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {"X-GitHub-Event": event, "Content-Type": "application/json"}
+        if signature is not None: headers["X-Hub-Signature-256"] = signature(body)
+        conn = http.client.HTTPConnection('127.0.0.1', self.server.server_port)
+        conn.request('POST', '/', body=body, headers=headers)
+        response = conn.getresponse()
+        result = response.status, json.loads(response.read())
+        conn.close()
+        return result
+
+    def test_unsigned_and_forged_deliveries_are_rejected(self):
+        payload = {"action": "opened", "issue": {"node_id": "I_1"}}
+        self.assertEqual(self.deliver('issues', payload)[0], 401)
+        self.assertEqual(self.deliver('issues', payload, lambda body: sign("guess", body))[0], 401)
+        self.assertEqual(len(self.debouncer), 0)
+        self.assertEqual(self.stats.snapshot()['rejected'], 2)
+
+    def test_signed_delivery_is_queued(self):
+        status, reply = self.deliver('issues', {"action": "opened", "issue": {"node_id": "I_1"}},
+                                     lambda body: sign(SECRET, body))
+        self.assertEqual((status, reply), (202, {"queued": 1}))
+        self.assertEqual(len(self.debouncer), 1)
+        self.assertEqual(self.stats.snapshot()['received'], 1)
+
+class StatsTest(unittest.TestCase):
+    def test_concurrent_updates_are_not_lost(self):
+        stats = Stats()
+        def bump():
+            for _ in range(2000): stats.add('received')
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(stats.snapshot()['received'], 16000)
+
+class ServeTest(unittest.TestCase):
+    def test_secret_is_required_even_on_localhost(self):
+        with self.assertRaises(SystemExit):
+            serve([], host='127.0.0.1', secret='')
+
+    def test_insecure_mode_stays_on_localhost(self):
+        with self.assertRaises(SystemExit):
+            serve([], host='0.0.0.0', secret='', insecure=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gardener_rules import build_schema, decisions_for, diff, evaluate, label_priority
+from item_index import ItemRecord
+
+NOW = datetime.datetime(2026, 6, 1, tzinfo=datetime.timezone.utc)
+RECENT = "2026-05-25T00:00:00Z"
+
+STATUS = {"id": "F_status", "name": "Status", "options": [
+    {"id": "S_todo", "name": "Todo"}, {"id": "S_wip", "name": "In Progress"}, {"id": "S_done", "name": "Done"}]}
+PRIORITY = {"id": "F_priority", "name": "Priority", "options": [
+    {"id": "P_0", "name": "P0 - Critical"}, {"id": "P_1", "name": "P1 - High"},
+    {"id": "P_2", "name": "P2 - Medium"}, {"id": "P_3", "name": "P3 - Low"}]}
+SCHEMA = build_schema("PVT_1", [STATUS, PRIORITY, {"id": "F_notes", "name": "Notes"}, None])
+
+def item(typename="Issue", state="OPEN", labels=(), assignees=(), updated_at=RECENT, number=7, **values):
+    """A board item; field values are keyword arguments (Status="Todo")."""
+    return ItemRecord("PVTI_1", "I_1", typename, "Title", state, tuple(labels), tuple(assignees),
+                      updated_at, updated_at, values, "atnplex", "repo", number)
+
+def desired(view, schema=SCHEMA):
+    return evaluate(view, schema, NOW)['fields']
+
+class SchemaTest(unittest.TestCase):
+    def test_priority_targets_are_resolved_once(self):
+        self.assertEqual(SCHEMA['fields']['Status']['options']['Done'], "S_done")
+        self.assertEqual(SCHEMA['fields']['Priority']['targets'],
+                         {"P0": "P0 - Critical", "P1": "P1 - High", "P2": "P2 - Medium", "P3": "P3 - Low"})
+        self.assertEqual(SCHEMA['fields']['Notes']['options'], {})
+
+    def test_board_without_a_low_priority(self):
+        schema = build_schema("PVT_2", [dict(PRIORITY, options=PRIORITY['options'][:3])])
+        self.assertIsNone(schema['fields']['Priority']['targets']['P3'])
+        self.assertEqual(desired(item(labels=["documentation"]), schema), {})
+
+class StatusRulesTest(unittest.TestCase):
+    def test_closed_and_merged_content_is_done(self):
+        self.assertEqual(desired(item(state="CLOSED", Status="Todo", Priority="P3 - Low")), {"Status": "Done"})
+        self.assertEqual(desired(item("PullRequest", "MERGED", Status="In Progress", Priority="P3 - Low")), {"Status": "Done"})
+        self.assertEqual(desired(item(state="CLOSED", Status="Done")), {})
+
+    def test_closing_wins_over_progression_labels(self):
+        self.assertEqual(desired(item(state="CLOSED", labels=["ai-assigned"], assignees=["octocat"]))['Status'], "Done")
+
+    def test_work_in_flight_moves_to_in_progress(self):
+        for view in (item(labels=["ai-assigned"], Status="Todo"), item("PullRequest"),
+                     item(assignees=["octocat"], Status="Todo"), item(assignees=["octocat"])):
+            with self.subTest(typename=view.typename, labels=view.labels, assignees=view.assignees):
+                self.assertEqual(desired(view)['Status'], "In Progress")
+
+    def test_an_assignee_does_not_reopen_finished_work(self):
+        self.assertNotIn('Status', desired(item(assignees=["octocat"], Status="Done")))
+
+    def test_untriaged_items_land_in_todo(self):
+        self.assertEqual(desired(item())['Status'], "Todo")
+        self.assertNotIn('Status', desired(item(Status="Todo")))
+
+    def test_missing_done_option_is_logged_not_written(self):
+        schema = build_schema("PVT_2", [dict(STATUS, options=STATUS['options'][:2])])
+        result = evaluate(item(state="CLOSED", Status="Todo"), schema, NOW)
+        self.assertEqual(result['fields'], {})
+        self.assertIn("[Warning] 'Done' status option not found for Status field.", result['log'])
+
+class PriorityRulesTest(unittest.TestCase):
+    def test_urgent_labels_override_a_set_priority(self):
+        self.assertEqual(desired(item(labels=["critical"], Status="Todo", Priority="P2 - Medium")), {"Priority": "P0 - Critical"})
+        self.assertEqual(desired(item(labels=["High Priority"], Status="Todo", Priority="P3 - Low")), {"Priority": "P1 - High"})
+        self.assertEqual(desired(item(labels=["critical"], Status="Todo", Priority="P0 - Critical")), {})
+
+    def test_other_labels_only_fill_an_empty_priority(self):
+        self.assertEqual(desired(item(labels=["enhancement", "bug"], Status="Todo"))['Priority'], "P2 - Medium")
+        self.assertEqual(desired(item(labels=["documentation"], Status="Todo"))['Priority'], "P3 - Low")
+        self.assertEqual(desired(item(labels=["bug"], Status="Todo", Priority="P3 - Low")), {})
+
+    def test_open_items_default_to_medium(self):
+        self.assertEqual(desired(item(labels=["question"], Status="Todo"))['Priority'], "P2 - Medium")
+        self.assertNotIn('Priority', desired(item(state="CLOSED", Status="Done")))
+
+    def test_label_classification(self):
+        self.assertEqual(label_priority("P0-blocker"), ("P0", None))
+        self.assertEqual(label_priority("high-priority bug"), ("P1", "P1"))
+        self.assertEqual(label_priority("Feature Request"), (None, "P2"))
+        self.assertEqual(label_priority("question"), (None, None))
+
+class StalenessTest(unittest.TestCase):
+    def test_inactive_open_items_are_flagged(self):
+        result = evaluate(item(Status="Todo", Priority="P2 - Medium", updated_at="2026-04-01T00:00:00Z"), SCHEMA, NOW)
+        self.assertEqual(result['decisions'], ['stale'])
+        self.assertIn("[Stale] Inactive for 61 days. Review required.", result['log'])
+        self.assertIsNone(result['recheck_at'])
+
+    def test_done_items_are_never_stale(self):
+        result = evaluate(item(Status="Done", Priority="P2 - Medium", updated_at="2026-01-01T00:00:00Z"), SCHEMA, NOW)
+        self.assertEqual(result['decisions'], [])
+
+    def test_active_items_are_rechecked_when_they_would_turn_stale(self):
+        result = evaluate(item(Status="Todo", Priority="P2 - Medium"), SCHEMA, NOW)
+        self.assertEqual(result['recheck_at'], datetime.datetime(2026, 6, 25, tzinfo=datetime.timezone.utc))
+
+class DiffTest(unittest.TestCase):
+    def test_settled_item_needs_no_writes(self):
+        view = item(state="CLOSED", Status="Done", Priority="P2 - Medium")
+        self.assertEqual(diff(view, evaluate(view, SCHEMA, NOW), SCHEMA), [])
+
+    def test_writes_carry_field_and_option_ids(self):
+        view = item(state="CLOSED", labels=["critical"], Status="Todo", Priority="P3 - Low")
+        result = evaluate(view, SCHEMA, NOW)
+        mutations = diff(view, result, SCHEMA)
+        self.assertEqual([(m['field_id'], m['from'], m['option_id']) for m in mutations],
+                         [("F_priority", "P3 - Low", "P_0"), ("F_status", "Todo", "S_done")])
+        self.assertEqual(decisions_for(result, mutations), ["priority:P0 - Critical", "status:Done"])
+
+    def test_ai_pending_is_swapped_for_ai_assigned(self):
+        view = item(labels=["ai-pending"], Status="Todo", Priority="P2 - Medium")
+        result = evaluate(view, SCHEMA, NOW)
+        mutations = diff(view, result, SCHEMA)
+        self.assertEqual(mutations, [{"op": "swap_labels", "item_id": "PVTI_1", "content_id": "I_1", "owner": "atnplex",
+                                      "repo": "repo", "number": 7, "remove": "ai-pending", "add": "ai-assigned"}])
+        self.assertEqual(decisions_for(result, mutations), ["ai-dispatch"])
+
+    def test_drafts_are_not_dispatched(self):
+        self.assertFalse(evaluate(item("DraftIssue", labels=["ai-pending"], number=None), SCHEMA, NOW)['dispatch'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import io
+import os
+import re
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graphql_batch
+from graphql_batch import MutationBatcher, fetch_label_ids
+
+class FakeGitHub:
+    """Answers aliased mutation documents field by field, the way the GraphQL API does.
+
+    A mutation whose variables mention a node in `rejected` fails with that
+    message on its own alias; `document_error` fails the next document as a whole.
+    """
+
+    def __init__(self):
+        self.documents = []
+        self.rejected = {}
+        self.document_error = None
+
+    def graphql(self, document, variables=None):
+        self.documents.append((document, variables))
+        if self.document_error:
+            message, self.document_error = self.document_error, None
+            return {"errors": [{"message": message}]}
+        data, errors = {}, []
+        for alias, field in re.findall(r"(m\d+): (\w+)\(", document):
+            values = [v for k, v in variables.items() if k.rsplit("_", 1)[1] == alias[1:]]
+            message = next((self.rejected[v] for v in values if isinstance(v, str) and v in self.rejected), None)
+            if message:
+                data[alias] = None
+                errors.append({"path": [alias], "message": message})
+            elif field == 'updateTopics':
+                topics = next(v for v in values if isinstance(v, list))
+                data[alias] = {"invalidTopicNames": [t for t in topics if t != t.lower()], "repository": {"id": values[0]}}
+            else:
+                data[alias] = {"clientMutationId": None}
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+class MutationBatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.github = FakeGitHub()
+        patcher = mock.patch.object(graphql_batch, 'graphql', side_effect=self.github.graphql)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def set_status(self, batcher, items):
+        for item in items: batcher.update_field("PVT_1", item, "F_status", "S_done", description=f"{item} -> Done", key=item)
+
+    def flush(self, batcher):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            results = batcher.flush()
+        return results, output.getvalue()
+
+    def test_full_documents_are_sent_while_queueing(self):
+        batcher = MutationBatcher(batch_size=2)
+        self.set_status(batcher, ["PVTI_1", "PVTI_2", "PVTI_3"])
+        self.assertEqual(len(self.github.documents), 1)
+        results, _ = self.flush(batcher)
+        self.assertEqual((batcher.requests_sent, len(self.github.documents)), (2, 2))
+        self.assertEqual([(r['key'], r['ok']) for r in results], [("PVTI_1", True), ("PVTI_2", True), ("PVTI_3", True)])
+        # Results are handed out once.
+        self.assertEqual(batcher.flush(), [])
+
+    def test_variables_are_suffixed_per_alias(self):
+        batcher = MutationBatcher()
+        batcher.add_item("PVT_1", "I_1")
+        batcher.add_labels("I_1", ["LA_bug"])
+        self.flush(batcher)
+        document, variables = self.github.documents[0]
+        self.assertIn("m0: addProjectV2ItemById(input: { projectId: $projectId_0, contentId: $contentId_0 }) { item { id } }", document)
+        self.assertIn("m1: addLabelsToLabelable(input: { labelableId: $labelableId_1, labelIds: $labelIds_1 })", document)
+        self.assertIn("$labelIds_1: [ID!]!", document)
+        self.assertEqual(variables, {"projectId_0": "PVT_1", "contentId_0": "I_1", "labelableId_1": "I_1", "labelIds_1": ["LA_bug"]})
+
+    def test_a_rejected_mutation_fails_only_its_own_item(self):
+        self.github.rejected["PVTI_2"] = "Did not receive a single select option"
+        batcher = MutationBatcher()
+        self.set_status(batcher, ["PVTI_1", "PVTI_2", "PVTI_3"])
+        results, output = self.flush(batcher)
+        self.assertEqual([r['ok'] for r in results], [True, False, True])
+        self.assertEqual(results[1]['errors'], ["Did not receive a single select option"])
+        self.assertIn("[Batch Error] PVTI_2 -> Done: Did not receive", output)
+
+    def test_aliases_restart_in_every_document(self):
+        self.github.rejected["PVTI_3"] = "boom"
+        batcher = MutationBatcher(batch_size=2)
+        self.set_status(batcher, ["PVTI_1", "PVTI_2", "PVTI_3", "PVTI_4"])
+        results, _ = self.flush(batcher)
+        # PVTI_3 is m0 of the second document; m0 of the first must not pick up its error.
+        self.assertEqual([r['key'] for r in results if not r['ok']], ["PVTI_3"])
+
+    def test_a_failed_document_fails_only_its_own_items(self):
+        batcher = MutationBatcher(batch_size=2)
+        self.github.document_error = "Bad credentials"
+        self.set_status(batcher, ["PVTI_1", "PVTI_2", "PVTI_3"])
+        results, _ = self.flush(batcher)
+        self.assertEqual([r['errors'] for r in results], [["Bad credentials"], ["Bad credentials"], []])
+
+    def test_missing_response_or_data(self):
+        for response, error in ((None, "No response from GitHub"), ({"data": {}}, "Mutation returned no data")):
+            with self.subTest(error), mock.patch.object(graphql_batch, 'graphql', return_value=response):
+                batcher = MutationBatcher()
+                batcher.add_item("PVT_1", "I_1", key="I_1")
+                (result,), _ = self.flush(batcher)
+                self.assertEqual((result['ok'], result['errors']), (False, [error]))
+
+    def test_dropped_topic_names_are_failures(self):
+        batcher = MutationBatcher()
+        batcher.update_topics("R_1", ["infra", "Bad Topic"], key="repo")
+        (result,), _ = self.flush(batcher)
+        self.assertFalse(result['ok'])
+        self.assertEqual(result['errors'], ["Invalid topic names: Bad Topic"])
+        self.assertEqual(result['data']['repository'], {"id": "R_1"})
+
+    def test_dry_run_sends_nothing(self):
+        batcher = MutationBatcher(batch_size=1, dry_run=True)
+        self.set_status(batcher, ["PVTI_1", "PVTI_2"])
+        results, _ = self.flush(batcher)
+        self.assertEqual(self.github.documents, [])
+        self.assertEqual([(r['key'], r['ok']) for r in results], [("PVTI_1", True), ("PVTI_2", True)])
+
+    def test_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            MutationBatcher().queue("delete_everything", {})
+
+class FetchLabelIdsTest(unittest.TestCase):
+    def test_resolves_many_repos_in_one_query(self):
+        response = {"data": {
+            "r0": {"l0": {"id": "LA_1"}, "l1": None},
+            "r1": None,
+        }}
+        with mock.patch.object(graphql_batch, 'graphql', return_value=response) as graphql:
+            resolved = fetch_label_ids([("atnplex", "a"), ("atnplex", "gone"), ("atnplex", "a")], ["bug", "ai-assigned"])
+        graphql.assert_called_once()
+        self.assertIn('r0: repository(owner: "atnplex", name: "a") { l0: label(name: "bug") { id }', graphql.call_args.args[0])
+        # Missing labels are left out; repos that failed to resolve are absent entirely.
+        self.assertEqual(resolved, {("atnplex", "a"): {"bug": "LA_1"}})
+
+    def test_no_repos_no_query(self):
+        with mock.patch.object(graphql_batch, 'graphql') as graphql:
+            self.assertEqual(fetch_label_ids([], ["bug"]), {})
+        graphql.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
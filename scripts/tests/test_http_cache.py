@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import github_client
+from github_client import GitHubClient
+from http_cache import ResponseCache, cache_key
+
+class CacheKeyTest(unittest.TestCase):
+    def test_tokens_never_share_an_entry(self):
+        self.assertNotEqual(cache_key("token-a", 'GET', "/repos/a/b"), cache_key("token-b", 'GET', "/repos/a/b"))
+        self.assertEqual(cache_key("token-a", 'GET', "/repos/a/b"), cache_key("token-a", 'GET', "/repos/a/b"))
+        self.assertNotIn("token-a", cache_key("token-a", 'GET', "/repos/a/b"))
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "http.sqlite")
+
+    def open(self, **kwargs):
+        cache = ResponseCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_only_responses_with_a_validator_are_kept(self):
+        cache = self.open()
+        cache.put("plain", 200, {"Content-Type": "application/json"}, b'{}')
+        cache.put("tagged", 200, {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jun 2026 00:00:00 GMT"}, b'{"a": 1}')
+        self.assertIsNone(cache.get("plain"))
+        entry = cache.get("tagged")
+        self.assertEqual(entry['body'], b'{"a": 1}')
+        self.assertEqual(cache.validators(entry), {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jun 2026 00:00:00 GMT"})
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.open(max_bytes=250)
+        for key in ("a", "b"): cache.put(key, 200, {"ETag": key}, b'x' * 100)
+        with mock.patch('http_cache.time.time', return_value=4102444800):
+            cache.touch("a")
+        cache.put("c", 200, {"ETag": "c"}, b'x' * 100)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        # The running total survives a reopen.
+        cache.close()
+        self.assertEqual(self.open().total_bytes, 200)
+
+class ClientRevalidationTest(unittest.TestCase):
+    """The cache as the scripts see it: through GitHubClient.request()."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = ResponseCache(os.path.join(tmp.name, "http.sqlite"))
+        self.addCleanup(self.cache.close)
+        patcher = mock.patch.object(github_client, 'get_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, token, *responses):
+        client = GitHubClient(token=token, api_url="http://127.0.0.1:9")
+        with mock.patch.object(client, 'send', side_effect=list(responses)) as send:
+            result = client.request('GET', '/repos/atnplex/repo')
+        return result, [call.args[3] for call in send.call_args_list]
+
+    def test_not_modified_is_served_from_the_cache(self):
+        first, sent = self.get("t", (200, {"ETag": '"v1"'}, b'{"name": "repo"}'))
+        self.assertEqual((first, sent), ((200, {"name": "repo"}), [None]))
+        second, sent = self.get("t", (304, {"ETag": '"v1"'}, b''))
+        self.assertEqual(second, (200, {"name": "repo"}))
+        self.assertEqual(sent, [{"If-None-Match": '"v1"'}])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_changed_resource_replaces_the_entry(self):
+        self.get("t", (200, {"ETag": '"v1"'}, b'{"name": "old"}'))
+        result, _ = self.get("t", (200, {"ETag": '"v2"'}, b'{"name": "new"}'))
+        self.assertEqual(result, (200, {"name": "new"}))
+        _, sent = self.get("t", (304, {}, b''))
+        self.assertEqual(sent, [{"If-None-Match": '"v2"'}])
+
+    def test_another_token_does_not_see_the_cached_body(self):
+        self.get("token-a", (200, {"ETag": '"v1"'}, b'{"private": true}'))
+        result, sent = self.get("token-b", (404, {}, b'{"message": "Not Found"}'))
+        self.assertEqual(sent, [None])
+        self.assertEqual(result, (404, {"message": "Not Found"}))
+
+if __name__ == "__main__":
+    unittest.main()
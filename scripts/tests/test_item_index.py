@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from item_index import ItemIndex, ItemRecord
+
+def raw_item(item_id, content_id, status=None, priority=None, labels=(), updated="2026-05-01T00:00:00Z",
+             content_updated="2026-05-02T00:00:00Z"):
+    values = [{"name": v, "field": {"name": f}} for f, v in (("Status", status), ("Priority", priority)) if v]
+    return {
+        "id": item_id, "updatedAt": updated,
+        "fieldValues": {"nodes": values + [{"text": "note", "field": {"name": "Notes"}}, None]},
+        "content": {"__typename": "Issue", "id": content_id, "title": f"Issue {content_id}", "state": "OPEN",
+                    "number": 3, "updatedAt": content_updated,
+                    "repository": {"name": "repo", "owner": {"login": "atnplex"}},
+                    "labels": {"nodes": [{"name": l} for l in labels]},
+                    "assignees": {"nodes": [{"login": "octocat"}, None]}},
+    }
+
+class ItemRecordTest(unittest.TestCase):
+    def test_flattens_a_raw_item(self):
+        record = ItemRecord.from_item(raw_item("PVTI_1", "I_1", status="Todo", labels=("bug",)))
+        self.assertEqual((record.item_id, record.content_id, record.typename), ("PVTI_1", "I_1", "Issue"))
+        self.assertEqual(record.current_values, {"Status": "Todo", "Notes": "note"})
+        self.assertEqual((record.labels, record.assignees), (("bug",), ("octocat",)))
+        self.assertEqual((record.repo_owner, record.repo_name, record.number), ("atnplex", "repo", 3))
+        # changed_at is the later of the item's and the content's updatedAt.
+        self.assertEqual(record.changed_at, "2026-05-02T00:00:00Z")
+
+    def test_reads_like_a_view(self):
+        record = ItemRecord.from_item(raw_item("PVTI_1", "I_1"))
+        self.assertEqual(record['state'], "OPEN")
+        self.assertIsNone(record.get('missing'))
+        with self.assertRaises(KeyError):
+            record['missing']
+
+    def test_repeated_strings_are_shared(self):
+        a = ItemRecord.from_item(raw_item("PVTI_1", "I_1", status="In " + "Progress", labels=("ai-" + "pending",)))
+        b = ItemRecord.from_item(raw_item("PVTI_2", "I_2", status="In Progress", labels=("ai-pending",)))
+        self.assertIs(a.current_values["Status"], b.current_values["Status"])
+        self.assertIs(a.labels[0], b.labels[0])
+
+class ItemIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ItemIndex()
+        self.index.add(ItemRecord.from_item(raw_item("PVTI_1", "I_1", status="Todo", priority="P1 - High")))
+        self.index.add(ItemRecord.from_item(raw_item("PVTI_2", "I_2", status="Todo")))
+        self.index.add(ItemRecord.from_item(raw_item("PVTI_3", "I_3", status="Done", priority="P1 - High")))
+
+    def test_membership_by_content(self):
+        self.assertTrue(self.index.has_content("I_2"))
+        self.assertFalse(self.index.has_content("I_9"))
+        self.assertIn("PVTI_3", self.index)
+        self.assertEqual(len(self.index), 3)
+
+    def test_counts_include_items_without_a_value(self):
+        self.assertEqual(self.index.counts('Status'), {"Todo": 2, "Done": 1})
+        self.assertEqual(self.index.counts('Priority'), {"P1 - High": 2, None: 1})
+
+    def test_set_value_moves_the_item_between_buckets(self):
+        self.index.set_value("PVTI_2", 'Status', "Done")
+        self.index.set_value("PVTI_1", 'Status', "Done")
+        self.assertEqual(self.index.counts('Status'), {"Done": 3})
+        self.assertEqual(self.index.get("PVTI_1").current_values['Status'], "Done")
+        # Unindexed fields are still recorded on the item.
+        self.index.set_value("PVTI_1", 'Notes', "updated")
+        self.assertEqual(self.index.get("PVTI_1").current_values['Notes'], "updated")
+
+    def test_re_adding_an_item_replaces_its_entries(self):
+        self.index.add(ItemRecord.from_item(raw_item("PVTI_1", "I_1", status="Done")))
+        self.assertEqual(self.index.counts('Status'), {"Todo": 1, "Done": 2})
+        self.assertEqual(self.index.counts('Priority'), {"P1 - High": 1, None: 2})
+        self.assertEqual(len(self.index), 3)
+
+    def test_remove(self):
+        self.index.remove("PVTI_3")
+        self.assertFalse(self.index.has_content("I_3"))
+        self.assertEqual(self.index.counts('Status'), {"Todo": 2})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_backend
+from llm_backend import LLMClient, ResponseCache, prompt_key
+
+class SlowBackend:
+    """Counts requests and holds each one open until `release` is set."""
+    model = "test-model"
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.release = None
+
+    async def complete(self, title, body):
+        self.calls.append(title)
+        if self.release: await self.release.wait()
+        if self.fail: raise RuntimeError("backend down")
+        return {"text": f"answer to {title}", "prompt_tokens": 10, "completion_tokens": 5}
+
+class PromptKeyTest(unittest.TestCase):
+    def test_whitespace_and_case_do_not_matter(self):
+        self.assertEqual(prompt_key("m", "Fix  the\nbuild", " Body "), prompt_key("m", "fix the build", "body"))
+        self.assertNotEqual(prompt_key("m", "title", "body"), prompt_key("other", "title", "body"))
+
+class LLMClientTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = ResponseCache(os.path.join(tmp.name, "llm.sqlite"))
+        self.addCleanup(self.cache.conn.close)
+
+    def test_cached_completion_is_not_requested_again(self):
+        backend = SlowBackend()
+        asyncio.run(LLMClient(backend, self.cache).complete("Title", "body"))
+        # A fresh client, as in the next run, answers the same issue text from the cache.
+        client = LLMClient(backend, self.cache)
+        self.assertEqual(asyncio.run(client.complete("title ", "BODY")), "answer to Title")
+        self.assertEqual(backend.calls, ["Title"])
+        self.assertEqual([(m['source'], m['prompt_tokens']) for m in client.metrics], [("cache", 0)])
+
+    def test_identical_requests_in_flight_are_coalesced(self):
+        backend = SlowBackend()
+        client = LLMClient(backend, self.cache)
+        async def ask():
+            backend.release = asyncio.Event()
+            asks = [asyncio.create_task(client.complete("Title", "body")) for _ in range(3)]
+            asks.append(asyncio.create_task(client.complete("Other", "body")))
+            await asyncio.sleep(0)
+            backend.release.set()
+            return await asyncio.gather(*asks)
+        answers = asyncio.run(ask())
+        self.assertEqual(answers, ["answer to Title"] * 3 + ["answer to Other"])
+        self.assertEqual(sorted(backend.calls), ["Other", "Title"])
+        self.assertEqual(sorted(m['source'] for m in client.metrics), ["coalesced", "coalesced", "llm", "llm"])
+        self.assertEqual(client.in_flight, {})
+
+    def test_failure_reaches_every_coalesced_caller_and_is_not_cached(self):
+        backend = SlowBackend(fail=True)
+        client = LLMClient(backend, self.cache)
+        async def ask():
+            backend.release = asyncio.Event()
+            asks = [asyncio.create_task(client.complete("Title", "body")) for _ in range(2)]
+            await asyncio.sleep(0)
+            backend.release.set()
+            return await asyncio.gather(*asks, return_exceptions=True)
+        errors = asyncio.run(ask())
+        self.assertEqual([str(e) for e in errors], ["backend down"] * 2)
+        self.assertEqual(len(backend.calls), 1)
+        self.assertIsNone(self.cache.get(prompt_key(backend.model, "Title", "body")))
+
+    def test_stub_replies_are_not_cached(self):
+        backend = SlowBackend()
+        backend.model = "stub"
+        asyncio.run(LLMClient(backend, self.cache).complete("Title", "body"))
+        self.assertIsNone(self.cache.get(prompt_key("stub", "Title", "body")))
+
+class ReportTest(unittest.TestCase):
+    def test_report_does_not_build_an_unused_backend(self):
+        with mock.patch.object(llm_backend, '_llm', None), \
+             mock.patch.object(llm_backend, 'default_backend') as default_backend:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                llm_backend.report()
+            default_backend.assert_not_called()
+            self.assertIsNone(llm_backend._llm)
+        self.assertEqual(output.getvalue(), "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import os
+import sys
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_budget
+from rate_budget import RateBudget
+
+def spent_budget(reset_in):
+    """A budget whose 50% share of a 100-point graphql window is used up, resetting in `reset_in` seconds."""
+    budget = RateBudget(share=0.5)
+    budget.record('graphql', 'query:x', 1, remaining=50, limit=100, reset_at=time.time() + reset_in)
+    return budget
+
+class ExhaustedShareTest(unittest.TestCase):
+    def test_waits_for_the_reset_despite_early_wakeups(self):
+        budget = spent_budget(reset_in=0.6)
+        done = threading.Event()
+        def worker():
+            with redirect_stdout(io.StringIO()):
+                self.assertTrue(budget.acquire('graphql', 'query:x', 4))
+            done.set()
+        started = time.time()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        # Other threads finishing calls notify the condition; none of that may let the waiter through.
+        for _ in range(10):
+            budget.record('core', 'GET /x', 1)
+            budget.in_flight += 1
+            budget.release()
+            time.sleep(0.02)
+        self.assertFalse(done.is_set())
+        thread.join(timeout=5)
+        self.assertTrue(done.is_set())
+        self.assertGreaterEqual(time.time() - started, 0.55)
+        self.assertEqual(budget.windows['graphql']['remaining'], 100)
+
+    def test_refuses_when_the_reset_is_too_far_away(self):
+        budget = spent_budget(reset_in=rate_budget.MAX_WAIT_SECONDS + 600)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertFalse(budget.acquire('graphql', 'query:x', 4))
+            self.assertFalse(budget.acquire('graphql', 'query:x', 4))
+        self.assertEqual(budget.in_flight, 0)
+        # Reported once per window, not once per refused call.
+        self.assertEqual(output.getvalue().count("share exhausted"), 1)
+
+    def test_unspent_share_is_not_paced(self):
+        budget = RateBudget(share=0.5)
+        budget.record('graphql', 'query:x', 1, remaining=90, limit=100, reset_at=time.time() + 3600)
+        self.assertTrue(budget.acquire('graphql', 'query:x', 4))
+        self.assertEqual(budget.in_flight, 1)
+
+class FairShareTest(unittest.TestCase):
+    def test_tenant_over_its_part_waits_while_another_is_active(self):
+        budget = RateBudget(share=0.5)
+        budget.active_tenants = ["a", "b"]
+        budget.record('graphql', 'query:x', 1, remaining=60, limit=100, reset_at=time.time() + 3600)
+        budget.tenant_spent[("a", 'graphql')] = 30
+        self.assertTrue(budget.over_fair_share('graphql', "a", budget.available('graphql')))
+        self.assertFalse(budget.over_fair_share('graphql', "b", budget.available('graphql')))
+        budget.active_tenants = ["a"]
+        self.assertFalse(budget.over_fair_share('graphql', "a", budget.available('graphql')))
+
+class ClientRefusalTest(unittest.TestCase):
+    def test_refused_call_is_not_sent(self):
+        import github_client
+        client = github_client.GitHubClient(token="t", api_url="http://127.0.0.1:9")
+        transport = mock.Mock()
+        with mock.patch.object(github_client, 'get_budget', return_value=mock.Mock(acquire=mock.Mock(return_value=False))):
+            status, headers, data = client.call('graphql', 'query:x', transport)
+        transport.assert_not_called()
+        self.assertIsNone(status)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repo_inventory
+from repo_inventory import load_repos, load_snapshot, mark_stale, save_snapshot, to_record
+
+ORG = "atnplex"
+
+class FakeOrg:
+    """The organization's repositories as GraphQL pages them, two per page."""
+
+    def __init__(self, count):
+        self.repos = {}
+        self.queries = []
+        self.down = False
+        for i in range(count): self.touch(f"repo-{i}", f"2026-01-{i + 1:02d}T00:00:00Z")
+
+    def touch(self, name, at, pushed=None):
+        self.repos[name] = {"id": f"R_{name}", "name": name, "description": None, "isArchived": False,
+                            "updatedAt": at, "pushedAt": pushed or at, "defaultBranchRef": {"name": "main"},
+                            "repositoryTopics": {"nodes": [{"topic": {"name": "infra"}}]}}
+
+    def graphql(self, query, variables):
+        self.queries.append((variables['order'], variables['cursor']))
+        if self.down: return {"errors": [{"message": "unavailable"}]}
+        field = 'updatedAt' if variables['order'] == 'UPDATED_AT' else 'pushedAt'
+        nodes = sorted(self.repos.values(), key=lambda n: n[field], reverse=True)
+        start = int(variables['cursor'] or 0)
+        page = nodes[start:start + 2]
+        return {"data": {"organization": {"repositories": {
+            "totalCount": len(nodes), "nodes": page,
+            "pageInfo": {"hasNextPage": start + 2 < len(nodes), "endCursor": str(start + 2)}}}}}
+
+class LoadReposTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.org = FakeOrg(5)
+        for patcher in (mock.patch.object(repo_inventory, 'SNAPSHOT_DIR', tmp.name),
+                        mock.patch.object(repo_inventory, 'graphql', side_effect=self.org.graphql)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def load(self, **kwargs):
+        self.org.queries.clear()
+        with redirect_stdout(io.StringIO()):
+            return [r['name'] for r in load_repos(ORG, **kwargs)]
+
+    def test_full_enumeration_is_shaped_like_gh_repo_list(self):
+        self.assertEqual(self.load(), [f"repo-{i}" for i in range(5)])
+        self.assertEqual(len(self.org.queries), 3)
+        record = load_snapshot(ORG)['repos'][0]
+        self.assertEqual(record, to_record(self.org.repos["repo-0"]))
+        self.assertEqual((record['description'], record['repositoryTopics']), ("", [{"name": "infra"}]))
+
+    def test_fresh_snapshot_is_used_as_is(self):
+        self.load()
+        self.assertEqual(self.load(), [f"repo-{i}" for i in range(5)])
+        self.assertEqual(self.org.queries, [])
+
+    def test_stale_snapshot_fetches_only_what_changed(self):
+        self.load()
+        # Pushed without bumping updatedAt; only the PUSHED_AT walk sees it.
+        self.org.touch("repo-1", "2026-01-02T00:00:00Z", pushed="2099-01-01T00:00:00Z")
+        self.org.touch("repo-new", "2099-01-01T00:00:00Z")
+        self.org.touch("repo-2", "2099-01-01T00:00:00Z")
+        self.assertIn("repo-new", self.load(max_age=0))
+        # Each walk stops at the first page holding a repo older than the watermark.
+        self.assertEqual(self.org.queries, [('UPDATED_AT', None), ('UPDATED_AT', "2"), ('PUSHED_AT', None), ('PUSHED_AT', "2")])
+        repos = {r['name']: r for r in load_snapshot(ORG)['repos']}
+        self.assertEqual(repos["repo-1"]['pushedAt'], "2099-01-01T00:00:00Z")
+
+    def test_deleted_repo_forces_a_full_re_enumeration(self):
+        self.load()
+        del self.org.repos["repo-3"]
+        self.assertEqual(self.load(max_age=0), ["repo-0", "repo-1", "repo-2", "repo-4"])
+        # Nothing changed, but the count no longer matches the snapshot.
+        self.assertEqual(self.org.queries, [('UPDATED_AT', None), ('PUSHED_AT', None), ('UPDATED_AT', None), ('UPDATED_AT', "2")])
+
+    def test_mark_stale_forces_the_next_load_to_refresh(self):
+        self.load()
+        mark_stale(ORG)
+        self.org.touch("repo-new", "2099-01-01T00:00:00Z")
+        self.assertIn("repo-new", self.load())
+
+    def test_failed_refresh_falls_back_to_the_stale_snapshot(self):
+        self.org.down = True
+        self.assertEqual(self.load(), [])
+        self.org.down = False
+        self.load()
+        snapshot = load_snapshot(ORG)
+        save_snapshot(ORG, dict(snapshot, refreshed_at=time.time() - 7200))
+        self.org.down = True
+        self.assertEqual(self.load(), [f"repo-{i}" for i in range(5)])
+
+if __name__ == "__main__":
+    unittest.main()
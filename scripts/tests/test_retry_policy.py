@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import github_client
+from github_client import GitHubClient
+from retry_policy import ABUSE, MAX_WAIT_SECONDS, NETWORK, RATE_LIMIT, SERVER, CircuitBreaker, classify, retry_delay
+
+class ClassifyTest(unittest.TestCase):
+    def test_transport_failures_are_network_errors(self):
+        self.assertEqual(classify(None, error=OSError("reset")), NETWORK)
+        self.assertEqual(classify(None), NETWORK)
+
+    def test_success_and_client_errors_are_final(self):
+        self.assertIsNone(classify(200, {}, b'{"data": {}}'))
+        self.assertIsNone(classify(404, {}))
+        self.assertIsNone(classify(403, {"X-RateLimit-Remaining": "4999"}, b'Resource not accessible'))
+
+    def test_server_errors(self):
+        self.assertEqual(classify(502, {}), SERVER)
+
+    def test_primary_rate_limit(self):
+        self.assertEqual(classify(403, {"X-RateLimit-Remaining": "0"}), RATE_LIMIT)
+        # GraphQL reports it as a 200 with a RATE_LIMITED error.
+        self.assertEqual(classify(200, {}, b'{"errors": [{"type": "RATE_LIMITED"}]}'), RATE_LIMIT)
+
+    def test_secondary_rate_limit(self):
+        self.assertEqual(classify(403, {"Retry-After": "30"}), ABUSE)
+        self.assertEqual(classify(429, {"retry-after": "5"}), ABUSE)
+        self.assertEqual(classify(403, {}, b'You have exceeded a secondary rate limit'), ABUSE)
+
+class RetryDelayTest(unittest.TestCase):
+    def test_retry_after_is_honored(self):
+        self.assertEqual(retry_delay(ABUSE, 0, {"Retry-After": "7"}), 7.0)
+
+    def test_rate_limit_waits_for_reset(self):
+        delay = retry_delay(RATE_LIMIT, 0, {"X-RateLimit-Reset": str(int(time.time()) + 30)})
+        self.assertTrue(29 <= delay <= 32, delay)
+
+    def test_abuse_waits_at_least_a_minute(self):
+        self.assertGreaterEqual(retry_delay(ABUSE, 0, {}), 60)
+
+    def test_too_long_a_wait_gives_up(self):
+        self.assertIsNone(retry_delay(ABUSE, 0, {"Retry-After": str(MAX_WAIT_SECONDS + 1)}))
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_after_threshold_and_resets_on_success(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=10)
+        for _ in range(2): breaker.failure(SERVER)
+        self.assertEqual(breaker.open_until, 0.0)
+        breaker.failure(SERVER)
+        self.assertGreater(breaker.open_until, time.time() + 5)
+        breaker.success()
+        self.assertEqual((breaker.failures, breaker.trips), (0, 0))
+
+    def test_rejections_open_for_the_requested_delay(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=10)
+        breaker.failure(RATE_LIMIT, delay=20)
+        self.assertAlmostEqual(breaker.open_until - time.time(), 20, delta=1)
+        self.assertEqual(breaker.failures, 0)
+
+class ClientRetryTest(unittest.TestCase):
+    """The policy as the scripts see it: through GitHubClient.request() and graphql()."""
+
+    def setUp(self):
+        self.client = GitHubClient(token="t", api_url="http://127.0.0.1:9")
+        self.breaker = CircuitBreaker(threshold=3, cooldown=10)
+        # Backoff sleeps are recorded instead of slept; an open circuit is checked, not waited out.
+        self.breaker.wait = lambda: 0.0
+        self.sleeps = []
+        for patcher in (mock.patch.object(github_client, 'get_breaker', return_value=self.breaker),
+                        mock.patch.object(github_client, 'get_cache', return_value=None),
+                        mock.patch.object(github_client.time, 'sleep', side_effect=self.sleeps.append)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def responses(self, *responses):
+        return mock.patch.object(self.client, 'send', side_effect=list(responses))
+
+    def test_get_is_retried_after_a_server_error(self):
+        with self.responses((502, {}, b''), (200, {}, b'{"ok": true}')) as send, mock.patch('builtins.print'):
+            self.assertEqual(self.client.request('GET', '/repos/a/b'), (200, {"ok": True}))
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_post_is_not_repeated_after_a_server_error(self):
+        with self.responses((502, {}, b'{}'), (201, {}, b'{}')) as send:
+            status, _ = self.client.request('POST', '/repos/a/b/issues', {"title": "x"})
+        self.assertEqual((status, send.call_count), (502, 1))
+
+    def test_post_is_retried_when_rejected_by_a_secondary_limit(self):
+        with self.responses((403, {"Retry-After": "3"}, b''), (201, {}, b'{"id": 1}')) as send, \
+                mock.patch('builtins.print'):
+            self.assertEqual(self.client.request('POST', '/repos/a/b/issues', {"title": "x"}), (201, {"id": 1}))
+        self.assertEqual(send.call_count, 2)
+        self.assertIn(3.0, self.sleeps)
+
+    def test_graphql_rate_limited_waits_for_the_reset(self):
+        reset = str(int(time.time()) + 20)
+        with self.responses((200, {"X-RateLimit-Reset": reset}, b'{"errors": [{"type": "RATE_LIMITED"}]}'),
+                            (200, {}, b'{"data": {"viewer": {"login": "me"}}}')) as send, mock.patch('builtins.print'):
+            response = self.client.graphql("query { viewer { login } }")
+        self.assertEqual(response['data']['viewer'], {"login": "me"})
+        self.assertEqual(send.call_count, 2)
+        self.assertTrue(any(19 <= s <= 22 for s in self.sleeps), self.sleeps)
+
+    def test_network_errors_give_up_after_max_attempts(self):
+        with mock.patch.object(github_client, 'MAX_ATTEMPTS', 3), \
+                self.responses(*[ConnectionRefusedError("refused")] * 3) as send, mock.patch('builtins.print'):
+            self.assertIsNone(self.client.graphql("query { viewer { login } }"))
+        self.assertEqual(send.call_count, 3)
+        # Three consecutive failures reach the threshold and open the shared circuit.
+        self.assertGreater(self.breaker.open_until, time.time())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import validate_infra
+from validate_infra import check_caddy, check_compose, check_file, check_files, content_key, cross_check, parse_port
+
+INVENTORY = """
+all:
+  children:
+    vps:
+      hosts:
+        vps1: {}
+"""
+
+PLAYBOOK = """
+- name: Deploy
+  hosts: vps
+- name: Backup
+  hosts: nas
+"""
+
+class ParsePortTest(unittest.TestCase):
+    def test_short_syntax(self):
+        self.assertEqual(parse_port("8080:80"), {"host": 8080, "container": 80, "ip": None, "protocol": "tcp"})
+        self.assertEqual(parse_port("127.0.0.1:53:53/udp"), {"host": 53, "container": 53, "ip": "127.0.0.1", "protocol": "udp"})
+        self.assertEqual(parse_port("3000")['host'], None)
+
+    def test_long_syntax(self):
+        self.assertEqual(parse_port({"published": "443", "target": 443, "protocol": "udp"}),
+                         {"host": 443, "container": 443, "ip": None, "protocol": "udp"})
+
+class ComposeTest(unittest.TestCase):
+    def test_host_port_clashes(self):
+        result = check_compose("""
+services:
+  a: {image: x, ports: ["8080:80"]}
+  b: {image: y, ports: ["127.0.0.1:8080:81"]}
+  c: {image: z, ports: ["127.0.0.2:9000:80", "127.0.0.3:9000:80", "9000:80/udp"]}
+  d: {ports: ["7000:70"]}
+""")
+        self.assertEqual(result['errors'], ["host port 8080/tcp published by both a and b", "service d: neither `image` nor `build`"])
+        self.assertEqual(result['facts']['services']['c']['ports'][1]['ip'], "127.0.0.3")
+
+class CaddyTest(unittest.TestCase):
+    def test_structure_and_upstreams(self):
+        result = check_caddy("""
+(common) {
+  encode gzip
+}
+app.example.com {
+  import common
+  import missing
+  reverse_proxy /api/* backend:8080  # comment {
+  reverse_proxy {
+    to localhost:3000
+  }
+}
+app.example.com {
+}
+""")
+        self.assertEqual(result['errors'], ["site app.example.com defined more than once",
+                                            "line 7: import of undefined snippet (missing)"])
+        self.assertEqual([(u['host'], u['port']) for u in result['facts']['upstreams']], [("backend", 8080), ("localhost", 3000)])
+
+    def test_unbalanced_braces(self):
+        self.assertEqual(check_caddy("a.example.com {\n")['errors'], ["1 unclosed '{' at end of file"])
+        self.assertEqual(check_caddy("}\n")['errors'], ["line 1: unmatched '}'"])
+
+class CheckFileTest(unittest.TestCase):
+    def test_yaml_errors_are_findings(self):
+        result = check_file("compose", "deployment/x/docker-compose.yml", "services: [unclosed")
+        self.assertTrue(result['errors'][0].startswith("YAML parse error"))
+
+    def test_without_pyyaml(self):
+        with mock.patch.object(validate_infra, 'yaml', None), mock.patch.object(validate_infra, 'YAML_ERRORS', ()):
+            self.assertEqual(check_file("compose", "x.yml", "services: {}")['skipped'], "PyYAML is not installed")
+            # A crashing Caddyfile check surfaces its own error, not an AttributeError from the YAML handler.
+            with mock.patch.object(validate_infra, 'check_caddy', side_effect=ValueError("bad")):
+                with self.assertRaises(ValueError):
+                    check_file("caddy", "caddy/Caddyfile", "")
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        os.makedirs(os.path.join(tmp.name, "ansible"))
+        # The same text as the inventory and as a playbook.
+        for name in ("inventory.yml", "site.yml"):
+            with open(os.path.join(tmp.name, "ansible", name), 'w', encoding='utf-8') as f: f.write(INVENTORY)
+        patcher = mock.patch.object(validate_infra, 'ROOT', tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.files = [("ansible", "ansible/inventory.yml"), ("ansible", "ansible/site.yml")]
+
+    def test_key_includes_the_check_variant(self):
+        self.assertNotEqual(content_key("ansible", "ansible/inventory.yml", INVENTORY),
+                            content_key("ansible", "ansible/site.yml", INVENTORY))
+        self.assertEqual(content_key("ansible", "ansible/deploy.yml", PLAYBOOK),
+                         content_key("ansible", "ansible/health.yml", PLAYBOOK))
+
+    def test_identical_content_under_two_names_gets_both_verdicts(self):
+        for cache in ({}, check_files(self.files, {}, workers=1)[2]):
+            with self.subTest(cached=bool(cache)):
+                results, hits, current = check_files(self.files, cache, workers=1)
+                self.assertEqual(hits, len(cache))
+                self.assertEqual(results["ansible/inventory.yml"]['errors'], [])
+                self.assertEqual(results["ansible/site.yml"]['errors'], ["playbook is not a list of plays"])
+                self.assertEqual(len(current), 2)
+
+class CrossCheckTest(unittest.TestCase):
+    def test_playbook_hosts_must_be_in_the_inventory(self):
+        results = {
+            "ansible/inventory.yml": dict(validate_infra.check_ansible(INVENTORY, "ansible/inventory.yml"), kind="ansible"),
+            "ansible/site.yml": dict(validate_infra.check_ansible(PLAYBOOK, "ansible/site.yml"), kind="ansible"),
+        }
+        with mock.patch.object(validate_infra, 'parse_port_standards', return_value=({}, [])):
+            findings = cross_check(results)
+        self.assertEqual([f['message'] for f in findings], ["Backup: hosts `nas` is not in ansible/inventory.yml"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+# TRACE_FILE=path writes one event per span: Chrome trace format (open in
+# chrome://tracing or Perfetto), or JSON lines when the path ends in .jsonl.
+# TRACE=1 only prints the summary. PROFILE=1 runs the entry point under cProfile.
+TRACE_FILE = os.getenv('TRACE_FILE')
+ENABLED = bool(TRACE_FILE) or os.getenv('TRACE', '').lower() in ('1', 'true')
+PROFILE = os.getenv('PROFILE', '').lower() in ('1', 'true')
+PROFILE_FILE = os.getenv('PROFILE_FILE')
+SLOWEST_SHOWN = int(os.getenv('TRACE_SLOWEST', '15'))
+
+# Span categories that are a single external call (as opposed to tasks and phases).
+CALL_CATEGORIES = ('rest', 'graphql', 'llm')
+
+class Tracer:
+    """Collects spans (name, category, duration and free-form args) from every thread.
+
+    Spans nest per thread; `annotate()` adds args to the innermost open span,
+    which is how lower layers (connection retries, bytes, GraphQL cost) report
+    into the API-call span opened above them.
+    """
+
+    def __init__(self, path=TRACE_FILE, enabled=ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.start = time.perf_counter()
+        self.spans = []        # (duration, name, category, args) of finished call and task spans
+        self.totals = {}       # (category, name) -> [count, total seconds, errors]
+        self.file = None
+        self.jsonl = bool(path) and path.endswith('.jsonl')
+        if enabled and path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.file = open(path, 'w', encoding='utf-8')
+            if not self.jsonl: self.file.write("[\n")
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'): self.local.stack = []
+        return self.local.stack
+
+    @contextlib.contextmanager
+    def span(self, name, category="call", **args):
+        if not self.enabled:
+            yield args
+            return
+        stack = self.stack()
+        stack.append(args)
+        begin = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args.setdefault('error', f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            stack.pop()
+            self.finish(name, category, begin, time.perf_counter() - begin, args)
+
+    def annotate(self, **args):
+        """Attach args to the innermost open span on this thread (no-op outside spans)."""
+        if not self.enabled: return
+        stack = self.stack()
+        if stack: stack[-1].update(args)
+
+    def add(self, **counters):
+        """Add to numeric args of the innermost open span (e.g. retries=1)."""
+        if not self.enabled: return
+        stack = self.stack()
+        if stack:
+            for key, value in counters.items():
+                stack[-1][key] = stack[-1].get(key, 0) + value
+
+    def mark(self, name, **args):
+        """Record an instant event, e.g. the start of a phase."""
+        if not self.enabled: return
+        self.emit({"name": name, "cat": "mark", "ph": "i", "s": "p", "ts": self.micros(time.perf_counter()),
+                   "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+
+    def micros(self, t):
+        return int((t - self.start) * 1e6)
+
+    def finish(self, name, category, begin, duration, args):
+        with self.lock:
+            entry = self.totals.setdefault((category, name), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += duration
+            if args.get('error') or (isinstance(args.get('status'), int) and args['status'] >= 400): entry[2] += 1
+            if category != 'phase':
+                self.spans.append((duration, name, category, dict(args)))
+        self.emit({"name": name, "cat": category, "ph": "X", "ts": self.micros(begin), "dur": int(duration * 1e6),
+                   "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+
+    def emit(self, event):
+        if not self.file: return
+        line = json.dumps(event, default=str)
+        with self.lock:
+            self.file.write(line + ("\n" if self.jsonl else ",\n"))
+
+    def report(self):
+        if not self.enabled: return
+        if self.file:
+            with self.lock:
+                if not self.jsonl:
+                    # Every event line ends with a comma; close the array with one last event.
+                    self.file.write(json.dumps({"name": "end", "ph": "i", "s": "g", "ts": self.micros(time.perf_counter()), "pid": os.getpid(), "tid": 0}) + "\n]\n")
+                self.file.close()
+                self.file = None
+            print(f"\nTrace written to {TRACE_FILE}")
+        if not self.totals: return
+        print("\n--- Trace summary ---")
+        print(f"{'Span':<60} | {'Count':>6} | {'Total s':>8} | {'Avg ms':>8} | {'Errors':>6}")
+        for (category, name), (count, total, errors) in sorted(self.totals.items(), key=lambda kv: -kv[1][1])[:25]:
+            print(f"{(category + ' ' + name)[:60]:<60} | {count:>6} | {total:>8.2f} | {total / count * 1000:>8.1f} | {errors:>6}")
+        for title, categories in (("calls", CALL_CATEGORIES), ("tasks", ("task",))):
+            spans = sorted((s for s in self.spans if s[2] in categories), key=lambda s: -s[0])[:SLOWEST_SHOWN]
+            if not spans: continue
+            print(f"\nSlowest {len(spans)} {title}:")
+            for duration, name, category, args in spans:
+                detail = " ".join(f"{k}={v}" for k, v in args.items())
+                print(f"  {duration * 1000:>8.1f} ms  {name}  {detail}"[:200])
+
+_tracer = Tracer()
+
+def get_tracer():
+    return _tracer
+
+def span(name, category="call", **args):
+    return _tracer.span(name, category, **args)
+
+def annotate(**args):
+    _tracer.annotate(**args)
+
+def add(**counters):
+    _tracer.add(**counters)
+
+def mark(name, **args):
+    _tracer.mark(name, **args)
+
+def report():
+    _tracer.report()
+
+def run(main):
+    """Call a script's entry point, under cProfile when PROFILE=1."""
+    if not PROFILE: return main()
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(main)
+    finally:
+        script = os.path.splitext(os.path.basename(sys.argv[0]))[0] or "script"
+        path = PROFILE_FILE or f"{script}.prof"
+        profiler.dump_stats(path)
+        print(f"\n--- Profile (top 25 by cumulative time; full stats in {path}) ---")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(25)
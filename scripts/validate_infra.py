@@ -0,0 +1,421 @@
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import tracing
+
+try:
+    import yaml
+except ImportError:  # Compose and ansible files are reported as skipped without PyYAML.
+    yaml = None
+YAML_ERRORS = (yaml.YAMLError,) if yaml else ()
+
+# Configuration
+ROOT = os.getenv('INFRA_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(os.getenv('INFRA_CACHE_DIR', '.infra-cache'), 'validate.json')
+REPORT_PATH = os.getenv('INFRA_REPORT', 'infra_report.json')
+WORKERS = int(os.getenv('INFRA_WORKERS', str(os.cpu_count() or 2)))
+DOC_MAX_AGE_DAYS = int(os.getenv('DOC_MAX_AGE_DAYS', '90'))
+# Bump when a per-file check changes so cached results from older rules are ignored.
+CHECKS_VERSION = 1
+
+FILE_GLOBS = (
+    ("compose", "deployment/*/docker-compose.yml"),
+    ("caddy", "deployment/*/Caddyfile"),
+    # caddy/Caddyfile plus per-host variants such as caddy/vps1-Caddyfile.
+    ("caddy", "caddy/*Caddyfile"),
+    ("ansible", "ansible/*.yml"),
+)
+DOCS_GLOB = "docs/*.md"
+PORT_STANDARDS = "docs/port-standards.md"
+INVENTORY = "ansible/inventory.yml"
+# Checkout path of this repository on the nodes, as used by inventory compose_dir values.
+NODE_CHECKOUT = "ssot-infrastructure/"
+
+def norm_name(name):
+    """Compare service names loosely: "Uptime Kuma" == "uptime-kuma"."""
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+# --- Per-file checks (run in worker processes; results are cached by content hash) ---
+
+def parse_port(entry):
+    """Normalize one compose `ports` entry to {host, container, ip, protocol} (ports None if unknown)."""
+    if isinstance(entry, dict):
+        host, container = entry.get('published'), entry.get('target')
+        return {"host": int(host) if str(host or '').isdigit() else None,
+                "container": int(container) if str(container or '').isdigit() else None,
+                "ip": entry.get('host_ip'), "protocol": entry.get('protocol', 'tcp')}
+    text, _, protocol = str(entry).partition('/')
+    parts = text.rsplit(':', 2) if text.count(':') <= 2 else [text]
+    container = parts[-1]
+    host = parts[-2] if len(parts) >= 2 else None
+    ip = parts[0] if len(parts) == 3 else None
+    return {"host": int(host) if host and host.isdigit() else None,
+            "container": int(container) if container.isdigit() else None,
+            "ip": ip, "protocol": protocol or 'tcp'}
+
+def check_compose(text):
+    errors, warnings = [], []
+    doc = yaml.safe_load(text)
+    services = (doc or {}).get('services') if isinstance(doc, dict) else None
+    if not isinstance(services, dict):
+        return {"errors": ["no `services` mapping"], "warnings": warnings, "facts": {"services": {}}}
+    facts = {}
+    published = {}
+    for name, service in services.items():
+        service = service or {}
+        if not isinstance(service, dict):
+            errors.append(f"service {name}: not a mapping")
+            continue
+        if 'image' not in service and 'build' not in service and 'extends' not in service:
+            errors.append(f"service {name}: neither `image` nor `build`")
+        ports = [parse_port(p) for p in service.get('ports') or []]
+        for port in ports:
+            if port['host'] is None: continue
+            # A port bound on all interfaces clashes with the same port on any address.
+            for ip, other in published.get((port['host'], port['protocol']), []):
+                if ip == port['ip'] or None in (ip, port['ip']):
+                    owners = f"twice by {name}" if other == name else f"by both {other} and {name}"
+                    errors.append(f"host port {port['host']}/{port['protocol']} published {owners}")
+                    break
+            published.setdefault((port['host'], port['protocol']), []).append((port['ip'], name))
+        expose = [int(p) for p in (str(e).partition('/')[0] for e in service.get('expose') or []) if p.isdigit()]
+        facts[name] = {"container_name": service.get('container_name'), "hostname": service.get('hostname'),
+                       "ports": ports, "expose": expose}
+    return {"errors": errors, "warnings": warnings, "facts": {"services": facts}}
+
+def caddy_tokens(text):
+    """Yield (line number, token) for a Caddyfile, honoring quotes and `#` comments."""
+    for number, line in enumerate(text.splitlines(), 1):
+        for match in re.finditer(r'"(?:[^"\\]|\\.)*"|`[^`]*`|\S+', line):
+            token = match.group(0)
+            if token.startswith('#'): break
+            yield number, token
+
+def parse_upstream(address):
+    """Split a reverse_proxy upstream into (host, port); port is None when it is a placeholder."""
+    address = re.sub(r'^[a-z]+://', '', address.strip('"'))
+    host, _, port = address.rpartition(':') if ':' in address else (address, '', '')
+    return host or address, int(port) if port.isdigit() else None
+
+def check_caddy(text):
+    errors, warnings = [], []
+    sites, snippets, imports, upstreams = [], [], [], []
+    lines = {}
+    for number, token in caddy_tokens(text): lines.setdefault(number, []).append(token)
+    depth = 0
+    proxy_depth = None
+    for number in sorted(lines):
+        tokens = lines[number]
+        if depth == 0 and tokens[0] not in ('{', '}'):
+            labels = [t.rstrip(',') for t in tokens if t != '{']
+            if labels and labels[0].startswith('(') and labels[0].endswith(')'): snippets.append(labels[0][1:-1])
+            else: sites.extend(labels)
+        if tokens[0] == 'import' and len(tokens) > 1: imports.append((number, tokens[1]))
+        if tokens[0] == 'reverse_proxy':
+            args = [t for t in tokens[1:] if t != '{']
+            # A first argument starting with / or @ (or a lone *) is a request matcher.
+            if args and (args[0][0] in '/@' or args[0] == '*'): args = args[1:]
+            upstreams.extend({"line": number, "address": a} for a in args)
+            if tokens[-1] == '{': proxy_depth = depth + 1
+        elif tokens[0] == 'to' and proxy_depth == depth:
+            upstreams.extend({"line": number, "address": a} for a in tokens[1:] if a != '{')
+        for token in tokens:
+            if token.endswith('{'): depth += 1
+            elif token == '}':
+                depth -= 1
+                if proxy_depth is not None and depth < proxy_depth: proxy_depth = None
+                if depth < 0:
+                    errors.append(f"line {number}: unmatched '}}'")
+                    depth = 0
+    if depth: errors.append(f"{depth} unclosed '{{' at end of file")
+    seen = set()
+    for site in sites:
+        if site in seen: errors.append(f"site {site} defined more than once")
+        seen.add(site)
+    for number, name in imports:
+        # Imports of file globs are paths, not snippets.
+        if name not in snippets and '/' not in name and '*' not in name and '.' not in name:
+            errors.append(f"line {number}: import of undefined snippet ({name})")
+    for upstream in upstreams:
+        upstream['host'], upstream['port'] = parse_upstream(upstream['address'])
+    return {"errors": errors, "warnings": warnings, "facts": {"sites": sites, "upstreams": upstreams}}
+
+def check_ansible(text, path):
+    errors, warnings = [], []
+    doc = yaml.safe_load(text)
+    if os.path.basename(path) == os.path.basename(INVENTORY):
+        if not isinstance(doc, dict):
+            return {"errors": ["inventory is not a mapping"], "warnings": warnings, "facts": {}}
+        groups, hosts = set(), {}
+        def walk(name, group):
+            groups.add(name)
+            group = group or {}
+            for host, host_vars in (group.get('hosts') or {}).items(): hosts[host] = host_vars or {}
+            for child, child_group in (group.get('children') or {}).items(): walk(child, child_group)
+        for name, group in doc.items(): walk(name, group)
+        return {"errors": errors, "warnings": warnings, "facts": {"groups": sorted(groups), "hosts": hosts}}
+    if not isinstance(doc, list):
+        return {"errors": ["playbook is not a list of plays"], "warnings": warnings, "facts": {}}
+    patterns = []
+    for index, play in enumerate(doc, 1):
+        if not isinstance(play, dict):
+            errors.append(f"play {index}: not a mapping")
+        elif 'import_playbook' in play or 'ansible.builtin.import_playbook' in play:
+            continue
+        elif 'hosts' not in play:
+            errors.append(f"play {index} ({play.get('name', 'unnamed')}): no `hosts`")
+        else:
+            patterns.append({"play": play.get('name', f"play {index}"), "hosts": str(play['hosts'])})
+    return {"errors": errors, "warnings": warnings, "facts": {"host_patterns": patterns}}
+
+def check_file(kind, path, text):
+    """Run the per-file checks for one file; returns {errors, warnings, facts}."""
+    if kind in ("compose", "ansible") and yaml is None:
+        return {"errors": [], "warnings": [], "facts": {}, "skipped": "PyYAML is not installed"}
+    try:
+        if kind == "compose": return check_compose(text)
+        if kind == "caddy": return check_caddy(text)
+        return check_ansible(text, path)
+    except YAML_ERRORS as e:
+        return {"errors": [f"YAML parse error: {' '.join(str(e).split())}"], "warnings": [], "facts": {}}
+
+def check_variant(kind, path):
+    """The check a file gets: ansible files are checked as the inventory or as a playbook by name."""
+    if kind != "ansible": return kind
+    return "inventory" if os.path.basename(path) == os.path.basename(INVENTORY) else "playbook"
+
+def check_job(job):
+    kind, path, text = job
+    return check_file(kind, path, text)
+
+# --- Cache ---
+
+def content_key(kind, path, text):
+    variant = check_variant(kind, path)
+    return hashlib.sha256(f"{CHECKS_VERSION}:{variant}:{yaml is not None}\0{text}".encode('utf-8')).hexdigest()
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(f"{path}.tmp", path)
+
+def check_files(files, cache, workers=WORKERS):
+    """Check (kind, path) files, reusing cached results for unchanged content.
+
+    Returns ({path: result}, number of cache hits, cache of the current files).
+    Results are keyed by the hash of the file's content and the check it gets,
+    so one entry also covers identical files, and entries for old content drop out.
+    """
+    results, jobs, current = {}, [], {}
+    for kind, path in files:
+        with open(os.path.join(ROOT, path), encoding='utf-8') as f:
+            text = f.read()
+        key = content_key(kind, path, text)
+        if key in cache:
+            results[path] = dict(cache[key], kind=kind)
+            current[key] = cache[key]
+        else: jobs.append((key, kind, path, text))
+    hits = len(results)
+    if len(jobs) > 1 and workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            outputs = list(pool.map(check_job, [(kind, path, text) for _, kind, path, text in jobs]))
+    else:
+        outputs = [check_file(kind, path, text) for _, kind, path, text in jobs]
+    for (key, kind, path, _), result in zip(jobs, outputs):
+        current[key] = result
+        results[path] = dict(result, kind=kind)
+    return results, hits, current
+
+# --- Cross-file checks ---
+
+def parse_port_standards(path=PORT_STANDARDS):
+    """Read the Service Port Map and Port Range tables: ({service: (host, container)}, [(low, high, usage)])."""
+    services, ranges = {}, []
+    try:
+        with open(os.path.join(ROOT, path), encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return services, ranges
+    for line in text.splitlines():
+        cells = [c.strip().strip('*').strip() for c in line.strip().strip('|').split('|')]
+        if len(cells) == 3 and re.fullmatch(r'\d+', cells[1]) and re.fullmatch(r'\d+', cells[2]):
+            services[norm_name(cells[0])] = (int(cells[1]), int(cells[2]), cells[0])
+        elif len(cells) == 2:
+            match = re.fullmatch(r'(\d+)-(\d+)', cells[0])
+            if match: ranges.append((int(match.group(1)), int(match.group(2)), cells[1].replace('**', '')))
+    return services, ranges
+
+def cross_check(results):
+    """Checks that span files: port standards, compose <-> Caddyfile upstreams, playbooks <-> inventory."""
+    findings = []
+    def warn(path, message): findings.append({"path": path, "level": "warning", "message": message})
+    standards, ranges = parse_port_standards()
+    # Reserved ranges read "RESERVED: <usage>".
+    reserved = [(low, high, usage.split(':', 1)[-1].strip()) for low, high, usage in ranges if 'RESERVED' in usage]
+    by_service = {}
+
+    composes = {p: r for p, r in results.items() if r['kind'] == 'compose' and 'services' in r['facts']}
+    for path, result in composes.items():
+        deployment = path.split('/')[1]
+        for name, service in result['facts']['services'].items():
+            names = {norm_name(name), norm_name(service.get('container_name') or name)}
+            host_ports = tuple(sorted({p['host'] for p in service['ports'] if p['host'] is not None}))
+            if host_ports: by_service.setdefault(norm_name(name), {}).setdefault(host_ports, []).append(deployment)
+            for port in host_ports:
+                if port in (80, 443) and 'caddy' not in names:
+                    warn(path, f"{name} publishes {port}, which is reserved for Caddy")
+                for low, high, usage in reserved:
+                    if low <= port <= high and not re.search(rf'\b{re.escape(deployment)}\b', usage, re.IGNORECASE):
+                        warn(path, f"{name} publishes {port} in the range reserved for {usage}")
+            documented = next((standards[n] for n in names if n in standards), None)
+            if documented and service['ports'] and not any(p['host'] == documented[0] for p in service['ports']):
+                host_ports = ', '.join(f"{p['host']}:{p['container']}" for p in service['ports'])
+                warn(path, f"{name} publishes {host_ports}; port-standards.md maps {documented[2]} to {documented[0]}:{documented[1]}")
+
+    # "Same port on ALL servers for same service" (port-standards.md).
+    for name, variants in by_service.items():
+        if len(variants) > 1:
+            detail = '; '.join(f"{', '.join(map(str, ports))} on {', '.join(deployments)}" for ports, deployments in sorted(variants.items()))
+            warn("deployment", f"{name} uses different host ports across servers ({detail})")
+
+    for path, result in results.items():
+        if result['kind'] != 'caddy': continue
+        compose = composes.get(os.path.join(os.path.dirname(path), 'docker-compose.yml'))
+        if not compose: continue
+        services = compose['facts']['services']
+        lookup = {}
+        for name, service in services.items():
+            for alias in (name, service.get('container_name'), service.get('hostname')):
+                if alias: lookup[alias] = service
+        host_ports = {p['host'] for s in services.values() for p in s['ports']}
+        for upstream in result['facts']['upstreams']:
+            host, port = upstream['host'], upstream['port']
+            if port is None or '{' in host: continue
+            if host in ('localhost', '127.0.0.1'):
+                if port not in host_ports: warn(path, f"line {upstream['line']}: {upstream['address']} is not published by any service")
+            elif re.fullmatch(r'[A-Za-z][\w-]*', host):
+                service = lookup.get(host)
+                if not service:
+                    warn(path, f"line {upstream['line']}: upstream {host} is not a service in {os.path.dirname(path)}/docker-compose.yml")
+                    continue
+                known = {p['container'] for p in service['ports']} | set(service['expose'])
+                if known and port not in known:
+                    warn(path, f"line {upstream['line']}: {upstream['address']} but {host} listens on {', '.join(map(str, sorted(known)))}")
+
+    inventory = results.get(INVENTORY, {}).get('facts')
+    if inventory and 'hosts' in inventory:
+        names = set(inventory['groups']) | set(inventory['hosts']) | {'all', 'localhost', 'ungrouped'}
+        for path, result in results.items():
+            for pattern in result['facts'].get('host_patterns', []) if result['kind'] == 'ansible' else []:
+                if '{{' in pattern['hosts']: continue
+                for host in re.split(r'[:,]', pattern['hosts']):
+                    host = host.strip().lstrip('!&')
+                    if host and '*' not in host and host not in names:
+                        warn(path, f"{pattern['play']}: hosts `{host}` is not in {INVENTORY}")
+        for host, host_vars in inventory['hosts'].items():
+            compose_dir = str(host_vars.get('compose_dir') or '')
+            if NODE_CHECKOUT in compose_dir:
+                relative = compose_dir.split(NODE_CHECKOUT, 1)[1]
+                if not os.path.isdir(os.path.join(ROOT, relative)):
+                    warn(INVENTORY, f"{host}: compose_dir {compose_dir} has no {relative} in this repository")
+    return findings
+
+# --- Documentation freshness ---
+
+def doc_ages(pattern=DOCS_GLOB, now=None):
+    """{doc path: days since its last commit} for every tracked doc, from one `git log` pass."""
+    now = now or time.time()
+    docs = set(expand(pattern))
+    output = subprocess.run(["git", "-C", ROOT, "log", "--format=%x00%ct", "--name-only", "--", os.path.dirname(pattern)],
+                            capture_output=True, text=True)
+    if output.returncode != 0:
+        print(f"[Warning] git log failed: {output.stderr.strip()}")
+        return {}
+    ages, committed = {}, None
+    for line in output.stdout.splitlines():
+        if line.startswith('\0'): committed = int(line[1:])
+        elif line and line in docs and line not in ages: ages[line] = int((now - committed) // 86400)
+    return ages
+
+# --- Main ---
+
+def expand(pattern):
+    return sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, pattern)) if os.path.isfile(p))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Validate compose files, Caddyfiles, ansible playbooks and docs.")
+    parser.add_argument('--output', default=REPORT_PATH, help="Where to write the JSON report.")
+    parser.add_argument('--no-cache', action='store_true', help="Re-check every file, ignoring cached results.")
+    parser.add_argument('--strict', action='store_true', help="Exit non-zero when any file has errors.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    started = time.monotonic()
+    files = [(kind, path) for kind, pattern in FILE_GLOBS for path in expand(pattern)]
+    cache = {} if args.no_cache else load_cache()
+    print(f"🔍 Validating {len(files)} infrastructure files...")
+    if yaml is None: print("[Warning] PyYAML is not installed; compose and ansible files are only listed, not parsed.")
+    results, hits, cache = check_files(files, cache)
+    save_cache(cache)
+
+    findings = []
+    for path, result in results.items():
+        findings += [{"path": path, "level": "error", "message": m} for m in result['errors']]
+        findings += [{"path": path, "level": "warning", "message": m} for m in result['warnings']]
+    findings += cross_check(results)
+
+    ages = doc_ages()
+    stale = {doc: days for doc, days in ages.items() if days > DOC_MAX_AGE_DAYS}
+    for doc, days in sorted(stale.items()):
+        findings.append({"path": doc, "level": "warning", "message": f"{days} days since last update"})
+
+    by_path = {}
+    for finding in findings: by_path.setdefault(finding['path'], []).append(finding)
+    for kind, path in files:
+        result = results[path]
+        errors = [f for f in by_path.get(path, []) if f['level'] == 'error']
+        status = "⏭️" if result.get('skipped') else ("❌" if errors else "✅")
+        print(f"  {status} {path}" + (f" ({result['skipped']})" if result.get('skipped') else ""))
+    for path, entries in by_path.items():
+        for f in entries:
+            print(f"  {'❌' if f['level'] == 'error' else '⚠️'} {path}: {f['message']}")
+
+    errors = sum(f['level'] == 'error' for f in findings)
+    report = {
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "files": {path: {"kind": r['kind'], "errors": r['errors'], "warnings": r['warnings'], "skipped": r.get('skipped')}
+                  for path, r in results.items()},
+        "docs": {"max_age_days": DOC_MAX_AGE_DAYS, "ages": ages, "stale": sorted(stale)},
+        "findings": findings,
+        "summary": {"files": len(files), "cached": hits, "errors": errors,
+                    "warnings": len(findings) - errors, "stale_docs": len(stale),
+                    "seconds": round(time.monotonic() - started, 2)},
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Checked {len(files)} files ({hits} unchanged) and {len(ages)} docs: "
+          f"{errors} errors, {len(findings) - errors} warnings, {len(stale)} stale docs. Report: {args.output}")
+    if args.strict and errors: sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        tracing.run(main)
+    finally:
+        tracing.report()